@@ -1,6 +1,19 @@
-from fastapi import APIRouter
-from app.api.v1.routers import kits
+from fastapi import FastAPI
+from app.api.v1.routers import audit, components, kits, loans, roster, search, stats
 
-api_router = APIRouter()
+ROUTERS = (
+    (components.router, "/components", "components"),
+    (kits.router, "/kits", "kits"),
+    (loans.router, "/loans", "loans"),
+    (search.router, "/search", "search"),
+    (roster.router, "/roster", "roster"),
+    (stats.router, "/stats", "stats"),
+    (audit.router, "/audit", "audit"),
+)
 
-api_router.include_router(kits.router, prefix="/kits", tags=["kits"])
\ No newline at end of file
+
+def include_api_routers(app: FastAPI, prefix: str) -> None:
+    # Cada include_router vuelve a crear todas las rutas (y los response models que validan);
+    # incluirlos directamente en la app, sin un APIRouter intermedio, lo hace una sola vez
+    for router, path, tag in ROUTERS:
+        app.include_router(router, prefix=f"{prefix}{path}", tags=[tag])
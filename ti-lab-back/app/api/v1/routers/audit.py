@@ -0,0 +1,53 @@
+from datetime import date, datetime, time
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import List, Optional, Union
+from app.core.database import Database, get_database
+from app.core.pagination import MAX_ID, NEXT_CURSOR_HEADER
+from app.core.query_budget import query_budget
+from app.core.serialization import PreEncodedJSONResponse
+from app.schemas.audit import AuditEntry, AuditTable
+from app.services.audit_service import AuditService
+
+router = APIRouter()
+
+
+def _as_datetime(value: Union[datetime, date, None]) -> Optional[datetime]:
+    # Igual que en la exportación de préstamos: una fecha sola equivale a su medianoche
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.combine(value, time.min)
+
+
+@router.get(
+    "/loans",
+    response_model=List[AuditEntry],
+    response_class=PreEncodedJSONResponse,
+    dependencies=[Depends(query_budget(1))]
+)
+async def get_loan_audit(
+    desde: Union[datetime, date, None] = Query(default=None, alias="from", description="Inclusivo"),
+    hasta: Union[datetime, date, None] = Query(default=None, alias="to", description="Exclusivo"),
+    prestamo_id: Optional[int] = Query(default=None, gt=0, le=MAX_ID),
+    tabla: Optional[AuditTable] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    db: Database = Depends(get_database)
+):
+    desde, hasta = _as_datetime(desde), _as_datetime(hasta)
+    if desde is not None and hasta is not None and desde >= hasta:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="'from' must be earlier than 'to'"
+        )
+    service = db.service(AuditService)
+    try:
+        body, next_cursor = await service.get_audit_page_json(
+            desde=desde, hasta=hasta, prestamo_id=prestamo_id, tabla=tabla, limit=limit, cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    return PreEncodedJSONResponse(content=body, headers=headers)
@@ -1,36 +1,111 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-from app.core.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from typing import List, Optional
+from app.core.catalog_cache import cached_catalog_response
+from app.core.database import Database, get_database
+from app.core.pagination import MAX_IDS, MAX_SKIP, NEXT_CURSOR_HEADER, PathId, parse_ids
+from app.core.query_budget import query_budget
+from app.core.serialization import PreEncodedJSONResponse, encode_one
+from app.services.availability_service import AvailabilityService
 from app.services.component_service import ComponentService
+from app.schemas.availability import ComponentAvailability, ReconciliationReport, StockUpdate
 from app.schemas.component import Component, ComponentCreate, ComponentUpdate
 
 router = APIRouter()
 
 
-@router.get("/", response_model=List[Component])
-def get_components(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    service = ComponentService(db)
-    return service.get_all_components(skip=skip, limit=limit)
+@router.get(
+    "/",
+    response_model=List[Component],
+    response_class=PreEncodedJSONResponse,
+    dependencies=[Depends(query_budget(2))]
+)
+async def get_components(
+    request: Request,
+    skip: int = Query(0, ge=0, le=MAX_SKIP),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    ids: Optional[str] = Query(None, description=f"Hasta {MAX_IDS} ids separados por comas; ignora la paginación"),
+    db: Database = Depends(get_database)
+):
+    async def produce():
+        service = db.service(ComponentService)
+        try:
+            if ids is not None:
+                # Búsqueda múltiple: un solo IN, en el orden pedido; los ids que no existen no aparecen
+                return await service.get_components_by_ids_json(parse_ids(ids)), {}
+            body, next_cursor = await service.get_components_page_json(skip=skip, limit=limit, cursor=cursor)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        # Ruta rápida: filas Core serializadas directamente a JSON, sin pasar por el ORM ni response_model
+        return body, {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+    
+    # ETag por versión del catálogo: If-None-Match vigente responde 304 leyendo solo la versión
+    return await cached_catalog_response(request, db, "components", produce)
 
 
-@router.get("/{component_id}", response_model=Component)
-def get_component(component_id: int, db: Session = Depends(get_db)):
-    service = ComponentService(db)
-    component = service.get_component_by_id(component_id)
-    if not component:
+@router.get("/availability", response_model=List[ComponentAvailability], dependencies=[Depends(query_budget(1))])
+async def get_availability(
+    skip: int = Query(0, ge=0, le=MAX_SKIP),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Database = Depends(get_database)
+):
+    service = db.service(AvailabilityService)
+    return await service.get_all_availability(skip=skip, limit=limit)
+
+
+@router.post("/availability/reconcile", response_model=ReconciliationReport)
+async def reconcile_availability(dry_run: bool = False, db: Database = Depends(get_database)):
+    service = db.service(AvailabilityService)
+    return await service.reconcile(apply=not dry_run)
+
+
+@router.get("/{component_id}/availability", response_model=ComponentAvailability, dependencies=[Depends(query_budget(1))])
+async def get_component_availability(component_id: PathId, db: Database = Depends(get_database)):
+    service = db.service(AvailabilityService)
+    availability = await service.get_availability(component_id)
+    if not availability:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Component not found"
         )
-    return component
+    return availability
+
+
+@router.put("/{component_id}/stock", response_model=ComponentAvailability)
+async def set_component_stock(component_id: PathId, stock_data: StockUpdate, db: Database = Depends(get_database)):
+    service = db.service(AvailabilityService)
+    availability = await service.set_stock(component_id, stock_data.en_stock, stock_data.version)
+    if not availability:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Component not found"
+        )
+    return availability
+
+
+@router.get("/{component_id}", response_model=Component, response_class=PreEncodedJSONResponse)
+async def get_component(request: Request, component_id: PathId, db: Database = Depends(get_database)):
+    async def produce():
+        service = db.service(ComponentService)
+        component = await service.get_component_by_id(component_id)
+        if not component:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Component not found"
+            )
+        return encode_one(Component, component), {}
+    
+    return await cached_catalog_response(request, db, "components", produce)
 
 
 @router.post("/", response_model=Component, status_code=status.HTTP_201_CREATED)
-def create_component(component_data: ComponentCreate, db: Session = Depends(get_db)):
-    service = ComponentService(db)
+async def create_component(component_data: ComponentCreate, db: Database = Depends(get_database)):
+    service = db.service(ComponentService)
     try:
-        return service.create_component(component_data)
+        return await service.create_component(component_data)
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -39,9 +114,9 @@ def create_component(component_data: ComponentCreate, db: Session = Depends(get_
 
 
 @router.put("/{component_id}", response_model=Component)
-def update_component(component_id: int, component_data: ComponentUpdate, db: Session = Depends(get_db)):
-    service = ComponentService(db)
-    component = service.update_component(component_id, component_data)
+async def update_component(component_id: PathId, component_data: ComponentUpdate, db: Database = Depends(get_database)):
+    service = db.service(ComponentService)
+    component = await service.update_component(component_id, component_data)
     if not component:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -51,9 +126,15 @@ def update_component(component_id: int, component_data: ComponentUpdate, db: Ses
 
 
 @router.delete("/{component_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_component(component_id: int, db: Session = Depends(get_db)):
-    service = ComponentService(db)
-    success = service.delete_component(component_id)
+async def delete_component(component_id: PathId, db: Database = Depends(get_database)):
+    service = db.service(ComponentService)
+    try:
+        success = await service.delete_component(component_id)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -1,167 +1,128 @@
-from fastapi import APIRouter, HTTPException, status
-from typing import List
-from app.schemas.kit import Kit, KitCreate, KitUpdate
+import logging
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from typing import List, Optional
+from app.core.catalog_cache import cached_catalog_response
+from app.core.database import Database, get_database
+from app.core.fieldsets import FieldSet
+from app.core.pagination import MAX_IDS, MAX_SKIP, NEXT_CURSOR_HEADER, PathId, parse_ids
+from app.core.query_budget import query_budget
+from app.core.serialization import PreEncodedJSONResponse
+from app.services.kit_service import KitService
+from app.schemas.kit import KIT_FIELDSET, Kit, KitCreate, KitUpdate
 
-router = APIRouter()
+logger = logging.getLogger(__name__)
 
-# Datos de prueba
-kits_data = [
-    {
-        "id": 1,
-        "nombre": "Kit de Electrónica Básico",
-        "descripcion": "Kit con componentes básicos para proyectos electrónicos",
-        "componentes": [
-            {
-                "id": 1,
-                "componente_id": 1,
-                "cantidad": 5,
-                "componente": {
-                    "id": 1,
-                    "nombre": "Resistencia 1kΩ",
-                    "requiere_numero_serie": False
-                }
-            },
-            {
-                "id": 2,
-                "componente_id": 2,
-                "cantidad": 3,
-                "componente": {
-                    "id": 2,
-                    "nombre": "LED Rojo 5mm",
-                    "requiere_numero_serie": False
-                }
-            }
-        ]
-    },
-    {
-        "id": 2,
-        "nombre": "Kit de Redes",
-        "descripcion": "Kit para prácticas de redes",
-        "componentes": [
-            {
-                "id": 3,
-                "componente_id": 3,
-                "cantidad": 2,
-                "componente": {
-                    "id": 3,
-                    "nombre": "Cable Ethernet",
-                    "requiere_numero_serie": False
-                }
-            },
-            {
-                "id": 4,
-                "componente_id": 4,
-                "cantidad": 1,
-                "componente": {
-                    "id": 4,
-                    "nombre": "Switch 8 Puertos",
-                    "requiere_numero_serie": True
-                }
-            }
-        ]
-    },
-    {
-        "id": 3,
-        "nombre": "Kit de Programación",
-        "descripcion": "Kit para actividades de programación",
-        "componentes": [
-            {
-                "id": 5,
-                "componente_id": 5,
-                "cantidad": 1,
-                "componente": {
-                    "id": 5,
-                    "nombre": "Raspberry Pi 4",
-                    "requiere_numero_serie": True
-                }
-            },
-            {
-                "id": 6,
-                "componente_id": 6,
-                "cantidad": 1,
-                "componente": {
-                    "id": 6,
-                    "nombre": "Teclado USB",
-                    "requiere_numero_serie": False
-                }
-            }
-        ]
-    }
-]
+router = APIRouter()
 
 
-@router.get("/", response_model=List[Kit])
-def get_kits():
-    print("Obteniendo todos los kits...")
-    return kits_data
+@router.get(
+    "/",
+    response_model=List[Kit],
+    response_class=PreEncodedJSONResponse,
+    dependencies=[Depends(query_budget(3))]
+)
+async def get_kits(
+    request: Request,
+    skip: int = Query(0, ge=0, le=MAX_SKIP),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    ids: Optional[str] = Query(None, description=f"Hasta {MAX_IDS} ids separados por comas; ignora la paginación"),
+    fieldset: FieldSet = Depends(KIT_FIELDSET.dependency()),
+    db: Database = Depends(get_database)
+):
+    logger.debug("Obteniendo todos los kits", extra={"skip": skip, "limit": limit, "cursor": cursor, "ids": ids})
+    
+    async def produce():
+        service = db.service(KitService)
+        try:
+            if ids is not None:
+                return await service.get_kits_by_ids_json(parse_ids(ids), fieldset), {}
+            body, next_cursor = await service.get_kits_page_json(
+                skip=skip, limit=limit, cursor=cursor, fieldset=fieldset
+            )
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        return body, {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+    
+    return await cached_catalog_response(request, db, "kits", produce)
 
 
-@router.get("/{kit_id}", response_model=Kit)
-def get_kit(kit_id: int):
-    print(f"Buscando kit con ID: {kit_id}")
+@router.get(
+    "/{kit_id}",
+    response_model=Kit,
+    response_class=PreEncodedJSONResponse,
+    dependencies=[Depends(query_budget(3))]
+)
+async def get_kit(
+    request: Request,
+    kit_id: PathId,
+    fieldset: FieldSet = Depends(KIT_FIELDSET.dependency()),
+    db: Database = Depends(get_database)
+):
+    logger.debug("Buscando kit", extra={"kit_id": kit_id})
     
-    for kit in kits_data:
-        if kit["id"] == kit_id:
-            print(f"Kit encontrado: {kit['nombre']}")
-            return kit
+    async def produce():
+        service = db.service(KitService)
+        body = await service.get_kit_json(kit_id, fieldset)
+        if body is None:
+            logger.info("Kit no encontrado", extra={"kit_id": kit_id})
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Kit con ID {kit_id} no encontrado"
+            )
+        logger.debug("Kit encontrado", extra={"kit_id": kit_id})
+        return body, {}
     
-    print(f"Kit con ID {kit_id} no encontrado")
-    raise HTTPException(
-        status_code=status.HTTP_404_NOT_FOUND,
-        detail=f"Kit con ID {kit_id} no encontrado"
-    )
+    return await cached_catalog_response(request, db, "kits", produce)
 
 
 @router.post("/", response_model=Kit, status_code=status.HTTP_201_CREATED)
-def create_kit(kit_data: KitCreate):
-    print(f"Creando nuevo kit: {kit_data.nombre}")
-    
-    new_id = max(kit["id"] for kit in kits_data) + 1
-    new_kit = {
-        "id": new_id,
-        "nombre": kit_data.nombre,
-        "descripcion": kit_data.descripcion,
-        "componentes": []
-    }
+async def create_kit(kit_data: KitCreate, db: Database = Depends(get_database)):
+    logger.debug("Creando nuevo kit", extra={"nombre": kit_data.nombre})
     
-    kits_data.append(new_kit)
-    print(f"Kit creado con ID: {new_id}")
+    service = db.service(KitService)
+    new_kit = await service.create_kit(kit_data)
+    logger.info("Kit creado", extra={"kit_id": new_kit["id"], "nombre": new_kit["nombre"]})
     return new_kit
 
 
 @router.put("/{kit_id}", response_model=Kit)
-def update_kit(kit_id: int, kit_data: KitUpdate):
-    print(f"Actualizando kit con ID: {kit_id}")
+async def update_kit(kit_id: PathId, kit_data: KitUpdate, db: Database = Depends(get_database)):
+    logger.debug("Actualizando kit", extra={"kit_id": kit_id})
     
-    for kit in kits_data:
-        if kit["id"] == kit_id:
-            if kit_data.nombre is not None:
-                kit["nombre"] = kit_data.nombre
-            if kit_data.descripcion is not None:
-                kit["descripcion"] = kit_data.descripcion
-            
-            print(f"Kit actualizado: {kit['nombre']}")
-            return kit
+    service = db.service(KitService)
+    kit = await service.update_kit(kit_id, kit_data)
+    if not kit:
+        logger.info("Kit no encontrado para actualizar", extra={"kit_id": kit_id})
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Kit con ID {kit_id} no encontrado"
+        )
     
-    print(f"Kit con ID {kit_id} no encontrado para actualizar")
-    raise HTTPException(
-        status_code=status.HTTP_404_NOT_FOUND,
-        detail=f"Kit con ID {kit_id} no encontrado"
-    )
+    logger.info("Kit actualizado", extra={"kit_id": kit_id, "nombre": kit["nombre"]})
+    return kit
 
 
 @router.delete("/{kit_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_kit(kit_id: int):
-    print(f"Eliminando kit con ID: {kit_id}")
-    
-    for i, kit in enumerate(kits_data):
-        if kit["id"] == kit_id:
-            del kits_data[i]
-            print(f"Kit con ID {kit_id} eliminado exitosamente")
-            return
+async def delete_kit(kit_id: PathId, db: Database = Depends(get_database)):
+    logger.debug("Eliminando kit", extra={"kit_id": kit_id})
     
-    print(f"Kit con ID {kit_id} no encontrado para eliminar")
-    raise HTTPException(
-        status_code=status.HTTP_404_NOT_FOUND,
-        detail=f"Kit con ID {kit_id} no encontrado"
-    )
\ No newline at end of file
+    service = db.service(KitService)
+    try:
+        deleted = await service.delete_kit(kit_id)
+    except ValueError as e:
+        logger.info("Kit en uso, no se elimina", extra={"kit_id": kit_id})
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+    if not deleted:
+        logger.info("Kit no encontrado para eliminar", extra={"kit_id": kit_id})
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Kit con ID {kit_id} no encontrado"
+        )
+    logger.info("Kit eliminado", extra={"kit_id": kit_id})
\ No newline at end of file
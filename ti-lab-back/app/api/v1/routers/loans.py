@@ -1,42 +1,179 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-from app.core.database import get_db
+from datetime import date, datetime, time
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from typing import Iterator, List, Optional, Union
+from app.core.database import Database, get_database, session_factory, use_replica
+from app.core.fieldsets import FieldSet
+from app.core.idempotency import IDEMPOTENCY_HEADER, idempotent_response
+from app.core.pagination import MAX_SKIP, NEXT_CURSOR_HEADER, PathId
+from app.core.query_budget import query_budget
+from app.core.serialization import PreEncodedJSONResponse, encode_one
+from app.services.loan_export_service import MEDIA_TYPES, LoanExportService
 from app.services.loan_service import LoanService
-from app.schemas.loan import Loan, LoanCreate, LoanUpdate
+from app.schemas.loan import (
+    LOAN_FIELDSET,
+    BulkLoanCreate,
+    BulkLoanResponse,
+    Loan,
+    LoanCreate,
+    LoanExportFormat,
+    LoanReturnBatch,
+    LoanReturnBatchResponse,
+    LoanUpdate,
+)
 
 router = APIRouter()
 
 
-@router.get("/", response_model=List[Loan])
-def get_loans(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    service = LoanService(db)
-    return service.get_all_loans(skip=skip, limit=limit)
+@router.get(
+    "/",
+    response_model=List[Loan],
+    response_class=PreEncodedJSONResponse,
+    dependencies=[Depends(query_budget(4))]
+)
+async def get_loans(
+    skip: int = Query(0, ge=0, le=MAX_SKIP),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    fieldset: FieldSet = Depends(LOAN_FIELDSET.dependency()),
+    db: Database = Depends(get_database)
+):
+    service = db.service(LoanService)
+    try:
+        body, next_cursor = await service.get_loans_page_json(
+            skip=skip, limit=limit, cursor=cursor, fieldset=fieldset
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    # Ruta rápida: filas Core serializadas directamente a JSON, sin pasar por el ORM ni response_model
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    return PreEncodedJSONResponse(content=body, headers=headers)
 
 
 @router.get("/active", response_model=List[Loan])
-def get_active_loans(db: Session = Depends(get_db)):
-    service = LoanService(db)
-    return service.get_active_loans()
+async def get_active_loans(db: Database = Depends(get_database)):
+    service = db.service(LoanService)
+    return await service.get_active_loans()
 
 
-@router.get("/{loan_id}", response_model=Loan)
-def get_loan(loan_id: int, db: Session = Depends(get_db)):
-    service = LoanService(db)
-    loan = service.get_loan_by_id(loan_id)
-    if not loan:
+@router.get(
+    "/overdue",
+    response_model=List[Loan],
+    response_class=PreEncodedJSONResponse,
+    dependencies=[Depends(query_budget(4))]
+)
+async def get_overdue_loans(
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    fieldset: FieldSet = Depends(LOAN_FIELDSET.dependency()),
+    db: Database = Depends(get_database)
+):
+    service = db.service(LoanService)
+    try:
+        body, next_cursor = await service.get_overdue_page_json(limit=limit, cursor=cursor, fieldset=fieldset)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    return PreEncodedJSONResponse(content=body, headers=headers)
+
+
+def _stream_export(
+    fmt: LoanExportFormat, desde: Optional[datetime], hasta: Optional[datetime], replica: bool
+) -> Iterator[bytes]:
+    # Sesión propia: el flujo sigue vivo después de que el endpoint retorna.
+    # StreamingResponse recorre este generador síncrono en el threadpool, en ambos DATABASE_MODE.
+    db = session_factory(replica)()
+    try:
+        yield from LoanExportService(db).export(fmt, desde, hasta)
+    finally:
+        db.close()
+
+
+def _as_datetime(value: Union[datetime, date, None]) -> Optional[datetime]:
+    # Una fecha sola equivale a su medianoche
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.combine(value, time.min)
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_loans(
+    request: Request,
+    format: LoanExportFormat = "csv",
+    desde: Union[datetime, date, None] = Query(default=None, alias="from", description="Inclusivo"),
+    hasta: Union[datetime, date, None] = Query(default=None, alias="to", description="Exclusivo"),
+):
+    desde, hasta = _as_datetime(desde), _as_datetime(hasta)
+    if desde is not None and hasta is not None and desde >= hasta:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="'from' must be earlier than 'to'"
+        )
+    return StreamingResponse(
+        _stream_export(format, desde, hasta, await use_replica(request)),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="prestamos.{format}"'},
+    )
+
+
+@router.get(
+    "/{loan_id}",
+    response_model=Loan,
+    response_class=PreEncodedJSONResponse,
+    dependencies=[Depends(query_budget(4))]
+)
+async def get_loan(
+    loan_id: PathId,
+    fieldset: FieldSet = Depends(LOAN_FIELDSET.dependency()),
+    db: Database = Depends(get_database)
+):
+    service = db.service(LoanService)
+    body = await service.get_loan_json(loan_id, fieldset)
+    if body is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Loan not found"
         )
-    return loan
+    return PreEncodedJSONResponse(content=body)
+
+
+@router.post(
+    "/",
+    response_model=Loan,
+    response_class=PreEncodedJSONResponse,
+    status_code=status.HTTP_201_CREATED
+)
+async def create_loan(
+    loan_data: LoanCreate,
+    request: Request,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER),
+    db: Database = Depends(get_database)
+):
+    async def produce():
+        service = db.service(LoanService)
+        try:
+            loan = await service.create_loan(loan_data)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        return PreEncodedJSONResponse(content=encode_one(Loan, loan), status_code=status.HTTP_201_CREATED)
+    
+    return await idempotent_response(request, db, idempotency_key, produce)
 
 
-@router.post("/", response_model=Loan, status_code=status.HTTP_201_CREATED)
-def create_loan(loan_data: LoanCreate, db: Session = Depends(get_db)):
-    service = LoanService(db)
+@router.post("/bulk", response_model=BulkLoanResponse, dependencies=[Depends(query_budget(13))])
+async def create_bulk_loans(bulk_data: BulkLoanCreate, db: Database = Depends(get_database)):
+    service = db.service(LoanService)
     try:
-        return service.create_loan(loan_data)
+        return await service.create_bulk_loans(bulk_data)
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -44,22 +181,49 @@ def create_loan(loan_data: LoanCreate, db: Session = Depends(get_db)):
         )
 
 
-@router.put("/{loan_id}/return", response_model=Loan)
-def return_loan(loan_id: int, db: Session = Depends(get_db)):
-    service = LoanService(db)
-    loan = service.return_loan(loan_id)
-    if not loan:
+# Incluye las dos lecturas con que la auditoría toma el antes y el después del UPDATE masivo
+@router.post("/return-batch", response_model=LoanReturnBatchResponse, dependencies=[Depends(query_budget(8))])
+async def return_loans_batch(batch: LoanReturnBatch, db: Database = Depends(get_database)):
+    service = db.service(LoanService)
+    try:
+        return await service.return_batch(batch)
+    except ValueError as e:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Loan not found"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
         )
-    return loan
+
+
+@router.put("/{loan_id}/return", response_model=Loan, response_class=PreEncodedJSONResponse)
+async def return_loan(
+    loan_id: PathId,
+    request: Request,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER),
+    db: Database = Depends(get_database)
+):
+    async def produce():
+        service = db.service(LoanService)
+        try:
+            loan = await service.return_loan(loan_id)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=str(e)
+            )
+        if not loan:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Loan not found"
+            )
+        return PreEncodedJSONResponse(content=encode_one(Loan, loan))
+    
+    return await idempotent_response(request, db, idempotency_key, produce)
 
 
 @router.put("/{loan_id}", response_model=Loan)
-def update_loan(loan_id: int, loan_data: LoanUpdate, db: Session = Depends(get_db)):
-    service = LoanService(db)
-    loan = service.update_loan(loan_id, loan_data)
+async def update_loan(loan_id: PathId, loan_data: LoanUpdate, db: Database = Depends(get_database)):
+    service = db.service(LoanService)
+    loan = await service.update_loan(loan_id, loan_data)
     if not loan:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status
+from typing import Optional
+from app.core.database import Database, get_database
+from app.schemas.roster import RosterFormat, RosterImportReport
+
+router = APIRouter()
+
+NDJSON_SUFFIXES = (".ndjson", ".jsonl")
+
+
+@router.post("/import", response_model=RosterImportReport)
+async def import_roster(
+    file: UploadFile = File(...),
+    format: Optional[RosterFormat] = Query(default=None, description="Por defecto, según la extensión del archivo"),
+    dry_run: bool = False,
+    db: Database = Depends(get_database)
+):
+    # El upload llega como SpooledTemporaryFile: a partir de 1 MB vive en disco, no en memoria
+    fmt = format or ("ndjson" if (file.filename or "").lower().endswith(NDJSON_SUFFIXES) else "csv")
+    # Import diferido: la importación de nóminas es ocasional y no debe sumar al arranque
+    from app.services.roster_service import RosterService
+    service = db.service(RosterService)
+    try:
+        return await service.import_roster(file.file, fmt, apply=not dry_run)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends, Query
+from typing import List, Optional
+from app.core.database import Database, get_database
+from app.core.query_budget import query_budget
+from app.core.serialization import PreEncodedJSONResponse, encode_list
+from app.schemas.search import SearchResult, SearchType
+from app.services.search_service import SearchService
+
+router = APIRouter()
+
+
+@router.get(
+    "/",
+    response_model=List[SearchResult],
+    response_class=PreEncodedJSONResponse,
+    dependencies=[Depends(query_budget(3))]
+)
+async def search(
+    q: str = Query(min_length=1, max_length=100),
+    limit: int = Query(default=20, ge=1, le=100),
+    tipo: Optional[SearchType] = None,
+    db: Database = Depends(get_database)
+):
+    service = db.service(SearchService)
+    results = await service.search(q, limit=limit, tipo=tipo)
+    return PreEncodedJSONResponse(content=encode_list(SearchResult, results))
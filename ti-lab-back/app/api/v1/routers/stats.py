@@ -0,0 +1,48 @@
+from datetime import date
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import List, Optional
+from app.core.database import Database, get_database
+from app.core.pagination import MAX_ID
+from app.core.query_budget import query_budget
+from app.schemas.stats import ComponentUsage, WeeklyUsage
+from app.services.stats_service import StatsService
+
+router = APIRouter()
+
+
+def _check_range(desde: Optional[date], hasta: Optional[date]) -> None:
+    if desde is not None and hasta is not None and desde >= hasta:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="'from' must be earlier than 'to'"
+        )
+
+
+@router.get("/components", response_model=List[ComponentUsage], dependencies=[Depends(query_budget(1))])
+async def component_usage(
+    curso_id: Optional[int] = Query(default=None, gt=0, le=MAX_ID),
+    seccion_id: Optional[int] = Query(default=None, gt=0, le=MAX_ID),
+    desde: Optional[date] = Query(default=None, alias="from", description="Inclusivo"),
+    hasta: Optional[date] = Query(default=None, alias="to", description="Exclusivo"),
+    limit: int = Query(default=50, ge=1, le=500),
+    db: Database = Depends(get_database)
+):
+    _check_range(desde, hasta)
+    service = db.service(StatsService)
+    return await service.by_component(curso_id=curso_id, seccion_id=seccion_id, desde=desde, hasta=hasta, limit=limit)
+
+
+@router.get("/weekly", response_model=List[WeeklyUsage], dependencies=[Depends(query_budget(1))])
+async def weekly_usage(
+    curso_id: Optional[int] = Query(default=None, gt=0, le=MAX_ID),
+    seccion_id: Optional[int] = Query(default=None, gt=0, le=MAX_ID),
+    componente_id: Optional[int] = Query(default=None, gt=0, le=MAX_ID),
+    desde: Optional[date] = Query(default=None, alias="from", description="Inclusivo"),
+    hasta: Optional[date] = Query(default=None, alias="to", description="Exclusivo"),
+    db: Database = Depends(get_database)
+):
+    _check_range(desde, hasta)
+    service = db.service(StatsService)
+    return await service.by_week(
+        curso_id=curso_id, seccion_id=seccion_id, componente_id=componente_id, desde=desde, hasta=hasta
+    )
@@ -0,0 +1,120 @@
+import argparse
+import json
+from datetime import date
+from app import models  # noqa: F401  (registra todos los mappers)
+from app.core.database import SessionLocal
+
+
+def reconcile_availability(args: argparse.Namespace) -> int:
+    from app.services.availability_service import AvailabilityService
+    
+    db = SessionLocal()
+    try:
+        report = AvailabilityService(db).reconcile(apply=not args.dry_run)
+    finally:
+        db.close()
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    return 1 if report["drift"] else 0
+
+
+def migrate(args: argparse.Namespace) -> int:
+    from app.core.database import engine
+    from app.migrations import MIGRATIONS, current_version, run_migrations
+    
+    if args.status:
+        print(json.dumps({"version": current_version(engine), "latest": len(MIGRATIONS)}))
+        return 0
+    applied = run_migrations(engine)
+    print(json.dumps({"applied": applied, "version": current_version(engine)}))
+    return 0
+
+
+def import_roster(args: argparse.Namespace) -> int:
+    from app.services.roster_service import RosterService
+    
+    fmt = args.format or ("ndjson" if args.path.lower().endswith((".ndjson", ".jsonl")) else "csv")
+    db = SessionLocal()
+    try:
+        with open(args.path, "rb") as file:
+            report = RosterService(db).import_roster(file, fmt, apply=not args.dry_run)
+    except ValueError as e:
+        print(json.dumps({"error": str(e)}, ensure_ascii=False))
+        return 2
+    finally:
+        db.close()
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    return 1 if report["rechazadas"] else 0
+
+
+def rebuild_stats(args: argparse.Namespace) -> int:
+    from app.services.stats_service import StatsService
+    
+    db = SessionLocal()
+    try:
+        report = StatsService(db).rebuild(desde=args.desde, hasta=args.hasta)
+    finally:
+        db.close()
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    return 0
+
+
+def replicate(args: argparse.Namespace) -> int:
+    from sqlalchemy.engine import make_url
+    from app.core.config import settings
+    from app.core.replica import SQLiteReplicator
+    
+    urls = [make_url(url) for url in (settings.database_url, settings.database_read_url)]
+    if not settings.database_read_url or any(url.get_backend_name() != "sqlite" for url in urls):
+        print(json.dumps({"error": "DATABASE_URL and DATABASE_READ_URL must both be SQLite files"}))
+        return 2
+    replicator = SQLiteReplicator(urls[0].database, urls[1].database)
+    if args.once:
+        print(json.dumps({"sincronizado_en": replicator.sync_once()}))
+        return 0
+    try:
+        replicator.run(args.interval)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Tareas de mantenimiento de TI-LAB")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    reconcile = subparsers.add_parser(
+        "reconcile-availability", help="Reconstruye los contadores de disponibilidad y reporta el drift"
+    )
+    reconcile.add_argument("--dry-run", action="store_true", help="Solo reporta, no corrige")
+    reconcile.set_defaults(func=reconcile_availability)
+    
+    migrate_parser = subparsers.add_parser("migrate", help="Aplica las migraciones de esquema pendientes")
+    migrate_parser.add_argument("--status", action="store_true", help="Solo muestra la versión actual")
+    migrate_parser.set_defaults(func=migrate)
+    
+    roster = subparsers.add_parser(
+        "import-roster", help="Importa una nómina CSV/NDJSON (cursos, secciones y alumnos) por lotes"
+    )
+    roster.add_argument("path", help="Archivo CSV con cabecera o NDJSON (un objeto por línea)")
+    roster.add_argument("--format", choices=["csv", "ndjson"], help="Por defecto, según la extensión")
+    roster.add_argument("--dry-run", action="store_true", help="Valida e informa sin guardar cambios")
+    roster.set_defaults(func=import_roster)
+    
+    stats = subparsers.add_parser("rebuild-stats", help="Recalcula el resumen diario de uso desde el historial de préstamos")
+    stats.add_argument("--from", dest="desde", type=date.fromisoformat, help="Primera fecha de jornada (inclusiva)")
+    stats.add_argument("--to", dest="hasta", type=date.fromisoformat, help="Última fecha de jornada (exclusiva)")
+    stats.set_defaults(func=rebuild_stats)
+    
+    replica = subparsers.add_parser(
+        "replicate-sqlite", help="Réplica de prueba: copia DATABASE_URL sobre DATABASE_READ_URL cada cierto tiempo"
+    )
+    replica.add_argument("--interval", type=float, default=1.0, help="Segundos entre copias")
+    replica.add_argument("--once", action="store_true", help="Una sola copia")
+    replica.set_defaults(func=replicate)
+    
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
\ No newline at end of file
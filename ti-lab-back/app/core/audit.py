@@ -0,0 +1,379 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from sqlalchemy import Table, event, insert, inspect, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core.metrics import Counter, Gauge, registry
+from app.models.auditoria_prestamo import ACCION_ACTUALIZAR, ACCION_CREAR, ACCION_ELIMINAR, AuditoriaPrestamo
+from app.models.detalle_prestamo import DetallePrestamo
+from app.models.prestamo import Prestamo
+
+logger = logging.getLogger(__name__)
+
+# Cabecera con la que el cliente se identifica: queda como actor de lo que cambie la request
+ACTOR_HEADER = "X-Actor"
+
+# Tablas auditadas y la columna que asocia cada fila a su préstamo
+AUDITED_TABLES: Dict[str, str] = {
+    Prestamo.__tablename__: "id",
+    DetallePrestamo.__tablename__: "prestamo_id",
+}
+
+AUDIT_EVENTS = registry.register(Counter(
+    "audit_events_total",
+    "Cambios auditados: encolados, desbordados (cola llena en el event loop), escritos por lotes, escritos en línea "
+    "(cola llena) o perdidos (error al escribir)",
+    ("outcome",),
+))
+AUDIT_QUEUE_DEPTH = registry.register(Gauge("audit_queue_depth", "Cambios auditados esperando ser escritos"))
+AUDIT_BACKPRESSURE = registry.register(Counter(
+    "audit_backpressure_waits_total", "Requests de escritura que esperaron lugar en la cola de auditoría"
+))
+
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _change(tabla: str, accion: str, row: Dict[str, Any], antes: Optional[dict], despues: Optional[dict]) -> dict:
+    return {
+        "tabla": tabla,
+        "registro_id": row.get("id"),
+        "prestamo_id": row.get(AUDITED_TABLES[tabla]),
+        "accion": accion,
+        "antes": antes,
+        "despues": despues,
+    }
+
+
+class AuditLog:
+    """Escritura diferida (write-behind) de la auditoría de préstamos.
+    
+    Los cambios confirmados se encolan en memoria y una tarea del lifespan los escribe por lotes
+    (`batch_size` por INSERT, como mucho cada `flush_interval` segundos, o antes si ya hay un lote
+    completo), así la transacción del préstamo no paga la escritura. La cola está acotada: con la cola
+    llena, las requests de escritura esperan antes de empezar (`wait_for_room`) y quien confirma en un
+    hilo del threadpool espera hasta `put_timeout` y, si sigue llena, escribe sus cambios él mismo.
+    Nada se descarta; al detenerse se escribe lo pendiente.
+    """
+    
+    def __init__(self, maxsize: int, batch_size: int, flush_interval: float, put_timeout: float = 0.05):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self._queue: "queue.Queue[dict]" = queue.Queue(maxsize)
+        self._session_factory: Optional[Callable[[], Session]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._flushing = threading.Lock()
+        # Lo que se confirmó en el hilo del event loop con la cola llena
+        self._overflow: "deque[dict]" = deque()
+        # Lote que falló al escribirse: va primero en la próxima pasada
+        self._failed: List[dict] = []
+    
+    @property
+    def capturing(self) -> bool:
+        return self._task is not None
+    
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() + len(self._overflow) + len(self._failed)
+    
+    def start(self, session_factory: Callable[[], Session]) -> None:
+        if self._task is not None:
+            return
+        self._session_factory = session_factory
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._wake = asyncio.Event()
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+    
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        # Sin cancelar la tarea: una cancelación puede perderse dentro de wait_for (Python 3.11) y un
+        # lote a medio escribir en el threadpool seguiría igual. El bucle termina su pasada y sale
+        self._stopping = True
+        self._wake.set()
+        await self._task
+        self._task = None
+        # Lo que siga en la cola se escribe antes de terminar
+        try:
+            await run_in_threadpool(self.flush)
+        except Exception:
+            logger.exception("Error al escribir la auditoría pendiente", extra={"cambios": self.depth})
+    
+    def submit(self, changes: Iterable[dict], actor: Optional[str]) -> None:
+        """Encola los cambios de una transacción confirmada."""
+        registrado_en = datetime.now()
+        rows = [{**change, "actor": actor, "registrado_en": registrado_en} for change in changes]
+        if self._task is None:
+            # Sin escritor en marcha (p. ej. un commit después del stop): en línea
+            self._write_through(rows)
+            return
+        on_loop = threading.get_ident() == self._loop_thread
+        for queued, row in enumerate(rows):
+            try:
+                if on_loop:
+                    self._queue.put_nowait(row)
+                else:
+                    self._queue.put(row, timeout=self.put_timeout)
+            except queue.Full:
+                AUDIT_EVENTS.inc(queued, outcome="queued")
+                rest = rows[queued:]
+                if on_loop:
+                    # Modo async: en el hilo del loop no se puede esperar ni escribir en línea (la base puede
+                    # estar esperando a otra transacción de este mismo loop). Se desborda; la contrapresión
+                    # la aplica wait_for_room antes de la próxima escritura
+                    self._overflow.extend(rest)
+                    AUDIT_EVENTS.inc(len(rest), outcome="overflow")
+                else:
+                    self._write_through(rest)
+                break
+        else:
+            AUDIT_EVENTS.inc(len(rows), outcome="queued")
+        AUDIT_QUEUE_DEPTH.set(self.depth)
+        if self._queue.qsize() >= self.batch_size:
+            self._notify()
+    
+    async def wait_for_room(self) -> None:
+        """Contrapresión antes de empezar una escritura: con la cola llena espera, sin ocupar el loop
+        ni un hilo, a que el escritor libere lugar (como mucho `flush_interval` segundos)."""
+        if not self.capturing or self.depth < self._queue.maxsize:
+            return
+        AUDIT_BACKPRESSURE.inc()
+        self._wake.set()
+        deadline = time.monotonic() + self.flush_interval
+        while self.capturing and self.depth >= self._queue.maxsize and time.monotonic() < deadline:
+            await asyncio.sleep(self.put_timeout)
+    
+    def _notify(self) -> None:
+        if threading.get_ident() == self._loop_thread:
+            self._wake.set()
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._wake.set)
+        except RuntimeError:
+            # Loop ya cerrado: el flush del stop se encarga
+            pass
+    
+    def _write_through(self, rows: List[dict]) -> None:
+        # Corre después del commit: un error aquí no puede deshacer el cambio, así que se registra y sigue
+        try:
+            self.write(rows)
+        except Exception:
+            AUDIT_EVENTS.inc(len(rows), outcome="lost")
+            logger.exception("Error al escribir la auditoría", extra={"cambios": len(rows)})
+            return
+        AUDIT_EVENTS.inc(len(rows), outcome="write_through")
+    
+    def write(self, rows: List[dict]) -> None:
+        with self._session_factory() as session:
+            session.execute(insert(AuditoriaPrestamo), rows)
+            session.commit()
+    
+    def flush(self) -> int:
+        """Escribe todo lo encolado en lotes de `batch_size` y devuelve cuántos cambios escribió."""
+        written = 0
+        with self._flushing:
+            try:
+                while True:
+                    batch, self._failed = self._failed, []
+                    while self._overflow and len(batch) < self.batch_size:
+                        batch.append(self._overflow.popleft())
+                    while len(batch) < self.batch_size:
+                        try:
+                            batch.append(self._queue.get_nowait())
+                        except queue.Empty:
+                            break
+                    if not batch:
+                        break
+                    try:
+                        self.write(batch)
+                    except Exception:
+                        self._failed = batch
+                        raise
+                    written += len(batch)
+                    AUDIT_EVENTS.inc(len(batch), outcome="written")
+            finally:
+                AUDIT_QUEUE_DEPTH.set(self.depth)
+        return written
+    
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await run_in_threadpool(self.flush)
+            except Exception:
+                # Base bloqueada u otro fallo puntual: el lote queda para la próxima pasada
+                logger.exception("Error al escribir la auditoría", extra={"cambios": self.depth})
+
+
+audit_log = AuditLog(
+    maxsize=settings.audit_queue_size,
+    batch_size=settings.audit_batch_size,
+    flush_interval=settings.audit_flush_seconds,
+)
+
+
+def _pending(session: Session) -> List[dict]:
+    return session.info.setdefault("audit_pending", [])
+
+
+def _object_row(obj: Any) -> Dict[str, Any]:
+    # Solo lo que ya está en memoria: cargar un atributo dentro del flush emitiría otra consulta
+    state = inspect(obj)
+    return {attr.key: _json_value(state.dict.get(attr.key)) for attr in state.mapper.column_attrs}
+
+
+def _object_changes(obj: Any) -> Dict[str, tuple]:
+    state = inspect(obj)
+    changes = {}
+    for attr in state.mapper.column_attrs:
+        history = state.attrs[attr.key].history
+        if history.has_changes():
+            antes = history.deleted[0] if history.deleted else None
+            despues = history.added[0] if history.added else None
+            changes[attr.key] = (_json_value(antes), _json_value(despues))
+    return changes
+
+
+@event.listens_for(Session, "after_flush")
+def _capture_flushed_changes(session, flush_context):
+    # En after_flush el historial de cada atributo todavía tiene el valor anterior
+    if not audit_log.capturing:
+        return
+    changes = []
+    for obj in session.new:
+        tabla = getattr(obj, "__tablename__", None)
+        if tabla in AUDITED_TABLES:
+            row = _object_row(obj)
+            changes.append(_change(tabla, ACCION_CREAR, row, None, row))
+    for obj in session.dirty:
+        tabla = getattr(obj, "__tablename__", None)
+        if tabla in AUDITED_TABLES:
+            diff = _object_changes(obj)
+            if diff:
+                changes.append(_change(
+                    tabla,
+                    ACCION_ACTUALIZAR,
+                    _object_row(obj),
+                    {key: antes for key, (antes, _) in diff.items()},
+                    {key: despues for key, (_, despues) in diff.items()},
+                ))
+    for obj in session.deleted:
+        tabla = getattr(obj, "__tablename__", None)
+        if tabla in AUDITED_TABLES:
+            row = _object_row(obj)
+            changes.append(_change(tabla, ACCION_ELIMINAR, row, row, None))
+    if changes:
+        _pending(session).extend(changes)
+
+
+def _rows(connection: Connection, table: Table, where, parameters=None) -> Dict[Any, Dict[str, Any]]:
+    query = select(table).with_for_update()
+    if where is not None:
+        query = query.where(where)
+    rows = connection.execute(query, parameters or {}).mappings()
+    return {row["id"]: {key: _json_value(value) for key, value in row.items()} for row in rows}
+
+
+def _capture_insert(orm_execute_state, table: Table, connection: Connection):
+    returning = {column["name"] for column in orm_execute_state.statement.returning_column_descriptions}
+    result = orm_execute_state.invoke_statement()
+    if "id" in returning:
+        # Los ids salen del RETURNING; se consume el resultado y se devuelve una copia al que lo ejecutó
+        frozen = result.freeze()
+        ids = [row.id for row in frozen()]
+        inserted = _rows(connection, table, table.c.id.in_(ids)).values()
+        result = frozen()
+    else:
+        # Sin RETURNING no hay ids: se audita lo que se pidió insertar
+        parameters = orm_execute_state.parameters
+        inserted = parameters if isinstance(parameters, list) else [parameters or {}]
+        inserted = [{key: _json_value(value) for key, value in row.items()} for row in inserted]
+    _pending(orm_execute_state.session).extend(
+        _change(table.name, ACCION_CREAR, row, None, row) for row in inserted
+    )
+    return result
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _capture_bulk_changes(orm_execute_state):
+    # insert()/update()/delete() no pasan por el flush: se leen las filas afectadas antes y después,
+    # en la misma transacción (y con FOR UPDATE donde existe) para que nadie las cambie entremedio
+    if not audit_log.capturing:
+        return None
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return None
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None or mapper.local_table.name not in AUDITED_TABLES:
+        return None
+    table = mapper.local_table
+    statement = orm_execute_state.statement
+    session = orm_execute_state.session
+    connection = session.connection(bind_arguments={"mapper": mapper, "clause": statement})
+    if orm_execute_state.is_insert:
+        return _capture_insert(orm_execute_state, table, connection)
+    
+    parameters = orm_execute_state.parameters
+    if isinstance(parameters, list):
+        # UPDATE masivo por clave primaria: una fila por diccionario de parámetros
+        antes = _rows(connection, table, table.c.id.in_([row["id"] for row in parameters]))
+    else:
+        antes = _rows(connection, table, statement.whereclause, parameters)
+    result = orm_execute_state.invoke_statement()
+    if not antes:
+        return result
+    
+    if orm_execute_state.is_delete:
+        changes = [_change(table.name, ACCION_ELIMINAR, row, row, None) for row in antes.values()]
+    else:
+        despues = _rows(connection, table, table.c.id.in_(list(antes)))
+        changes = []
+        for row_id, nuevo in despues.items():
+            viejo = antes[row_id]
+            cambiadas = [key for key in nuevo if nuevo[key] != viejo[key]]
+            if cambiadas:
+                changes.append(_change(
+                    table.name,
+                    ACCION_ACTUALIZAR,
+                    nuevo,
+                    {key: viejo[key] for key in cambiadas},
+                    {key: nuevo[key] for key in cambiadas},
+                ))
+    _pending(session).extend(changes)
+    return result
+
+
+@event.listens_for(Session, "after_commit")
+def _submit_committed_changes(session):
+    changes = session.info.pop("audit_pending", None)
+    if changes:
+        audit_log.submit(changes, session.info.get("actor"))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_changes(session):
+    session.info.pop("audit_pending", None)
@@ -0,0 +1,148 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from itertools import chain
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, Optional, Set, Tuple
+from fastapi import Request, Response, status
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.core.serialization import PreEncodedJSONResponse
+from app.repositories.catalog_version_repository import CatalogVersionRepository
+
+if TYPE_CHECKING:
+    # database importa este módulo (changed_at)
+    from app.core.database import Database
+
+# Catálogos invalidados por cada tabla: el catálogo de kits embebe componentes.
+# "students" no tiene respuestas cacheadas; su versión invalida el índice de búsqueda en memoria.
+CATALOG_TABLES: Dict[str, Tuple[str, ...]] = {
+    "componentes": ("components", "kits"),
+    "kits": ("kits",),
+    "kit_componentes": ("kits",),
+    "alumnos": ("students",),
+}
+
+
+class CatalogCache:
+    """Caché en proceso de respuestas ya serializadas, asociadas a la versión de su catálogo.
+    
+    Las versiones viven en la tabla versiones_catalogo y cada escritura sobre una tabla del catálogo
+    incrementa la suya en su misma transacción, así que todos los workers ven el cambio: las entradas
+    y ETags de versiones anteriores dejan de ser válidos en cualquier proceso.
+    """
+    
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # Momento (epoch) del último cambio confirmado en este proceso: una réplica anterior a él serviría datos viejos
+        self.changed_at = 0.0
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[int, bytes, Dict[str, str]]]" = OrderedDict()
+    
+    def mark_changed(self) -> None:
+        self.changed_at = time.time()
+    
+    def etag(self, catalog: str, version: int, key: str) -> str:
+        # Las versiones son persistentes y compartidas: el mismo ETag vale en todos los workers y tras reiniciar
+        digest = hashlib.blake2b(key.encode(), digest_size=8).hexdigest()
+        return f'"{catalog}-{version}-{digest}"'
+    
+    def get(self, catalog: str, key: str, version: int) -> Optional[Tuple[bytes, Dict[str, str]]]:
+        with self._lock:
+            entry = self._entries.get((catalog, key))
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end((catalog, key))
+            return entry[1], entry[2]
+    
+    def put(self, catalog: str, key: str, version: int, body: bytes, headers: Dict[str, str]) -> None:
+        with self._lock:
+            # Una request que leyó una versión anterior no pisa la entrada de otra más nueva
+            current = self._entries.get((catalog, key))
+            if current is not None and current[0] > version:
+                return
+            self._entries[(catalog, key)] = (version, body, headers)
+            self._entries.move_to_end((catalog, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+catalog_cache = CatalogCache()
+
+
+def _if_none_match(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = {value.strip().removeprefix("W/") for value in header.split(",")}
+    # "*" no cuenta: es para escrituras condicionales y aquí daría 304 sin saber si el recurso existe
+    return etag in candidates
+
+
+async def cached_catalog_response(
+    request: Request,
+    db: "Database",
+    catalog: str,
+    produce: Callable[[], Awaitable[Tuple[bytes, Dict[str, str]]]],
+) -> Response:
+    # Una lectura por clave primaria: la versión es la de la base, no la de este proceso
+    version = await db.run(lambda session: CatalogVersionRepository(session).get(catalog))
+    key = f"{request.url.path}?{request.url.query}"
+    etag = catalog_cache.etag(catalog, version, key)
+    if _if_none_match(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    
+    cached = catalog_cache.get(catalog, key, version)
+    if cached is None:
+        body, headers = await produce()
+        catalog_cache.put(catalog, key, version, body, headers)
+    else:
+        body, headers = cached
+    return PreEncodedJSONResponse(content=body, headers={**headers, "ETag": etag, "Cache-Control": "no-cache"})
+
+
+def _mark_writes(session: Session, tables) -> None:
+    catalogs: Set[str] = session.info.setdefault("catalog_writes", set())
+    for table in tables:
+        catalogs.update(CATALOG_TABLES.get(table, ()))
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flushed_writes(session, flush_context):
+    _mark_writes(
+        session,
+        {getattr(obj, "__tablename__", None) for obj in chain(session.new, session.dirty, session.deleted)},
+    )
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_bulk_writes(orm_execute_state):
+    # insert()/update()/delete() y query.delete() sobre entidades no pasan por el flush
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None:
+            _mark_writes(orm_execute_state.session, {mapper.local_table.name})
+
+
+@event.listens_for(Session, "before_commit")
+def _bump_catalog_versions(session):
+    # El flush final del commit viene después de este evento: se adelanta para marcar lo pendiente
+    session.flush()
+    catalogs = session.info.get("catalog_writes")
+    if catalogs:
+        CatalogVersionRepository(session).bump(catalogs)
+
+
+@event.listens_for(Session, "after_commit")
+def _mark_committed_catalogs(session):
+    if session.info.pop("catalog_writes", None):
+        catalog_cache.mark_changed()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_catalog_writes(session):
+    session.info.pop("catalog_writes", None)
\ No newline at end of file
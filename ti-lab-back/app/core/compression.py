@@ -0,0 +1,33 @@
+from starlette.datastructures import MutableHeaders
+from starlette.middleware.gzip import GZipMiddleware
+
+# Nivel por defecto de zlib: casi la misma compresión que 9 (el de Starlette) con bastante menos CPU
+COMPRESS_LEVEL = 6
+
+
+class CompressionMiddleware:
+    """GZip negociado con Accept-Encoding para respuestas de al menos `minimum_size` bytes.
+    
+    Sobre el GZipMiddleware de Starlette (también comprime por partes las respuestas en streaming).
+    El ETag de una respuesta comprimida pasa a débil: el cuerpo ya no es el mismo byte a byte y el
+    mismo ETag fuerte no puede nombrar dos representaciones. If-None-Match ignora el W/, así que
+    la revalidación (304) sigue funcionando igual.
+    """
+    
+    def __init__(self, app, minimum_size: int):
+        self.app = GZipMiddleware(app, minimum_size=minimum_size, compresslevel=COMPRESS_LEVEL)
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        async def send_with_weak_etag(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/") and headers.get("content-encoding") == "gzip":
+                    headers["etag"] = f"W/{etag}"
+            await send(message)
+        
+        await self.app(scope, receive, send_with_weak_etag)
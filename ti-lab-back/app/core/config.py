@@ -1,5 +1,38 @@
 import os
 from pydantic import BaseModel
+from typing import Dict, Union
+
+
+class EngineProfile(BaseModel):
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: float = 30.0
+    pool_recycle: int = -1
+    pool_pre_ping: bool = False
+    # PRAGMAs aplicados en cada conexión nueva (solo SQLite)
+    sqlite_pragmas: Dict[str, Union[str, int]] = {}
+
+
+ENGINE_PROFILES: Dict[str, EngineProfile] = {
+    "default": EngineProfile(),
+    "sqlite-wal": EngineProfile(
+        sqlite_pragmas={
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "cache_size": -64000,
+            "mmap_size": 268435456,
+            "busy_timeout": 5000,
+            "temp_store": "MEMORY",
+        }
+    ),
+    "postgres": EngineProfile(
+        pool_size=20,
+        max_overflow=10,
+        pool_timeout=10.0,
+        pool_recycle=1800,
+        pool_pre_ping=True,
+    ),
+}
 
 
 class Settings(BaseModel):
@@ -8,6 +41,51 @@ class Settings(BaseModel):
     version: str = "1.0.0"
     
     database_url: str = os.getenv("DATABASE_URL", "sqlite:///./ti_lab.db")
+    # Réplica de lectura opcional: las requests GET leen de ella si está al día
+    database_read_url: str = os.getenv("DATABASE_READ_URL", "")
+    # Con más retraso que esto (o sin poder medirlo) las lecturas vuelven a la primaria
+    replica_max_lag_seconds: float = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+    # "sync": Session en el threadpool de anyio; "async": AsyncSession (aiosqlite/asyncpg)
+    database_mode: str = os.getenv("DATABASE_MODE", "sync")
+    # Vacío: "sqlite-wal" para SQLite y "postgres" para el resto
+    engine_profile: str = os.getenv("ENGINE_PROFILE", "")
+    
+    enforce_query_budget: bool = os.getenv("ENFORCE_QUERY_BUDGET", "False").lower() == "true"
+    
+    # Histogramas por ruta y tiempo en base de datos, expuestos en /metrics
+    metrics_enabled: bool = os.getenv("METRICS_ENABLED", "True").lower() == "true"
+    # DEBUG | INFO | WARNING | ... | OFF; formato "json" o "text"
+    log_level: str = os.getenv("LOG_LEVEL", "INFO")
+    log_format: str = os.getenv("LOG_FORMAT", "json")
+    
+    # Plazo por defecto de un préstamo sin fecha_limite explícita (0: sin plazo)
+    loan_due_hours: float = float(os.getenv("LOAN_DUE_HOURS", "0"))
+    # Máxima espera entre pasadas del marcado de vencidos (0 lo desactiva)
+    overdue_check_seconds: float = float(os.getenv("OVERDUE_CHECK_SECONDS", "60"))
+    # Respuestas desde este tamaño van comprimidas con gzip si el cliente lo acepta (0 lo desactiva)
+    gzip_min_bytes: int = int(os.getenv("GZIP_MIN_BYTES", "1024"))
+    # Auditoría de préstamos: cola en memoria escrita por lotes en segundo plano
+    audit_enabled: bool = os.getenv("AUDIT_ENABLED", "True").lower() == "true"
+    # Cambios en cola como máximo; con la cola llena, las requests de escritura esperan lugar
+    audit_queue_size: int = int(os.getenv("AUDIT_QUEUE_SIZE", "10000"))
+    audit_batch_size: int = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+    # Máxima espera antes de escribir un lote incompleto
+    audit_flush_seconds: float = float(os.getenv("AUDIT_FLUSH_SECONDS", "1"))
+    # Cuánto se guarda la respuesta de una escritura con Idempotency-Key para repetirla
+    idempotency_ttl_seconds: float = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+    # Respuestas guardadas que además se mantienen en memoria (LRU) delante de la tabla
+    idempotency_cache_size: int = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "1024"))
+    # Al arrancar: configura los mappers, abre las conexiones del pool y compila las consultas frecuentes
+    startup_warmup: bool = os.getenv("STARTUP_WARMUP", "True").lower() == "true"
+    
+    @property
+    def engine_profile_name(self) -> str:
+        return self.engine_profile or ("sqlite-wal" if self.database_url.startswith("sqlite") else "postgres")
+    
+    def get_engine_profile(self) -> EngineProfile:
+        if self.engine_profile_name not in ENGINE_PROFILES:
+            raise ValueError(f"Unknown engine profile: {self.engine_profile_name}")
+        return ENGINE_PROFILES[self.engine_profile_name]
 
 
 settings = Settings()
\ No newline at end of file
@@ -1,19 +1,282 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from app.core.config import settings
+import asyncio
+import weakref
+from fastapi import Request
+from typing import Any, AsyncIterator, Callable, Optional, TypeVar
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool
+from starlette.concurrency import run_in_threadpool
+from app.core.audit import ACTOR_HEADER, audit_log
+from app.core.catalog_cache import catalog_cache
+from app.core.config import EngineProfile, settings
+from app.core.metrics import install_sql_metrics
+from app.core.pool_metrics import MeteredAsyncQueuePool, MeteredQueuePool
+from app.core.query_budget import install_query_counter
+from app.core.replica import LAST_WRITE_COOKIE, SAFE_METHODS, ReplicaMonitor, RoutingSession, last_write_from_cookie
+from app.core.retry import DB_RETRIES, ConcurrencyConflict, is_retryable, retry_policy_of
 from app.models.base import Base
 
-engine = create_engine(
-    settings.database_url, 
-    connect_args={"check_same_thread": False} if "sqlite" in settings.database_url else {}
-)
+T = TypeVar("T")
+
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+
+
+def engine_options(database_url: str, profile: EngineProfile, asynchronous: bool = False) -> dict:
+    url = make_url(database_url)
+    options = {}
+    if url.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+        if url.database in (None, "", ":memory:"):
+            # SQLite en memoria usa un pool de una sola conexión; no se dimensiona
+            return options
+    options.update(
+        poolclass=MeteredAsyncQueuePool if asynchronous else MeteredQueuePool,
+        pool_size=profile.pool_size,
+        max_overflow=profile.max_overflow,
+        pool_timeout=profile.pool_timeout,
+        pool_recycle=profile.pool_recycle,
+        pool_pre_ping=profile.pool_pre_ping,
+    )
+    return options
+
+
+def apply_sqlite_pragmas(engine: Engine, pragmas: dict) -> None:
+    if not pragmas or engine.dialect.name != "sqlite":
+        return
+    
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+engine_profile = settings.get_engine_profile()
+
+
+def instrument_engine(engine: Engine) -> None:
+    apply_sqlite_pragmas(engine, engine_profile.sqlite_pragmas)
+    install_query_counter(engine)
+    if settings.metrics_enabled:
+        install_sql_metrics(engine)
+
+
+engine = create_engine(settings.database_url, **engine_options(settings.database_url, engine_profile))
+instrument_engine(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+read_engine: Optional[Engine] = None
+ReadSessionLocal: Optional[sessionmaker] = None
+replica_monitor: Optional[ReplicaMonitor] = None
+
+if settings.database_read_url:
+    read_engine = create_engine(settings.database_read_url, **engine_options(settings.database_read_url, engine_profile))
+    instrument_engine(read_engine)
+    ReadSessionLocal = sessionmaker(
+        class_=RoutingSession, autocommit=False, autoflush=False, bind=engine, info={"replica": read_engine}
+    )
+    replica_monitor = ReplicaMonitor(read_engine, settings.replica_max_lag_seconds)
+
+
+class SessionSlots:
+    """Admite como mucho `size` sesiones sync abiertas a la vez (la capacidad del pool).
+    
+    Una sesión sync guarda su conexión entre llamadas al threadpool. Si hay más requests con sesión
+    que conexiones, los hilos del threadpool se quedan bloqueados esperando una conexión que solo
+    soltarán requests que a su vez esperan un hilo libre (hasta el pool_timeout). La espera aquí es
+    async y ocurre antes de abrir la sesión, así que no ocupa ni hilos ni conexiones.
+    """
+    
+    def __init__(self, size: Optional[int]):
+        self.size = size
+        # Un semáforo por event loop: asyncio.Semaphore queda ligado al loop donde se usa
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+    
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.size)
+        return semaphore
+    
+    async def __aenter__(self) -> None:
+        if self.size is not None:
+            await self._semaphore().acquire()
+    
+    async def __aexit__(self, *exc_info: Any) -> None:
+        if self.size is not None:
+            self._semaphore().release()
+
+
+session_slots = SessionSlots(engine_profile.pool_size + engine_profile.max_overflow if isinstance(engine.pool, QueuePool) else None)
+
+
+def to_async_url(database_url: str) -> str:
+    url = make_url(database_url)
+    if "+" in url.drivername:
+        return database_url
+    return url.set(drivername=ASYNC_DRIVERS.get(url.drivername, url.drivername)).render_as_string(hide_password=False)
+
+
+def create_instrumented_async_engine(database_url: str) -> AsyncEngine:
+    async_url = to_async_url(database_url)
+    async_engine = create_async_engine(async_url, **engine_options(async_url, engine_profile, asynchronous=True))
+    instrument_engine(async_engine.sync_engine)
+    return async_engine
+
+
+async_engine: Optional[AsyncEngine] = None
+AsyncSessionLocal: Optional[async_sessionmaker] = None
+async_read_engine: Optional[AsyncEngine] = None
+AsyncReadSessionLocal: Optional[async_sessionmaker] = None
+
+if settings.database_mode == "async":
+    async_engine = create_instrumented_async_engine(settings.database_url)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False)
+    if settings.database_read_url:
+        async_read_engine = create_instrumented_async_engine(settings.database_read_url)
+        AsyncReadSessionLocal = async_sessionmaker(
+            async_engine, sync_session_class=RoutingSession, autoflush=False, info={"replica": async_read_engine.sync_engine}
+        )
+
 
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+class Database:
+    """Punto de entrada de los routers async a la base de datos.
+    
+    Los repositorios y servicios se escriben una sola vez en estilo síncrono; aquí se ejecutan
+    sobre una Session en el threadpool (modo "sync") o sobre AsyncSession.run_sync (modo "async"),
+    que corre el mismo código en un greenlet sin ocupar hilos del pool.
+    """
+    
+    def __init__(self, session: Any, actor: Optional[str] = None):
+        self.session = session
+        self.is_async = isinstance(session, AsyncSession)
+        # Quién hace los cambios de esta sesión, para la auditoría
+        session.info["actor"] = actor
+    
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        if self.is_async:
+            return await self.session.run_sync(fn, *args, **kwargs)
+        return await run_in_threadpool(fn, self.session, *args, **kwargs)
+    
+    def service(self, service_class: Callable[[Session], Any]) -> "ServiceProxy":
+        return ServiceProxy(self, service_class)
+    
+    async def rollback(self) -> None:
+        if self.is_async:
+            await self.session.rollback()
+        else:
+            await run_in_threadpool(self.session.rollback)
+    
+    async def close(self) -> None:
+        if self.is_async:
+            await self.session.close()
+        else:
+            await run_in_threadpool(self.session.close)
+
+
+class ServiceProxy:
+    """Expone los métodos de un servicio síncrono como corrutinas."""
+    
+    def __init__(self, database: Database, service_class: Callable[[Session], Any]):
+        self._database = database
+        self._service_class = service_class
+    
+    def __getattr__(self, name: str) -> Callable[..., Any]:
+        policy = retry_policy_of(getattr(self._service_class, name, None))
+        
+        async def call(*args: Any, **kwargs: Any) -> Any:
+            return await self._database.run(
+                lambda session: getattr(self._service_class(session), name)(*args, **kwargs)
+            )
+        
+        if policy is None:
+            return call
+        
+        async def call_with_retries(*args: Any, **kwargs: Any) -> Any:
+            # Métodos marcados con @retry_on_conflict: cada intento empieza de cero tras un rollback
+            for attempt in range(policy.attempts):
+                try:
+                    return await call(*args, **kwargs)
+                except Exception as exc:
+                    if not is_retryable(exc):
+                        raise
+                    await self._database.rollback()
+                    if attempt == policy.attempts - 1:
+                        raise ConcurrencyConflict(f"Concurrent update conflict after {policy.attempts} attempts") from exc
+                    DB_RETRIES.inc(operation=f"{self._service_class.__name__}.{name}")
+                    await asyncio.sleep(policy.delay(attempt))
+        
+        return call_with_retries
+
+
+def warm_up_pool(engine: Engine, connections: int) -> int:
+    """Abre `connections` conexiones a la vez y las devuelve al pool, que las conserva abiertas
+    (con los PRAGMA ya aplicados) para las primeras requests."""
+    if not isinstance(engine.pool, QueuePool):
+        return 0
+    opened = [engine.connect() for _ in range(connections)]
+    for connection in opened:
+        connection.close()
+    return len(opened)
+
+
+async def warm_up_async_pool(engine: AsyncEngine, connections: int) -> int:
+    if not isinstance(engine.pool, QueuePool):
+        return 0
+    opened = await asyncio.gather(*(engine.connect() for _ in range(connections)))
+    await asyncio.gather(*(connection.close() for connection in opened))
+    return len(opened)
+
+
+async def use_replica(request: Request) -> bool:
+    """Las lecturas (GET/HEAD) van a la réplica si está al día con la última escritura del cliente
+    (cookie) y con el último cambio del catálogo en este proceso, cuyas respuestas se cachean."""
+    if replica_monitor is None or request.method not in SAFE_METHODS:
+        return False
+    await replica_monitor.ensure_fresh()
+    last_write = last_write_from_cookie(request.cookies.get(LAST_WRITE_COOKIE))
+    return replica_monitor.serves(max(last_write, catalog_cache.changed_at))
+
+
+def session_factory(replica: bool) -> Callable[[], Session]:
+    """Fábrica de sesiones sync para quien abre la suya (p. ej. respuestas que se transmiten por partes)."""
+    return ReadSessionLocal if replica else SessionLocal
+
+
+async def get_database(request: Request) -> AsyncIterator[Database]:
+    replica = await use_replica(request)
+    if request.method not in SAFE_METHODS:
+        await audit_log.wait_for_room()
+    if AsyncSessionLocal is not None:
+        database = Database((AsyncReadSessionLocal if replica else AsyncSessionLocal)(), request.headers.get(ACTOR_HEADER))
+        try:
+            yield database
+        finally:
+            await database.close()
+        return
+    
+    async with session_slots:
+        database = Database(session_factory(replica)(), request.headers.get(ACTOR_HEADER))
+        try:
+            yield database
+        finally:
+            await database.close()
\ No newline at end of file
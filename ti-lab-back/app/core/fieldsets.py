@@ -0,0 +1,92 @@
+from typing import Callable, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple, Type
+from fastapi import HTTPException, Query, status
+from pydantic import BaseModel
+
+
+class FieldSet(NamedTuple):
+    """Campos pedidos con ?fields= y objetos embebidos pedidos con ?expand=.
+    
+    None en cualquiera de los dos significa "todos": sin parámetros la respuesta es la completa de siempre.
+    """
+    fields: Optional[FrozenSet[str]] = None
+    expand: Optional[FrozenSet[str]] = None
+    
+    @property
+    def full(self) -> bool:
+        return self.fields is None and self.expand is None
+    
+    def includes(self, field: str) -> bool:
+        return self.fields is None or field in self.fields
+    
+    def expands(self, path: str) -> bool:
+        return self.expand is None or path in self.expand
+    
+    def prune(self, rows: List[dict]) -> List[dict]:
+        # Quita las columnas que se leyeron solo para el cursor
+        if self.fields is None:
+            return rows
+        return [{key: value for key, value in row.items() if key in self.fields} for row in rows]
+
+
+FULL = FieldSet()
+
+
+def _names(value: Optional[str], allowed: Iterable[str], param: str) -> Optional[FrozenSet[str]]:
+    if value is None:
+        return None
+    names = frozenset(name.strip() for name in value.split(",") if name.strip())
+    unknown = names.difference(allowed)
+    if unknown:
+        raise ValueError(f"Unknown {param}: {', '.join(sorted(unknown))}")
+    return names
+
+
+def _prefixes(path: str) -> List[str]:
+    parts = path.split(".")
+    return [".".join(parts[:depth]) for depth in range(1, len(parts) + 1)]
+
+
+class FieldSetSpec:
+    """Campos y expansiones válidos de un recurso.
+    
+    Los campos son los de primer nivel del schema (las listas anidadas, como `componentes`, también);
+    las expansiones son rutas a los objetos embebidos dentro de ellas, p. ej. "componentes.componente".
+    """
+    
+    def __init__(self, schema: Type[BaseModel], expand: Tuple[str, ...] = ()):
+        self.fields = tuple(schema.model_fields)
+        self.expand = expand
+    
+    def parse(self, fields: Optional[str], expand: Optional[str]) -> FieldSet:
+        names = _names(fields, self.fields, "fields")
+        expanded = _names(expand, self.expand, "expand")
+        if expanded:
+            # Expandir "a.b.c" expande también "a.b" y pide el campo "a"
+            expanded = frozenset(
+                prefix
+                for path in expanded
+                for prefix in _prefixes(path)
+                if prefix in self.expand
+            )
+            if names is not None:
+                names |= {path.split(".", 1)[0] for path in expanded}
+        if names is not None:
+            # El id siempre va: sin él la respuesta no se puede asociar a nada
+            names |= {"id"}
+        return FieldSet(names, expanded)
+    
+    def dependency(self) -> Callable[..., FieldSet]:
+        """Dependencia de FastAPI que lee ?fields= y ?expand= (400 si nombran algo desconocido)."""
+        
+        def fieldset(
+            fields: Optional[str] = Query(None, description=f"Separados por comas, de: {', '.join(self.fields)}"),
+            expand: Optional[str] = Query(
+                None, description=f"Separados por comas, de: {', '.join(self.expand)}. Vacío: ninguno"
+            ),
+        ) -> FieldSet:
+            try:
+                return self.parse(fields, expand)
+            except ValueError as e:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        
+        return fieldset
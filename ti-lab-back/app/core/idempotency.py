@@ -0,0 +1,315 @@
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, NamedTuple, Optional
+from fastapi import HTTPException, Request, Response, status
+from fastapi.responses import JSONResponse
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import Database
+from app.core.metrics import Counter, registry
+from app.core.serialization import PreEncodedJSONResponse
+from app.repositories.idempotency_repository import IdempotencyRepository
+
+# Cabecera con la que el cliente marca los reintentos de una misma escritura
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+# Presente en las respuestas repetidas, no ejecutadas
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+# Vigencia de la reserva mientras corre la primera request: si el proceso muere, la clave se libera sola
+PENDING_SECONDS = 60.0
+# Cada cuánto se vuelve a mirar una clave que está ejecutando otro proceso
+POLL_SECONDS = 0.05
+# Como mucho un borrado de claves vencidas por intervalo
+PURGE_SECONDS = 60.0
+
+IDEMPOTENCY_REQUESTS = registry.register(Counter(
+    "idempotency_requests_total",
+    "Escrituras con Idempotency-Key: ejecutadas, repetidas desde memoria o desde la tabla, que esperaron a la "
+    "original en curso, rechazadas (la misma clave con otra request) o perdidas (aplicada sin respuesta guardada)",
+    ("outcome",),
+))
+
+
+class StoredResponse(NamedTuple):
+    huella: str
+    status_code: int
+    cuerpo: bytes
+    expira_en: datetime
+
+
+class InFlight(NamedTuple):
+    huella: str
+    future: "asyncio.Future[None]"
+
+
+class Execution:
+    """Clave cuya request se está ejecutando en este contexto; `applied` pasa a True cuando una
+    escritura suya se confirmó (y con ella la reserva extendida hasta `expira_en`)."""
+    
+    def __init__(self, key: str, expira_en: datetime):
+        self.key = key
+        self.expira_en = expira_en
+        self.applied = False
+
+
+# Los hilos del threadpool y AsyncSession.run_sync corren con una copia de este contexto
+_execution: ContextVar[Optional[Execution]] = ContextVar("idempotency_execution", default=None)
+
+
+class IdempotencyStore:
+    """LRU en proceso de respuestas guardadas, delante de la tabla claves_idempotencia, y registro de
+    las claves que se están ejecutando en este proceso para que los duplicados esperen a la original.
+    
+    La tabla es la fuente de verdad (la comparten los procesos); la memoria solo evita leerla en los
+    reintentos que llegan al mismo proceso.
+    """
+    
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, StoredResponse]" = OrderedDict()
+        self._in_flight: Dict[str, InFlight] = {}
+        self._purged_at = 0.0
+    
+    def get(self, key: str) -> Optional[StoredResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expira_en <= datetime.now():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+    
+    def put(self, key: str, entry: StoredResponse) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def in_flight(self, key: str) -> Optional[InFlight]:
+        return self._in_flight.get(key)
+    
+    def begin(self, key: str, huella: str) -> InFlight:
+        # Sin await entre el chequeo de in_flight y esto: en el event loop nadie se cuela en el medio
+        entry = InFlight(huella, asyncio.get_running_loop().create_future())
+        self._in_flight[key] = entry
+        return entry
+    
+    def end(self, key: str, entry: InFlight) -> None:
+        if self._in_flight.get(key) is entry:
+            del self._in_flight[key]
+        if not entry.future.done():
+            entry.future.set_result(None)
+    
+    def purge_due(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            if now - self._purged_at < PURGE_SECONDS:
+                return False
+            self._purged_at = now
+            return True
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+idempotency_store = IdempotencyStore(settings.idempotency_ttl_seconds, settings.idempotency_cache_size)
+
+
+def fingerprint(method: str, path: str, body: bytes) -> str:
+    digest = hashlib.sha256(f"{method} {path}\n".encode())
+    digest.update(body)
+    return digest.hexdigest()
+
+
+def _storable(status_code: int) -> bool:
+    # Un 409 (conflicto que agotó los reintentos) o un 5xx son transitorios: el reintento debe ejecutarse
+    return status_code < 500 and status_code != status.HTTP_409_CONFLICT
+
+
+def _check_fingerprint(original: str, huella: str) -> None:
+    if original != huella:
+        IDEMPOTENCY_REQUESTS.inc(outcome="mismatch")
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"{IDEMPOTENCY_HEADER} was already used with a different request"
+        )
+
+
+def _replay(entry: StoredResponse, huella: str, outcome: str) -> Response:
+    _check_fingerprint(entry.huella, huella)
+    IDEMPOTENCY_REQUESTS.inc(outcome=outcome)
+    return PreEncodedJSONResponse(
+        content=entry.cuerpo, status_code=entry.status_code, headers={REPLAYED_HEADER: "true"}
+    )
+
+
+async def _claim(db: Database, key: str, huella: str) -> Optional[StoredResponse]:
+    """Reserva la clave en la tabla (None) o devuelve la respuesta que guardó otro proceso, esperando
+    mientras ese proceso todavía la está ejecutando.
+    
+    Una reserva pendiente con más de PENDING_SECONDS solo puede ser una cuya escritura se confirmó
+    sin que se guardara la respuesta (las demás vencen antes): responde 409 en vez de ejecutarla otra vez.
+    """
+    if idempotency_store.purge_due():
+        await db.run(lambda session: IdempotencyRepository(session).purge(datetime.now()))
+    waited = False
+    while True:
+        ahora = datetime.now()
+        row = await db.run(lambda session: IdempotencyRepository(session).claim(
+            key, huella, ahora, ahora + timedelta(seconds=PENDING_SECONDS)
+        ))
+        if row is None:
+            return None
+        entry = StoredResponse(row["huella"], row["status_code"], row["cuerpo"], row["expira_en"])
+        if entry.status_code is not None:
+            return entry
+        _check_fingerprint(entry.huella, huella)
+        if row["creada_en"] + timedelta(seconds=PENDING_SECONDS) <= ahora:
+            IDEMPOTENCY_REQUESTS.inc(outcome="lost")
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"The request with this {IDEMPOTENCY_HEADER} was applied but its response was not saved"
+            )
+        if not waited:
+            IDEMPOTENCY_REQUESTS.inc(outcome="waited")
+            waited = True
+        await asyncio.sleep(POLL_SECONDS)
+
+
+async def _produce(execution: Execution, produce: Callable[[], Awaitable[Response]]) -> Response:
+    token = _execution.set(execution)
+    try:
+        return await produce()
+    finally:
+        _execution.reset(token)
+
+
+async def _execute(db: Database, key: str, huella: str, produce: Callable[[], Awaitable[Response]]) -> Response:
+    """Ejecuta la request y guarda su respuesta.
+    
+    La respuesta se guarda en su propia transacción, después de la de la escritura; lo que sí va en la
+    transacción de la escritura es hold(): si el proceso muere entre los dos commits, la reserva no
+    vence a los PENDING_SECONDS y los reintentos reciben 409 (ver _claim) en vez de repetir el préstamo.
+    """
+    execution = Execution(key, datetime.now() + idempotency_store.ttl)
+    try:
+        response = await _produce(execution, produce)
+    except HTTPException as exc:
+        # Los 4xx también se guardan: el reintento recibe el mismo rechazo sin volver a validar
+        response = JSONResponse({"detail": exc.detail}, status_code=exc.status_code, headers=exc.headers)
+    except Exception:
+        # Con la escritura ya confirmada la clave queda retenida: un reintento no debe repetirla
+        if not execution.applied:
+            await db.run(lambda session: IdempotencyRepository(session).release(key))
+        raise
+    
+    if not _storable(response.status_code) and not execution.applied:
+        await db.run(lambda session: IdempotencyRepository(session).release(key))
+        return response
+    entry = StoredResponse(huella, response.status_code, bytes(response.body), execution.expira_en)
+    await db.run(lambda session: IdempotencyRepository(session).complete(
+        key, entry.status_code, entry.cuerpo, entry.expira_en
+    ))
+    idempotency_store.put(key, entry)
+    IDEMPOTENCY_REQUESTS.inc(outcome="executed")
+    return response
+
+
+async def idempotent_response(
+    request: Request,
+    db: Database,
+    key: Optional[str],
+    produce: Callable[[], Awaitable[Response]],
+) -> Response:
+    """Ejecuta `produce` una sola vez por Idempotency-Key y repite su respuesta en los reintentos.
+    
+    Sin cabecera es solo `produce()`. Con ella: una respuesta guardada (en memoria o en la tabla) se
+    devuelve tal cual, sin tocar las tablas de préstamos; si la misma clave se está ejecutando en este
+    proceso se espera a esa ejecución, y en otro proceso se espera a que guarde su respuesta. Se guardan
+    los 2xx y 4xx; si la original falla de otra forma la clave se libera y el reintento se ejecuta.
+    """
+    if key is None:
+        return await produce()
+    if not key.strip() or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{IDEMPOTENCY_HEADER} must have between 1 and {MAX_KEY_LENGTH} characters"
+        )
+    huella = fingerprint(request.method, request.url.path, await request.body())
+    while True:
+        entry = idempotency_store.get(key)
+        if entry is not None:
+            return _replay(entry, huella, "memory")
+        running = idempotency_store.in_flight(key)
+        if running is None:
+            break
+        _check_fingerprint(running.huella, huella)
+        IDEMPOTENCY_REQUESTS.inc(outcome="waited")
+        # shield: si el cliente de este duplicado se desconecta, la original sigue su curso
+        await asyncio.shield(running.future)
+        # Terminada la original: su respuesta ya está en memoria o, si no se guardó, esta la ejecuta
+    
+    running = idempotency_store.begin(key, huella)
+    try:
+        entry = await _claim(db, key, huella)
+        if entry is not None:
+            idempotency_store.put(key, entry)
+            return _replay(entry, huella, "table")
+        return await _execute(db, key, huella, produce)
+    finally:
+        idempotency_store.end(key, running)
+
+
+def _mark_write(session: Session) -> None:
+    if _execution.get() is not None:
+        session.info["idempotent_write"] = True
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flushed_writes(session, flush_context):
+    if session.new or session.dirty or session.deleted:
+        _mark_write(session)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_bulk_writes(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        _mark_write(orm_execute_state.session)
+
+
+@event.listens_for(Session, "before_commit")
+def _hold_in_write_transaction(session):
+    execution = _execution.get()
+    if execution is None:
+        return
+    # El flush final del commit viene después de este evento: se adelanta para ver lo pendiente
+    session.flush()
+    if session.info.pop("idempotent_write", False):
+        IdempotencyRepository(session).hold(execution.key, execution.expira_en)
+        session.info["idempotency_held"] = execution
+
+
+@event.listens_for(Session, "after_commit")
+def _mark_applied(session):
+    session.info.pop("idempotent_write", None)
+    execution = session.info.pop("idempotency_held", None)
+    if execution is not None:
+        execution.applied = True
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_write_marks(session):
+    session.info.pop("idempotent_write", None)
+    session.info.pop("idempotency_held", None)
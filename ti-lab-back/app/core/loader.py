@@ -0,0 +1,64 @@
+from typing import Callable, Dict, Generic, Hashable, Iterable, Optional, Set, TypeVar
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class Loader(Generic[K, V]):
+    """Agrupa búsquedas por id al estilo DataLoader, para los servicios (síncronos).
+    
+    `prime` anota ids sin consultar nada; el primer `load`/`load_many` resuelve todos los pendientes
+    con una sola llamada a `batch` (un `IN (...)`) y memoiza el resultado, incluidos los que no
+    existen. Los siguientes pedidos de esos ids no vuelven a la base.
+    """
+    
+    def __init__(self, batch: Callable[[Set[K]], Dict[K, V]]):
+        self._batch = batch
+        self._cache: Dict[K, Optional[V]] = {}
+        self._pending: Set[K] = set()
+    
+    def prime(self, keys: Iterable[K]) -> None:
+        self._pending.update(key for key in keys if key not in self._cache)
+    
+    def dispatch(self) -> None:
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, set()
+        found = self._batch(pending)
+        for key in pending:
+            self._cache[key] = found.get(key)
+    
+    def load(self, key: K) -> Optional[V]:
+        self.prime((key,))
+        self.dispatch()
+        return self._cache[key]
+    
+    def load_many(self, keys: Iterable[K]) -> Dict[K, V]:
+        """{id: valor} de los que existen; los que no, simplemente no aparecen."""
+        keys = set(keys)
+        self.prime(keys)
+        self.dispatch()
+        return {key: self._cache[key] for key in keys if self._cache[key] is not None}
+    
+    def clear(self) -> None:
+        self._cache.clear()
+        self._pending.clear()
+
+
+def request_loader(db: Session, name: str, batch: Callable[[Set[K]], Dict[K, V]]) -> Loader[K, V]:
+    """Loader `name` de la sesión: cada request tiene su propia sesión, así que todos los servicios
+    de una misma request comparten el loader y su memo."""
+    loaders: Dict[str, Loader] = db.info.setdefault("loaders", {})
+    if name not in loaders:
+        loaders[name] = Loader(batch)
+    return loaders[name]
+
+
+@event.listens_for(Session, "after_rollback")
+def _clear_loaders(session):
+    # Tras un rollback (p. ej. antes de reintentar un conflicto) lo memoizado puede no valer y las
+    # entidades quedan expiradas: recargarlas de a una costaría una consulta por id
+    for loader in session.info.get("loaders", {}).values():
+        loader.clear()
@@ -0,0 +1,56 @@
+import base64
+import binascii
+import json
+from fastapi import Path
+from typing import Annotated, Any, List
+
+# Cabecera con el cursor opaco de la siguiente página (paginación por keyset)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# Ids por request en las búsquedas múltiples (?ids=): todos van en un mismo IN
+MAX_IDS = 100
+# Los ids son INTEGER de 64 bits: uno más grande no llega a la base (el driver fallaría con OverflowError)
+MAX_ID = 2 ** 63 - 1
+# OFFSET también llega al driver como entero de 64 bits
+MAX_SKIP = MAX_ID
+# Id en la ruta (/{id}): fuera de rango es un 422, como cualquier parámetro inválido
+PathId = Annotated[int, Path(gt=0, le=MAX_ID)]
+
+
+def encode_cursor(values: List[Any]) -> str:
+    raw = json.dumps(values, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def valid_id(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool) and 0 < value <= MAX_ID
+
+
+def decode_id_cursor(cursor: str) -> int:
+    (value,) = decode_cursor(cursor, 1)
+    if not valid_id(value):
+        raise ValueError("Invalid cursor")
+    return value
+
+
+def parse_ids(value: str, max_ids: int = MAX_IDS) -> List[int]:
+    """Ids de ?ids=1,2,3 en el orden recibido y sin repetir."""
+    try:
+        ids = list(dict.fromkeys(int(part) for part in value.split(",") if part.strip()))
+    except ValueError:
+        raise ValueError("Invalid ids")
+    if not all(map(valid_id, ids)):
+        raise ValueError("Invalid ids")
+    if len(ids) > max_ids:
+        raise ValueError(f"At most {max_ids} ids per request")
+    return ids
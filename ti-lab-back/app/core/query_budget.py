@@ -0,0 +1,68 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.core.config import settings
+
+
+class QueryBudgetExceeded(RuntimeError):
+    def __init__(self, budget: int, statements: List[str]):
+        self.budget = budget
+        self.statements = statements
+        super().__init__(
+            f"Query budget exceeded: {len(statements)} queries executed, budget is {budget}"
+        )
+
+
+class QueryCounter:
+    def __init__(self, budget: Optional[int] = None):
+        self.budget = budget
+        self.statements: List[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def record(self, statement: str) -> None:
+        self.statements.append(statement)
+        if self.budget is not None and self.count > self.budget:
+            raise QueryBudgetExceeded(self.budget, list(self.statements))
+
+
+# El contador viaja con el contexto de la petición (los endpoints sync copian el contexto al threadpool)
+_current_counter: ContextVar[Optional[QueryCounter]] = ContextVar("query_counter", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    counter = _current_counter.get()
+    if counter is not None:
+        counter.record(statement)
+
+
+def install_query_counter(engine: Engine) -> None:
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+
+
+@contextmanager
+def count_queries(budget: Optional[int] = None) -> Iterator[QueryCounter]:
+    counter = QueryCounter(budget)
+    token = _current_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _current_counter.reset(token)
+
+
+def query_budget(max_queries: int):
+    """Dependencia que limita las consultas SQL de una petición cuando el modo debug o
+    ENFORCE_QUERY_BUDGET están activos."""
+    async def dependency():
+        if not (settings.debug or settings.enforce_query_budget):
+            yield None
+            return
+        with count_queries(max_queries) as counter:
+            yield counter
+
+    return dependency
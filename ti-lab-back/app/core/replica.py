@@ -0,0 +1,193 @@
+import logging
+import sqlite3
+import threading
+import time
+from typing import Optional
+from sqlalchemy import Column, Float, Integer, MetaData, Table, func, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import MutableHeaders
+from app.core.metrics import Counter, Gauge, registry
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+# Momento (epoch) de la última escritura del cliente; mientras la réplica no la alcance, sus lecturas van a la primaria
+LAST_WRITE_COOKIE = "ti_lab_last_write"
+
+READ_ROUTING = registry.register(Counter(
+    "db_read_routing_total", "Requests de lectura por base de destino y motivo", ("target", "reason")
+))
+REPLICA_LAG = registry.register(Gauge(
+    "db_replica_lag_seconds", "Retraso estimado de la réplica de lectura (-1: desconocido)"
+))
+
+# Marca que escribe el replicador de prueba en la réplica SQLite. Vive fuera de Base.metadata:
+# no existe en la primaria ni la crean las migraciones.
+replica_estado = Table(
+    "replica_estado",
+    MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column("sincronizado_en", Float, nullable=False),
+)
+
+# Una réplica de PostgreSQL sin WAL pendiente de aplicar está al día; si no, lo está hasta su última transacción aplicada
+_PG_REPLICATED_THROUGH = text(
+    "SELECT EXTRACT(EPOCH FROM CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() "
+    "THEN now() ELSE pg_last_xact_replay_timestamp() END)"
+)
+
+
+class RoutingSession(Session):
+    """Sesión de las requests de lectura: los SELECT van a la réplica (`info["replica"]`).
+    
+    Cualquier escritura va a la primaria y, desde ese momento, también las lecturas siguientes de la
+    sesión, para que lea lo que acaba de escribir.
+    """
+    
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        replica = self.info.get("replica")
+        if replica is None or self._flushing or self.info.get("wrote"):
+            return super().get_bind(mapper, clause=clause, **kwargs)
+        if getattr(clause, "is_dml", False):
+            self.info["wrote"] = True
+            return super().get_bind(mapper, clause=clause, **kwargs)
+        return replica
+
+
+class ReplicaMonitor:
+    """Sabe hasta qué momento está replicada la réplica (consultado como mucho cada `refresh_interval`
+    segundos) y decide si puede atender una lectura.
+    
+    Si la réplica no responde, no tiene marca o su retraso supera `max_lag`, las lecturas vuelven a la primaria.
+    """
+    
+    def __init__(self, engine: Engine, max_lag: float, refresh_interval: float = 1.0):
+        self.engine = engine
+        self.max_lag = max_lag
+        self.refresh_interval = refresh_interval
+        self._replicated_through: Optional[float] = None
+        self._checked_at = float("-inf")
+        self._refreshing = threading.Lock()
+    
+    def _query(self) -> Optional[float]:
+        with self.engine.connect() as connection:
+            if connection.dialect.name == "postgresql":
+                value = connection.scalar(_PG_REPLICATED_THROUGH)
+            else:
+                value = connection.scalar(select(func.max(replica_estado.c.sincronizado_en)))
+        return float(value) if value is not None else None
+    
+    def refresh(self) -> Optional[float]:
+        try:
+            self._replicated_through = self._query()
+        except SQLAlchemyError:
+            # Réplica caída o todavía sin la marca: hasta la próxima consulta se lee de la primaria
+            logger.warning("No se pudo consultar el estado de la réplica", exc_info=True)
+            self._replicated_through = None
+        self._checked_at = time.monotonic()
+        lag = self.lag()
+        REPLICA_LAG.set(-1 if lag is None else lag)
+        return self._replicated_through
+    
+    async def ensure_fresh(self) -> None:
+        # Una sola request consulta la réplica cuando vence el intervalo; las demás usan el último valor
+        if time.monotonic() - self._checked_at < self.refresh_interval or not self._refreshing.acquire(blocking=False):
+            return
+        try:
+            await run_in_threadpool(self.refresh)
+        finally:
+            self._refreshing.release()
+    
+    def lag(self) -> Optional[float]:
+        through = self._replicated_through
+        return None if through is None else max(time.time() - through, 0.0)
+    
+    def serves(self, last_write: float = 0.0) -> bool:
+        through = self._replicated_through
+        if through is None:
+            reason = "unknown"
+        elif time.time() - through > self.max_lag:
+            reason = "lag"
+        elif through < last_write:
+            reason = "read_your_writes"
+        else:
+            READ_ROUTING.inc(target="replica", reason="fresh")
+            return True
+        READ_ROUTING.inc(target="primary", reason=reason)
+        return False
+
+
+def last_write_from_cookie(value: Optional[str]) -> float:
+    try:
+        return float(value) if value else 0.0
+    except ValueError:
+        return 0.0
+
+
+class ReadYourWritesMiddleware:
+    """Middleware ASGI: cada escritura exitosa deja en una cookie el momento en que se confirmó.
+    
+    La cookie dura `max_age` segundos: pasado ese tiempo, o la réplica ya la alcanzó o su retraso
+    supera REPLICA_MAX_LAG_SECONDS y el monitor manda todas las lecturas a la primaria.
+    """
+    
+    def __init__(self, app, max_age: float):
+        self.app = app
+        self.max_age = max(int(max_age + 0.999), 1)
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+        
+        async def send_with_cookie(message):
+            # La respuesta sale después del commit: este momento es posterior a la escritura
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                MutableHeaders(scope=message).append(
+                    "set-cookie", f"{LAST_WRITE_COOKIE}={time.time():.6f}; Max-Age={self.max_age}; Path=/; HttpOnly; SameSite=Lax"
+                )
+            await send(message)
+        
+        await self.app(scope, receive, send_with_cookie)
+
+
+class SQLiteReplicator:
+    """Réplica de prueba para desarrollo: copia la base primaria sobre la réplica con la API de
+    backup de SQLite y anota en `replica_estado` hasta qué momento quedó replicada.
+    
+    No reemplaza el archivo (las conexiones abiertas de la app seguirían leyendo el anterior): la
+    copia se hace página por página sobre la réplica, como haría una réplica real aplicando cambios.
+    """
+    
+    def __init__(self, primary_path: str, replica_path: str):
+        self.primary_path = primary_path
+        self.replica_path = replica_path
+    
+    def sync_once(self) -> float:
+        # La copia incluye todo lo confirmado antes de empezar
+        through = time.time()
+        source = sqlite3.connect(self.primary_path)
+        target = sqlite3.connect(self.replica_path)
+        try:
+            source.backup(target)
+            target.execute(
+                "CREATE TABLE IF NOT EXISTS replica_estado (id INTEGER PRIMARY KEY, sincronizado_en REAL NOT NULL)"
+            )
+            target.execute("INSERT OR REPLACE INTO replica_estado (id, sincronizado_en) VALUES (1, ?)", (through,))
+            target.commit()
+        finally:
+            target.close()
+            source.close()
+        return through
+    
+    def run(self, interval: float, stop: Optional[threading.Event] = None) -> None:
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            try:
+                self.sync_once()
+            except sqlite3.Error:
+                logger.exception("Error al replicar la base SQLite")
+            stop.wait(interval)
@@ -0,0 +1,63 @@
+import random
+from typing import Callable, NamedTuple, Optional, TypeVar
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm.exc import StaleDataError
+from app.core.metrics import Counter, registry
+
+F = TypeVar("F", bound=Callable)
+
+DB_RETRIES = registry.register(Counter(
+    "db_conflict_retries_total", "Reintentos de operaciones por conflictos de concurrencia", ("operation",)
+))
+
+# SQLite: otra conexión escribió después de nuestra lectura (SQLITE_BUSY_SNAPSHOT) o no soltó el lock a tiempo.
+# PostgreSQL: serialization_failure / deadlock_detected
+_SQLITE_BUSY = ("database is locked", "database table is locked")
+_PG_RETRYABLE = ("40001", "40P01")
+
+
+class ConcurrencyConflict(RuntimeError):
+    """Otra escritura ganó la carrera y no tiene sentido reintentar (o ya se agotaron los intentos): 409."""
+
+
+class StaleSnapshot(Exception):
+    """Lo que la operación leyó cambió antes de escribir; repetirla desde cero puede tener éxito."""
+
+
+class RetryPolicy(NamedTuple):
+    attempts: int = 5
+    base_delay: float = 0.005
+    max_delay: float = 0.1
+    
+    def delay(self, attempt: int) -> float:
+        # Backoff exponencial con jitter completo: los que chocaron no vuelven a chocar al mismo tiempo
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
+
+
+def is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, (StaleSnapshot, StaleDataError)):
+        return True
+    if isinstance(exc, OperationalError):
+        pgcode = getattr(exc.orig, "pgcode", None) or getattr(exc.orig, "sqlstate", None)
+        return pgcode in _PG_RETRYABLE or any(message in str(exc.orig) for message in _SQLITE_BUSY)
+    return False
+
+
+def retry_on_conflict(policy: RetryPolicy = DEFAULT_RETRY_POLICY) -> Callable[[F], F]:
+    """Marca un método de servicio como reintentable ante conflictos.
+    
+    El método debe poder repetirse desde cero tras un rollback (leer, comprobar y escribir en la
+    misma llamada). Quien lo ejecuta (ServiceProxy) aplica la política: rollback, espera y nuevo
+    intento, sin ocupar el event loop durante la espera.
+    """
+    def decorator(fn: F) -> F:
+        fn.retry_policy = policy
+        return fn
+    return decorator
+
+
+def retry_policy_of(fn: Callable) -> Optional[RetryPolicy]:
+    return getattr(fn, "retry_policy", None)
@@ -0,0 +1,32 @@
+from functools import lru_cache
+from typing import Any, Iterable, List, Type
+from fastapi.responses import Response
+from pydantic import BaseModel, TypeAdapter
+from pydantic_core import to_json
+from app.core.fieldsets import FULL, FieldSet
+
+
+class PreEncodedJSONResponse(Response):
+    """Respuesta cuyo cuerpo ya viene serializado a JSON; FastAPI no lo vuelve a validar."""
+    media_type = "application/json"
+
+
+@lru_cache(maxsize=None)
+def list_adapter(schema: Type[BaseModel]) -> TypeAdapter:
+    # El validador/serializador de pydantic-core se compila una vez por schema
+    return TypeAdapter(List[schema])
+
+
+def encode_list(schema: Type[BaseModel], rows: Iterable[Any], fieldset: FieldSet = FULL) -> bytes:
+    if not fieldset.full:
+        # Filas ya recortadas por el repositorio: el schema exigiría los campos que faltan, así que
+        # pydantic-core las serializa tal cual (mismos formatos de fecha que dump_json)
+        return to_json(fieldset.prune(rows))
+    adapter = list_adapter(schema)
+    return adapter.dump_json(adapter.validate_python(rows))
+
+
+def encode_one(schema: Type[BaseModel], obj: Any, fieldset: FieldSet = FULL) -> bytes:
+    if not fieldset.full:
+        return to_json(fieldset.prune([obj])[0])
+    return schema.model_validate(obj).model_dump_json().encode()
\ No newline at end of file
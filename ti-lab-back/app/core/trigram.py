@@ -0,0 +1,89 @@
+import heapq
+import math
+import re
+import unicodedata
+from collections import defaultdict
+from itertools import islice
+from typing import Dict, Hashable, Iterable, List, Set, Tuple
+
+_WORD = re.compile(r"\w+")
+
+
+def normalize(text: str) -> str:
+    # Minúsculas y sin tildes: "Peña" y "pena" deben coincidir
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def trigrams(text: str, prefix: bool = False) -> Set[str]:
+    """Trigramas por palabra con el relleno de pg_trgm (dos espacios al inicio, uno al final),
+    de modo que prefijos de una o dos letras también generan trigramas.
+    
+    Con prefix=True se omite el relleno final: cada palabra de la consulta casa como prefijo.
+    """
+    grams: Set[str] = set()
+    for word in _WORD.findall(normalize(text)):
+        padded = f"  {word}" if prefix else f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class TrigramIndex:
+    """Índice invertido de trigramas en memoria; búsqueda difusa para motores sin FTS5."""
+    
+    def __init__(self):
+        self._postings: Dict[str, Set[Hashable]] = defaultdict(set)
+        self._sizes: Dict[Hashable, int] = {}
+    
+    def __len__(self) -> int:
+        return len(self._sizes)
+    
+    def add(self, key: Hashable, text: str) -> None:
+        grams = trigrams(text)
+        self._sizes[key] = len(grams)
+        for gram in grams:
+            self._postings[gram].add(key)
+    
+    @classmethod
+    def build(cls, documents: Iterable[Tuple[Hashable, str]]) -> "TrigramIndex":
+        index = cls()
+        for key, text in documents:
+            index.add(key, text)
+        return index
+    
+    def search(
+        self, query: str, limit: int = 20, threshold: float = 0.5, candidates: int = 1000
+    ) -> List[Tuple[Hashable, float]]:
+        """Devuelve (clave, similitud) ordenados de mayor a menor; cada palabra de la consulta
+        se trata como prefijo.
+        
+        Si algún documento contiene todos los trigramas de la consulta, solo se devuelven esos,
+        prefiriendo los más cortos. Si no, la similitud es la fracción de trigramas presentes
+        (tolerancia a errores de tipeo), con un mínimo de `threshold`. Como en el FTS, se
+        rankean como máximo `candidates` documentos: un prefijo de una letra casa con casi todos.
+        """
+        grams = trigrams(query, prefix=True)
+        if not grams:
+            return []
+        postings = sorted((self._postings.get(gram, set()) for gram in grams), key=len)
+        # La intersección de sets corre en C: es el camino normal del typeahead
+        complete = set.intersection(*postings)
+        if complete:
+            return heapq.nlargest(
+                limit,
+                ((key, 0.9 + 0.1 * len(grams) / self._sizes[key]) for key in islice(complete, candidates)),
+                key=_score,
+            )
+        needed = max(1, math.ceil(len(grams) * threshold))
+        # Un documento con al menos `needed` trigramas de la consulta aparece en alguna de las
+        # len - needed + 1 listas más cortas: solo esas generan candidatos
+        scored = []
+        for key in islice(set().union(*postings[:len(postings) - needed + 1]), candidates):
+            count = sum(1 for posting in postings if key in posting)
+            if count >= needed:
+                scored.append((key, 0.9 * count / len(grams)))
+        return heapq.nlargest(limit, scored, key=_score)
+
+
+def _score(item: Tuple[Hashable, float]) -> float:
+    return item[1]
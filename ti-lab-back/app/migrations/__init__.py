@@ -0,0 +1,55 @@
+"""Migraciones versionadas del esquema.
+
+Cada módulo de MIGRATIONS expone DESCRIPCION y upgrade(conn); su posición en la lista
+(empezando en 1) es su versión. Las versiones aplicadas se registran en schema_version.
+"""
+from datetime import datetime
+from importlib import import_module
+from typing import List
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, insert, select
+from sqlalchemy.engine import Engine
+
+MIGRATIONS = [
+    "v0001_esquema_inicial",
+    "v0002_indices",
+    "v0003_busqueda",
+    "v0004_estadisticas",
+    "v0005_vencimientos",
+    "v0006_version_disponibilidad",
+    "v0007_auditoria",
+    "v0008_idempotencia",
+    "v0009_versiones_catalogo",
+]
+
+_metadata = MetaData()
+
+schema_version = Table(
+    "schema_version",
+    _metadata,
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("descripcion", String(255), nullable=False),
+    Column("aplicada_en", DateTime, nullable=False),
+)
+
+
+def current_version(engine: Engine) -> int:
+    _metadata.create_all(engine)
+    with engine.connect() as conn:
+        versions = conn.execute(select(schema_version.c.version)).scalars().all()
+    return max(versions, default=0)
+
+
+def run_migrations(engine: Engine) -> List[int]:
+    """Aplica en orden las migraciones pendientes, cada una en su propia transacción."""
+    applied = []
+    for version in range(current_version(engine) + 1, len(MIGRATIONS) + 1):
+        module = import_module(f"{__name__}.{MIGRATIONS[version - 1]}")
+        with engine.begin() as conn:
+            module.upgrade(conn)
+            conn.execute(
+                insert(schema_version).values(
+                    version=version, descripcion=module.DESCRIPCION, aplicada_en=datetime.now()
+                )
+            )
+        applied.append(version)
+    return applied
@@ -0,0 +1,9 @@
+from sqlalchemy.engine import Connection
+from app.models import Base
+
+DESCRIPCION = "Esquema inicial (tablas de los modelos)"
+
+
+def upgrade(conn: Connection) -> None:
+    # create_all omite las tablas existentes, así que también adopta bases creadas antes de las migraciones
+    Base.metadata.create_all(conn)
@@ -0,0 +1,32 @@
+from sqlalchemy.engine import Connection
+from app.models import Base
+
+DESCRIPCION = "Índices de claves foráneas y filtros frecuentes"
+
+INDICES = (
+    "ix_componentes_nombre",
+    "ix_alumnos_seccion_id",
+    "ix_alumnos_codigo",
+    "ix_secciones_curso_id",
+    "ix_jornadas_prestamo_fecha",
+    "ix_jornadas_prestamo_seccion_fecha",
+    "ix_jornadas_prestamo_curso_id",
+    "ix_prestamos_jornada_alumno",
+    "ix_prestamos_alumno_id",
+    "ix_prestamos_fecha_id",
+    "ix_prestamos_abiertos",
+    "ix_detalles_prestamo_prestamo_id",
+    "ix_detalles_prestamo_numero_serie",
+    "ix_detalles_prestamo_componente_id",
+    "ix_detalles_prestamo_kit_id",
+    "ix_kit_componentes_kit_id",
+    "ix_kit_componentes_componente_id",
+)
+
+
+def upgrade(conn: Connection) -> None:
+    # En bases nuevas la v0001 ya los creó desde los modelos; checkfirst los omite
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            if index.name in INDICES:
+                index.create(conn, checkfirst=True)
@@ -0,0 +1,43 @@
+from sqlalchemy.engine import Connection
+
+DESCRIPCION = "Tablas FTS5 de búsqueda para componentes y alumnos"
+
+# Tablas FTS5 de contenido externo: solo guardan el índice y leen el texto de la tabla base.
+# prefix='1 2 3 4' precalcula prefijos cortos para que el typeahead no recorra el vocabulario.
+FTS_TABLES = {
+    "componentes_fts": ("componentes", ("nombre",)),
+    # El código del alumno se busca por prefijo en ix_alumnos_codigo: en FTS5 un prefijo común
+    # a miles de códigos distintos ("2024...") obliga a fusionar miles de términos
+    "alumnos_fts": ("alumnos", ("nombres", "apellidos")),
+}
+
+
+def _statements(fts: str, table: str, columns) -> list:
+    cols = ", ".join(columns)
+    new = ", ".join(f"new.{column}" for column in columns)
+    old = ", ".join(f"old.{column}" for column in columns)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"{cols}, content='{table}', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2', prefix='1 2 3 4')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old}); "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new}); END",
+        # Indexa las filas que ya existían antes de la migración
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+def upgrade(conn: Connection) -> None:
+    # Otros motores (o SQLite compilado sin FTS5) usan el índice de trigramas en memoria
+    if conn.dialect.name != "sqlite":
+        return
+    if not conn.exec_driver_sql("SELECT sqlite_compileoption_used('ENABLE_FTS5')").scalar():
+        return
+    for fts, (table, columns) in FTS_TABLES.items():
+        for statement in _statements(fts, table, columns):
+            conn.exec_driver_sql(statement)
@@ -0,0 +1,14 @@
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from app.models.uso_diario import UsoDiario
+from app.repositories.stats_repository import StatsRepository
+
+DESCRIPCION = "Resumen diario de uso por sección y componente (uso_diario), calculado desde el historial"
+
+
+def upgrade(conn: Connection) -> None:
+    # En bases nuevas la v0001 ya creó la tabla vacía; checkfirst la omite y el rebuild no encuentra historial
+    UsoDiario.__table__.create(conn, checkfirst=True)
+    for index in UsoDiario.__table__.indexes:
+        index.create(conn, checkfirst=True)
+    StatsRepository(Session(bind=conn)).rebuild()
@@ -0,0 +1,21 @@
+from sqlalchemy import inspect
+from sqlalchemy.engine import Connection
+from app.models.prestamo import Prestamo
+
+DESCRIPCION = "Fecha límite de préstamos, estado vencido e índices de vencimiento"
+
+
+def upgrade(conn: Connection) -> None:
+    table = Prestamo.__table__
+    # En bases nuevas la v0001 ya creó la columna y los índices con la definición actual
+    if "fecha_limite" not in {column["name"] for column in inspect(conn).get_columns(table.name)}:
+        conn.exec_driver_sql(
+            f"ALTER TABLE {table.name} ADD COLUMN fecha_limite {table.c.fecha_limite.type.compile(dialect=conn.dialect)}"
+        )
+    for index in table.indexes:
+        if index.name == "ix_prestamos_abiertos":
+            # Su predicado cambió (ESTADOS_ABIERTOS incluye "vencido"): se recrea
+            index.drop(conn, checkfirst=True)
+            index.create(conn)
+        elif index.name == "ix_prestamos_vencimiento":
+            index.create(conn, checkfirst=True)
@@ -0,0 +1,16 @@
+from sqlalchemy import inspect
+from sqlalchemy.engine import Connection
+from app.models.disponibilidad_componente import DisponibilidadComponente
+
+DESCRIPCION = "Versión (concurrencia optimista) en disponibilidad_componentes"
+
+
+def upgrade(conn: Connection) -> None:
+    table = DisponibilidadComponente.__table__
+    # En bases nuevas la v0001 ya creó la columna
+    if "version" in {column["name"] for column in inspect(conn).get_columns(table.name)}:
+        return
+    conn.exec_driver_sql(
+        f"ALTER TABLE {table.name} ADD COLUMN version "
+        f"{table.c.version.type.compile(dialect=conn.dialect)} NOT NULL DEFAULT 1"
+    )
@@ -0,0 +1,11 @@
+from sqlalchemy.engine import Connection
+from app.models.auditoria_prestamo import AuditoriaPrestamo
+
+DESCRIPCION = "Auditoría de préstamos y detalles (auditoria_prestamos) con índices por rango de tiempo"
+
+
+def upgrade(conn: Connection) -> None:
+    # En bases nuevas la v0001 ya creó la tabla y sus índices; checkfirst los omite
+    AuditoriaPrestamo.__table__.create(conn, checkfirst=True)
+    for index in AuditoriaPrestamo.__table__.indexes:
+        index.create(conn, checkfirst=True)
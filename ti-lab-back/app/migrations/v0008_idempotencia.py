@@ -0,0 +1,11 @@
+from sqlalchemy.engine import Connection
+from app.models.clave_idempotencia import ClaveIdempotencia
+
+DESCRIPCION = "Respuestas guardadas por Idempotency-Key (claves_idempotencia) con índice por vencimiento"
+
+
+def upgrade(conn: Connection) -> None:
+    # En bases nuevas la v0001 ya creó la tabla y su índice; checkfirst los omite
+    ClaveIdempotencia.__table__.create(conn, checkfirst=True)
+    for index in ClaveIdempotencia.__table__.indexes:
+        index.create(conn, checkfirst=True)
@@ -0,0 +1,9 @@
+from sqlalchemy.engine import Connection
+from app.models.version_catalogo import VersionCatalogo
+
+DESCRIPCION = "Versiones de catálogo compartidas entre procesos (versiones_catalogo)"
+
+
+def upgrade(conn: Connection) -> None:
+    # En bases nuevas la v0001 ya creó la tabla; checkfirst la omite
+    VersionCatalogo.__table__.create(conn, checkfirst=True)
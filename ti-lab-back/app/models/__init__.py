@@ -0,0 +1,15 @@
+from app.models.base import Base
+from app.models.curso import Curso
+from app.models.seccion import Seccion
+from app.models.alumno import Alumno
+from app.models.componente import Componente
+from app.models.disponibilidad_componente import DisponibilidadComponente
+from app.models.kit import Kit
+from app.models.kit_componente import KitComponente
+from app.models.jornada_prestamo import JornadaPrestamo
+from app.models.prestamo import Prestamo
+from app.models.detalle_prestamo import DetallePrestamo
+from app.models.uso_diario import UsoDiario
+from app.models.auditoria_prestamo import AuditoriaPrestamo
+from app.models.clave_idempotencia import ClaveIdempotencia
+from app.models.version_catalogo import VersionCatalogo
\ No newline at end of file
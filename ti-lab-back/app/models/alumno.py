@@ -1,10 +1,14 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.models.base import Base
 
 
 class Alumno(Base):
     __tablename__ = "alumnos"
+    __table_args__ = (
+        Index("ix_alumnos_seccion_id", "seccion_id"),
+        Index("ix_alumnos_codigo", "codigo"),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     codigo = Column(String(50), nullable=False)
@@ -0,0 +1,33 @@
+from sqlalchemy import JSON, Column, DateTime, Index, Integer, String
+from app.models.base import Base
+
+ACCION_CREAR = "crear"
+ACCION_ACTUALIZAR = "actualizar"
+ACCION_ELIMINAR = "eliminar"
+
+
+class AuditoriaPrestamo(Base):
+    """Un cambio confirmado sobre un préstamo o uno de sus detalles: quién, cuándo y el antes/después.
+    
+    La escribe app.core.audit en segundo plano, por lotes; no hay foreign keys para que la historia
+    sobreviva al borrado de lo auditado. En las actualizaciones solo van las columnas que cambiaron.
+    """
+    __tablename__ = "auditoria_prestamos"
+    __table_args__ = (
+        # Consultas por rango de tiempo, en orden cronológico: (registrado_en, id) es la clave del keyset
+        Index("ix_auditoria_registrado", "registrado_en", "id"),
+        # La historia de un préstamo, también por rango
+        Index("ix_auditoria_prestamo", "prestamo_id", "registrado_en", "id"),
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    registrado_en = Column(DateTime, nullable=False)
+    # Cabecera X-Actor de la request, o el proceso que hizo el cambio (p. ej. "overdue-scheduler")
+    actor = Column(String(100), nullable=True)
+    # "prestamos" o "detalles_prestamo"
+    tabla = Column(String(50), nullable=False)
+    registro_id = Column(Integer, nullable=True)
+    prestamo_id = Column(Integer, nullable=True)
+    accion = Column(String(20), nullable=False)
+    antes = Column(JSON, nullable=True)
+    despues = Column(JSON, nullable=True)
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, DateTime, Index, Integer, LargeBinary, String
+from app.models.base import Base
+
+
+class ClaveIdempotencia(Base):
+    """Respuesta guardada de una escritura con cabecera Idempotency-Key, para repetirla en los reintentos.
+    
+    Mientras la primera request corre, la fila está pendiente (status_code nulo) y vence pronto: si el
+    proceso muere a mitad de camino, la clave se libera sola. Al terminar guarda la respuesta y vence
+    a los IDEMPOTENCY_TTL_SECONDS; las filas vencidas se ignoran y se borran por rango de expira_en.
+    """
+    __tablename__ = "claves_idempotencia"
+    __table_args__ = (
+        Index("ix_claves_idempotencia_expira", "expira_en"),
+    )
+    
+    clave = Column(String(255), primary_key=True)
+    # Hash del método, la ruta y el cuerpo: la misma clave con otra request es un error del cliente
+    huella = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=True)
+    cuerpo = Column(LargeBinary, nullable=True)
+    creada_en = Column(DateTime, nullable=False)
+    expira_en = Column(DateTime, nullable=False)
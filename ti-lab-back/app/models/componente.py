@@ -1,14 +1,19 @@
-from sqlalchemy import Column, Integer, String, Boolean
+from sqlalchemy import Column, Integer, String, Boolean, Index
 from sqlalchemy.orm import relationship
 from app.models.base import Base
 
 
 class Componente(Base):
     __tablename__ = "componentes"
+    # Búsqueda por nombre exacto al validar duplicados
+    __table_args__ = (Index("ix_componentes_nombre", "nombre"),)
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     nombre = Column(String(255), nullable=False)
     requiere_numero_serie = Column(Boolean, nullable=False)
     
     kit_componentes = relationship("KitComponente", back_populates="componente")
-    detalle_prestamos = relationship("DetallePrestamo", back_populates="componente")
\ No newline at end of file
+    detalle_prestamos = relationship("DetallePrestamo", back_populates="componente")
+    disponibilidad = relationship(
+        "DisponibilidadComponente", back_populates="componente", uselist=False, cascade="all, delete-orphan"
+    )
\ No newline at end of file
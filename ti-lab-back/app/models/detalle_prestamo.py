@@ -1,10 +1,16 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.models.base import Base
 
 
 class DetallePrestamo(Base):
     __tablename__ = "detalles_prestamo"
+    __table_args__ = (
+        Index("ix_detalles_prestamo_prestamo_id", "prestamo_id"),
+        Index("ix_detalles_prestamo_numero_serie", "numero_serie"),
+        Index("ix_detalles_prestamo_componente_id", "componente_id"),
+        Index("ix_detalles_prestamo_kit_id", "kit_id"),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     prestamo_id = Column(Integer, ForeignKey("prestamos.id"), nullable=False)
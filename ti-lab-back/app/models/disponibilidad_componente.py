@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, ForeignKey
+from sqlalchemy.orm import relationship
+from app.models.base import Base
+
+
+class DisponibilidadComponente(Base):
+    __tablename__ = "disponibilidad_componentes"
+    
+    componente_id = Column(Integer, ForeignKey("componentes.id"), primary_key=True)
+    en_stock = Column(Integer, nullable=False, default=0)
+    prestados = Column(Integer, nullable=False, default=0)
+    # Concurrencia optimista: los UPDATE del ORM exigen la versión leída (StaleDataError si cambió) y
+    # las reservas/liberaciones del repositorio la incrementan en la misma sentencia
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    
+    __mapper_args__ = {"version_id_col": version}
+    
+    componente = relationship("Componente", back_populates="disponibilidad")
+    
+    @property
+    def disponibles(self) -> int:
+        return self.en_stock - self.prestados
\ No newline at end of file
@@ -1,10 +1,15 @@
-from sqlalchemy import Column, Integer, Date, ForeignKey
+from sqlalchemy import Column, Integer, Date, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.models.base import Base
 
 
 class JornadaPrestamo(Base):
     __tablename__ = "jornadas_prestamo"
+    __table_args__ = (
+        Index("ix_jornadas_prestamo_fecha", "fecha"),
+        Index("ix_jornadas_prestamo_seccion_fecha", "seccion_id", "fecha"),
+        Index("ix_jornadas_prestamo_curso_id", "curso_id"),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     fecha = Column(Date, nullable=False)
@@ -5,6 +5,8 @@ from app.models.base import Base
 
 class Kit(Base):
     __tablename__ = "kits"
+    # Ids monótonos también en SQLite: sin AUTOINCREMENT se reutiliza el rowid del último kit borrado
+    __table_args__ = {"sqlite_autoincrement": True}
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     nombre = Column(String(255), nullable=False)
@@ -1,10 +1,14 @@
-from sqlalchemy import Column, Integer, ForeignKey
+from sqlalchemy import Column, Integer, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.models.base import Base
 
 
 class KitComponente(Base):
     __tablename__ = "kit_componentes"
+    __table_args__ = (
+        Index("ix_kit_componentes_kit_id", "kit_id"),
+        Index("ix_kit_componentes_componente_id", "componente_id"),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     kit_id = Column(Integer, ForeignKey("kits.id"), nullable=False)
@@ -1,16 +1,62 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, bindparam, column
 from sqlalchemy.orm import relationship
 from app.models.base import Base
 
+ESTADO_ACTIVO = "activo"
+ESTADO_DEVUELTO = "devuelto"
+# Activo cuya fecha_limite ya pasó; lo asigna el OverdueScheduler
+ESTADO_VENCIDO = "vencido"
+# Estados que mantienen los ítems fuera del laboratorio
+ESTADOS_ABIERTOS = (ESTADO_ACTIVO, ESTADO_VENCIDO)
+
 
 class Prestamo(Base):
     __tablename__ = "prestamos"
+    __table_args__ = (
+        Index("ix_prestamos_jornada_alumno", "jornada_id", "alumno_id"),
+        Index("ix_prestamos_alumno_id", "alumno_id"),
+        # Keyset del listado: ORDER BY fecha_prestamo DESC, id DESC
+        Index("ix_prestamos_fecha_id", "fecha_prestamo", "id"),
+        # Parcial: solo los préstamos abiertos, que son los que se filtran por estado.
+        # Las consultas deben usar el mismo predicado (estado_abierto()) para aprovecharlo.
+        Index(
+            "ix_prestamos_abiertos",
+            "estado",
+            "fecha_prestamo",
+            sqlite_where=column("estado").in_(ESTADOS_ABIERTOS),
+            postgresql_where=column("estado").in_(ESTADOS_ABIERTOS),
+        ),
+        # Vencimientos: (activo, fecha_limite <= ahora) para marcarlos y (vencido, fecha_limite) para listarlos,
+        # así ambos recorren solo las filas afectadas
+        Index(
+            "ix_prestamos_vencimiento",
+            "estado",
+            "fecha_limite",
+            "id",
+            sqlite_where=column("estado").in_(ESTADOS_ABIERTOS),
+            postgresql_where=column("estado").in_(ESTADOS_ABIERTOS),
+        ),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     jornada_id = Column(Integer, ForeignKey("jornadas_prestamo.id"), nullable=False)
     alumno_id = Column(Integer, ForeignKey("alumnos.id"), nullable=False)
     estado = Column(String(20), nullable=False)
+    fecha_prestamo = Column(DateTime, nullable=False, default=datetime.now)
+    fecha_devolucion = Column(DateTime, nullable=True)
+    # Sin fecha límite el préstamo nunca vence
+    fecha_limite = Column(DateTime, nullable=True)
     
     jornada = relationship("JornadaPrestamo", back_populates="prestamos")
     alumno = relationship("Alumno", back_populates="prestamos")
-    detalles = relationship("DetallePrestamo", back_populates="prestamo")
\ No newline at end of file
+    detalles = relationship("DetallePrestamo", back_populates="prestamo")
+
+
+def estado_abierto():
+    """Predicado de los índices parciales (estado IN ESTADOS_ABIERTOS) para usar en las consultas.
+    
+    Los estados van como literales: SQLite solo usa un índice parcial si puede deducir su WHERE
+    del de la consulta, y no lo deduce de un IN con parámetros ligados.
+    """
+    return Prestamo.estado.in_(bindparam("estados_abiertos", list(ESTADOS_ABIERTOS), expanding=True, literal_execute=True))
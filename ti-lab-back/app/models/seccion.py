@@ -1,10 +1,11 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.models.base import Base
 
 
 class Seccion(Base):
     __tablename__ = "secciones"
+    __table_args__ = (Index("ix_secciones_curso_id", "curso_id"),)
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     nombre = Column(String(255), nullable=False)
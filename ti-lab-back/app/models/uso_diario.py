@@ -0,0 +1,27 @@
+from sqlalchemy import BigInteger, Column, Date, ForeignKey, Index, Integer
+from app.models.base import Base
+
+
+class UsoDiario(Base):
+    """Resumen de uso por día (fecha de la jornada), sección y componente.
+    
+    Lo mantiene LoanService en la misma transacción que cada préstamo y devolución; los kits se
+    cuentan como los componentes que contienen. `python -m app.cli rebuild-stats` lo reconstruye.
+    """
+    __tablename__ = "uso_diario"
+    __table_args__ = (
+        Index("ix_uso_diario_curso_fecha", "curso_id", "fecha"),
+        Index("ix_uso_diario_componente_fecha", "componente_id", "fecha"),
+        Index("ix_uso_diario_fecha", "fecha"),
+    )
+    
+    seccion_id = Column(Integer, ForeignKey("secciones.id"), primary_key=True)
+    fecha = Column(Date, primary_key=True)
+    componente_id = Column(Integer, ForeignKey("componentes.id"), primary_key=True)
+    curso_id = Column(Integer, ForeignKey("cursos.id"), nullable=False)
+    # Préstamos que incluyen el componente y unidades prestadas
+    prestamos = Column(Integer, nullable=False, default=0)
+    unidades = Column(Integer, nullable=False, default=0)
+    # De esos préstamos, los devueltos y la suma de su tiempo fuera
+    devoluciones = Column(Integer, nullable=False, default=0)
+    segundos_fuera = Column(BigInteger, nullable=False, default=0)
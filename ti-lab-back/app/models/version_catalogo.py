@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, String
+from app.models.base import Base
+
+
+class VersionCatalogo(Base):
+    """Versión de cada catálogo cacheado ("components", "kits", "students"), compartida por todos los procesos.
+    
+    La transacción que escribe sobre una tabla del catálogo incrementa su fila antes del commit: el cambio
+    de datos y el de versión se confirman juntos y todos los workers lo ven. Sin fila, la versión es 0.
+    """
+    __tablename__ = "versiones_catalogo"
+    
+    catalogo = Column(String(32), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,43 @@
+from datetime import datetime
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import Session
+from typing import List, Optional, Tuple
+from app.models.auditoria_prestamo import AuditoriaPrestamo
+
+
+class AuditRepository:
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def get_rows(
+        self,
+        desde: Optional[datetime] = None,
+        hasta: Optional[datetime] = None,
+        prestamo_id: Optional[int] = None,
+        tabla: Optional[str] = None,
+        limit: int = 100,
+        after: Optional[Tuple[datetime, int]] = None,
+    ) -> List[dict]:
+        # En orden cronológico por (registrado_en, id): con prestamo_id recorre ix_auditoria_prestamo,
+        # sin él ix_auditoria_registrado; el rango y el cursor son búsquedas dentro del índice
+        query = select(AuditoriaPrestamo.__table__)
+        if prestamo_id is not None:
+            query = query.where(AuditoriaPrestamo.prestamo_id == prestamo_id)
+        if tabla is not None:
+            query = query.where(AuditoriaPrestamo.tabla == tabla)
+        if desde is not None:
+            query = query.where(AuditoriaPrestamo.registrado_en >= desde)
+        if hasta is not None:
+            query = query.where(AuditoriaPrestamo.registrado_en < hasta)
+        if after is not None:
+            registrado_en, audit_id = after
+            # Mismo rango redundante que el keyset de préstamos: deja a SQLite buscar en el índice
+            query = query.where(
+                AuditoriaPrestamo.registrado_en >= registrado_en,
+                or_(
+                    AuditoriaPrestamo.registrado_en > registrado_en,
+                    and_(AuditoriaPrestamo.registrado_en == registrado_en, AuditoriaPrestamo.id > audit_id),
+                ),
+            )
+        query = query.order_by(AuditoriaPrestamo.registrado_en, AuditoriaPrestamo.id).limit(limit)
+        return [dict(row) for row in self.db.execute(query).mappings()]
@@ -0,0 +1,133 @@
+from sqlalchemy import bindparam, func, select, union_all, update
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable, List, Optional
+from app.models.componente import Componente
+from app.models.detalle_prestamo import DetallePrestamo
+from app.models.disponibilidad_componente import DisponibilidadComponente
+from app.models.kit_componente import KitComponente
+from app.models.prestamo import Prestamo, estado_abierto
+
+
+class AvailabilityRepository:
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def get_all(self, skip: int = 0, limit: int = 100) -> List[DisponibilidadComponente]:
+        return (
+            self.db.query(DisponibilidadComponente)
+            .order_by(DisponibilidadComponente.componente_id)
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+    
+    def get_by_componente_id(self, componente_id: int) -> Optional[DisponibilidadComponente]:
+        return self.db.get(DisponibilidadComponente, componente_id)
+    
+    def get_many(self, componente_ids: Iterable[int]) -> Dict[int, DisponibilidadComponente]:
+        rows = (
+            self.db.query(DisponibilidadComponente)
+            .filter(DisponibilidadComponente.componente_id.in_(list(componente_ids)))
+            .all()
+        )
+        return {row.componente_id: row for row in rows}
+    
+    def set_stock(self, componente_id: int, en_stock: int) -> Optional[DisponibilidadComponente]:
+        row = self.get_by_componente_id(componente_id)
+        if row:
+            row.en_stock = en_stock
+            self.db.commit()
+            self.db.refresh(row)
+        return row
+    
+    def adjust_prestados(self, deltas: Dict[int, int]) -> None:
+        # Sin commit: se confirma en la misma transacción que el préstamo/devolución
+        if not deltas:
+            return
+        table = DisponibilidadComponente.__table__
+        self.db.execute(
+            update(table)
+            .where(table.c.componente_id == bindparam("b_componente_id"))
+            .values(prestados=table.c.prestados + bindparam("b_delta"), version=table.c.version + 1),
+            [{"b_componente_id": cid, "b_delta": delta} for cid, delta in deltas.items()],
+        )
+    
+    def reserve(self, demand: Dict[int, int]) -> bool:
+        """Suma `demand` a prestados solo donde alcanza el stock, en una sentencia por lote:
+        UPDATE ... WHERE en_stock - prestados >= :cantidad. La comprobación y la escritura son
+        atómicas en la base, así que dos reservas simultáneas nunca toman la misma unidad.
+        
+        Devuelve False si algún componente no alcanzó (rowcount menor que el lote); en ese caso
+        las filas que sí se reservaron quedan en la transacción y el llamador debe hacer rollback.
+        Sin commit.
+        """
+        if not demand:
+            return True
+        table = DisponibilidadComponente.__table__
+        result = self.db.execute(
+            update(table)
+            .where(
+                table.c.componente_id == bindparam("b_componente_id"),
+                table.c.en_stock - table.c.prestados >= bindparam("b_cantidad"),
+            )
+            .values(prestados=table.c.prestados + bindparam("b_cantidad"), version=table.c.version + 1),
+            [{"b_componente_id": cid, "b_cantidad": cantidad} for cid, cantidad in demand.items()],
+        )
+        return result.rowcount == len(demand)
+    
+    def compute_open_demand(self) -> Dict[int, int]:
+        """Recalcula desde cero las unidades prestadas por componente (préstamos abiertos)."""
+        directos = (
+            select(DetallePrestamo.componente_id, func.sum(DetallePrestamo.cantidad))
+            .join(Prestamo, Prestamo.id == DetallePrestamo.prestamo_id)
+            .where(estado_abierto(), DetallePrestamo.componente_id.is_not(None))
+            .group_by(DetallePrestamo.componente_id)
+        )
+        en_kits = (
+            select(KitComponente.componente_id, func.sum(DetallePrestamo.cantidad * KitComponente.cantidad))
+            .join(Prestamo, Prestamo.id == DetallePrestamo.prestamo_id)
+            .join(KitComponente, KitComponente.kit_id == DetallePrestamo.kit_id)
+            .where(estado_abierto())
+            .group_by(KitComponente.componente_id)
+        )
+        demand: Dict[int, int] = {}
+        for statement in (directos, en_kits):
+            for componente_id, cantidad in self.db.execute(statement):
+                demand[componente_id] = demand.get(componente_id, 0) + int(cantidad)
+        return demand
+    
+    def get_demand_by_loan(self, loan_ids: Iterable[int]) -> Dict[int, Dict[int, int]]:
+        """Unidades por componente de cada préstamo ({prestamo_id: {componente_id: unidades}}),
+        expandiendo los kits en la base: un solo SELECT para todo el lote."""
+        loan_ids = list(loan_ids)
+        directos = select(
+            DetallePrestamo.prestamo_id, DetallePrestamo.componente_id, DetallePrestamo.cantidad.label("cantidad")
+        ).where(DetallePrestamo.prestamo_id.in_(loan_ids), DetallePrestamo.componente_id.is_not(None))
+        en_kits = (
+            select(
+                DetallePrestamo.prestamo_id,
+                KitComponente.componente_id,
+                (DetallePrestamo.cantidad * KitComponente.cantidad).label("cantidad"),
+            )
+            .join(KitComponente, KitComponente.kit_id == DetallePrestamo.kit_id)
+            .where(DetallePrestamo.prestamo_id.in_(loan_ids))
+        )
+        por_detalle = union_all(directos, en_kits).subquery()
+        query = select(
+            por_detalle.c.prestamo_id, por_detalle.c.componente_id, func.sum(por_detalle.c.cantidad)
+        ).group_by(por_detalle.c.prestamo_id, por_detalle.c.componente_id)
+        demand: Dict[int, Dict[int, int]] = {}
+        for prestamo_id, componente_id, cantidad in self.db.execute(query):
+            demand.setdefault(prestamo_id, {})[componente_id] = int(cantidad)
+        return demand
+    
+    def create_missing_rows(self) -> int:
+        missing = (
+            self.db.query(Componente.id)
+            .outerjoin(DisponibilidadComponente)
+            .filter(DisponibilidadComponente.componente_id.is_(None))
+            .all()
+        )
+        self.db.add_all(DisponibilidadComponente(componente_id=cid, en_stock=0, prestados=0) for (cid,) in missing)
+        self.db.flush()
+        return len(missing)
\ No newline at end of file
@@ -0,0 +1,33 @@
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable
+from app.models.version_catalogo import VersionCatalogo
+
+
+class CatalogVersionRepository:
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def get(self, catalog: str) -> int:
+        version = self.db.scalar(select(VersionCatalogo.version).where(VersionCatalogo.catalogo == catalog))
+        return version or 0
+    
+    def get_all(self) -> Dict[str, int]:
+        return dict(self.db.execute(select(VersionCatalogo.catalogo, VersionCatalogo.version)).all())
+    
+    def bump(self, catalogs: Iterable[str]) -> None:
+        """Incrementa la versión de cada catálogo, creando su fila si no existe.
+        
+        Sin commit: se confirma en la misma transacción que la escritura que la cambia.
+        """
+        # INSERT ... ON CONFLICT DO UPDATE, como el resumen de uso; en orden, para que dos
+        # transacciones que tocan los mismos catálogos bloqueen las filas en el mismo orden
+        dialect = postgresql if self.db.get_bind().dialect.name == "postgresql" else sqlite
+        table = VersionCatalogo.__table__
+        statement = dialect.insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.catalogo],
+            set_={"version": table.c.version + 1},
+        )
+        self.db.execute(statement, [{"catalogo": catalog, "version": 1} for catalog in sorted(catalogs)])
@@ -1,6 +1,11 @@
+from sqlalchemy import exists, or_, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from app.models.component import Component
+from typing import Dict, Iterable, List, Optional
+from app.models.componente import Componente
+from app.models.detalle_prestamo import DetallePrestamo
+from app.models.disponibilidad_componente import DisponibilidadComponente
+from app.models.kit_componente import KitComponente
 from app.schemas.component import ComponentCreate, ComponentUpdate
 
 
@@ -8,23 +13,48 @@ class ComponentRepository:
     def __init__(self, db: Session):
         self.db = db
     
-    def get_all(self, skip: int = 0, limit: int = 100) -> List[Component]:
-        return self.db.query(Component).filter(Component.is_active == True).offset(skip).limit(limit).all()
+    def get_all(self, skip: int = 0, limit: int = 100, after_id: Optional[int] = None) -> List[Componente]:
+        query = self.db.query(Componente).order_by(Componente.id)
+        if after_id is not None:
+            query = query.filter(Componente.id > after_id)
+        else:
+            query = query.offset(skip)
+        return query.limit(limit).all()
     
-    def get_by_id(self, component_id: int) -> Optional[Component]:
-        return self.db.query(Component).filter(Component.id == component_id, Component.is_active == True).first()
+    def get_all_rows(self, skip: int = 0, limit: int = 100, after_id: Optional[int] = None) -> List[dict]:
+        # Solo las columnas de la respuesta, sin hidratar entidades ORM
+        query = select(Componente.id, Componente.nombre, Componente.requiere_numero_serie).order_by(Componente.id)
+        if after_id is not None:
+            query = query.where(Componente.id > after_id)
+        else:
+            query = query.offset(skip)
+        return [dict(row) for row in self.db.execute(query.limit(limit)).mappings()]
     
-    def get_by_serial_number(self, serial_number: str) -> Optional[Component]:
-        return self.db.query(Component).filter(Component.serial_number == serial_number, Component.is_active == True).first()
+    def get_rows_by_ids(self, component_ids: Iterable[int]) -> Dict[int, dict]:
+        query = select(Componente.id, Componente.nombre, Componente.requiere_numero_serie).where(
+            Componente.id.in_(list(component_ids))
+        )
+        return {row["id"]: dict(row) for row in self.db.execute(query).mappings()}
     
-    def create(self, component_data: ComponentCreate) -> Component:
-        component = Component(**component_data.dict())
+    def get_by_id(self, component_id: int) -> Optional[Componente]:
+        return self.db.query(Componente).filter(Componente.id == component_id).first()
+    
+    def get_many(self, component_ids: Iterable[int]) -> Dict[int, Componente]:
+        components = self.db.query(Componente).filter(Componente.id.in_(list(component_ids))).all()
+        return {component.id: component for component in components}
+    
+    def get_by_nombre(self, nombre: str) -> Optional[Componente]:
+        return self.db.query(Componente).filter(Componente.nombre == nombre).first()
+    
+    def create(self, component_data: ComponentCreate) -> Componente:
+        component = Componente(**component_data.dict())
+        component.disponibilidad = DisponibilidadComponente(en_stock=0, prestados=0)
         self.db.add(component)
         self.db.commit()
         self.db.refresh(component)
         return component
     
-    def update(self, component_id: int, component_data: ComponentUpdate) -> Optional[Component]:
+    def update(self, component_id: int, component_data: ComponentUpdate) -> Optional[Componente]:
         component = self.get_by_id(component_id)
         if component:
             update_data = component_data.dict(exclude_unset=True)
@@ -34,10 +64,32 @@ class ComponentRepository:
             self.db.refresh(component)
         return component
     
+    def is_referenced(self, component_id: int) -> bool:
+        """Si algún detalle de préstamo (abierto o histórico) o algún kit usa el componente, o si su
+        disponibilidad todavía tiene unidades prestadas."""
+        return self.db.execute(select(or_(
+            exists().where(DetallePrestamo.componente_id == component_id),
+            exists().where(KitComponente.componente_id == component_id),
+            exists().where(
+                DisponibilidadComponente.componente_id == component_id,
+                DisponibilidadComponente.prestados > 0,
+            ),
+        ))).scalar()
+
     def delete(self, component_id: int) -> bool:
+        """Borra el componente y su fila de disponibilidad; ValueError si está referenciado (el borrado
+        dejaría detalles sin componente y unidades prestadas fuera del ledger)."""
         component = self.get_by_id(component_id)
-        if component:
-            component.is_active = False
+        if not component:
+            return False
+        if self.is_referenced(component_id):
+            self.db.rollback()
+            raise ValueError("Component is referenced by loans or kits")
+        self.db.delete(component)
+        try:
             self.db.commit()
-            return True
-        return False
\ No newline at end of file
+        except IntegrityError:
+            # Un préstamo o un kit lo referenció entre el chequeo y el DELETE
+            self.db.rollback()
+            raise ValueError("Component is referenced by loans or kits")
+        return True
\ No newline at end of file
@@ -0,0 +1,91 @@
+from datetime import datetime
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from typing import Optional
+from app.models.clave_idempotencia import ClaveIdempotencia
+
+
+class IdempotencyRepository:
+    """Reservas y respuestas guardadas por Idempotency-Key.
+    
+    Cada método es su propia transacción (con commit), separada de la de la request: la reserva tiene
+    que verse desde otros procesos antes de que la escritura empiece. La excepción es hold, que va
+    dentro de la transacción de la escritura.
+    """
+    
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def _get(self, clave: str) -> Optional[dict]:
+        row = self.db.execute(
+            select(
+                ClaveIdempotencia.huella,
+                ClaveIdempotencia.status_code,
+                ClaveIdempotencia.cuerpo,
+                ClaveIdempotencia.creada_en,
+                ClaveIdempotencia.expira_en,
+            ).where(ClaveIdempotencia.clave == clave)
+        ).mappings().first()
+        return dict(row) if row is not None else None
+    
+    def claim(self, clave: str, huella: str, ahora: datetime, pendiente_hasta: datetime) -> Optional[dict]:
+        """Reserva la clave (fila pendiente hasta `pendiente_hasta`) y devuelve None; si otra request ya
+        la tiene vigente, devuelve esa fila: con status_code si terminó, sin él si todavía corre."""
+        row = self._get(clave)
+        if row is not None and row["expira_en"] > ahora:
+            self.db.commit()
+            return row
+        if row is not None:
+            self.db.execute(
+                delete(ClaveIdempotencia).where(ClaveIdempotencia.clave == clave, ClaveIdempotencia.expira_en <= ahora)
+            )
+        try:
+            self.db.execute(insert(ClaveIdempotencia).values(
+                clave=clave, huella=huella, creada_en=ahora, expira_en=pendiente_hasta,
+            ))
+            self.db.commit()
+        except IntegrityError:
+            # Otro proceso la reservó entre la lectura y el INSERT
+            self.db.rollback()
+            row = self._get(clave)
+            self.db.commit()
+            # Si además ya la liberó, se trata como pendiente: quien llama vuelve a intentar
+            return row or {
+                "huella": huella, "status_code": None, "cuerpo": None, "creada_en": ahora, "expira_en": pendiente_hasta,
+            }
+        return None
+    
+    def hold(self, clave: str, expira_en: datetime) -> None:
+        """Extiende la reserva pendiente hasta `expira_en`. Sin commit: va en la transacción de la escritura
+        de la request, así que si esa escritura se confirmó la clave ya no se libera sola a los
+        PENDING_SECONDS, aunque el proceso muera antes de guardar la respuesta."""
+        self.db.execute(
+            update(ClaveIdempotencia)
+            .where(ClaveIdempotencia.clave == clave, ClaveIdempotencia.status_code.is_(None))
+            .values(expira_en=expira_en)
+        )
+    
+    def complete(self, clave: str, status_code: int, cuerpo: bytes, expira_en: datetime) -> None:
+        # Lo que la request haya dejado sin confirmar (p. ej. al rechazarla con un 400) no se confirma aquí
+        self.db.rollback()
+        self.db.execute(
+            update(ClaveIdempotencia)
+            .where(ClaveIdempotencia.clave == clave)
+            .values(status_code=status_code, cuerpo=cuerpo, expira_en=expira_en)
+        )
+        self.db.commit()
+    
+    def release(self, clave: str) -> None:
+        """Borra la reserva de una request que no dejó respuesta para repetir: el reintento vuelve a ejecutarse."""
+        self.db.rollback()
+        self.db.execute(
+            delete(ClaveIdempotencia).where(ClaveIdempotencia.clave == clave, ClaveIdempotencia.status_code.is_(None))
+        )
+        self.db.commit()
+    
+    def purge(self, ahora: datetime) -> int:
+        """Borra las claves vencidas (por rango sobre ix_claves_idempotencia_expira)."""
+        result = self.db.execute(delete(ClaveIdempotencia).where(ClaveIdempotencia.expira_en <= ahora))
+        self.db.commit()
+        return result.rowcount
@@ -1,6 +1,12 @@
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from sqlalchemy import exists, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, Query, selectinload, joinedload
+from typing import Dict, Iterable, List, Optional
+from app.core.fieldsets import FULL, FieldSet
+from app.models.componente import Componente
+from app.models.detalle_prestamo import DetallePrestamo
 from app.models.kit import Kit
+from app.models.kit_componente import KitComponente
 from app.schemas.kit import KitCreate, KitUpdate
 
 
@@ -8,21 +14,80 @@ class KitRepository:
     def __init__(self, db: Session):
         self.db = db
     
-    def get_all(self, skip: int = 0, limit: int = 100) -> List[Kit]:
-        return self.db.query(Kit).filter(Kit.is_active == True).offset(skip).limit(limit).all()
+    def _query_with_componentes(self) -> Query:
+        # Kit + (kit_componentes JOIN componentes): dos consultas sin importar cuántos kits se lean
+        return self.db.query(Kit).options(
+            selectinload(Kit.kit_componentes).joinedload(KitComponente.componente)
+        )
+    
+    def get_all(self, skip: int = 0, limit: int = 100, after_id: Optional[int] = None) -> List[Kit]:
+        query = self._query_with_componentes().order_by(Kit.id)
+        if after_id is not None:
+            query = query.filter(Kit.id > after_id)
+        else:
+            query = query.offset(skip)
+        return query.limit(limit).all()
+    
+    @staticmethod
+    def _select_rows(fieldset: FieldSet = FULL):
+        return select(*[column for column in (Kit.id, Kit.nombre, Kit.descripcion) if fieldset.includes(column.key)])
+    
+    def get_all_rows(
+        self, skip: int = 0, limit: int = 100, after_id: Optional[int] = None, fieldset: FieldSet = FULL
+    ) -> List[dict]:
+        query = self._select_rows(fieldset).order_by(Kit.id)
+        if after_id is not None:
+            query = query.where(Kit.id > after_id)
+        else:
+            query = query.offset(skip)
+        kits = [dict(row) for row in self.db.execute(query.limit(limit)).mappings()]
+        return self._attach_componentes(kits, fieldset)
+    
+    def get_rows_by_ids(self, kit_ids: Iterable[int], fieldset: FieldSet = FULL) -> Dict[int, dict]:
+        query = self._select_rows(fieldset).where(Kit.id.in_(list(kit_ids)))
+        kits = self._attach_componentes([dict(row) for row in self.db.execute(query).mappings()], fieldset)
+        return {kit["id"]: kit for kit in kits}
+    
+    def _attach_componentes(self, kits: List[dict], fieldset: FieldSet = FULL) -> List[dict]:
+        # Sin "componentes" en fields no hay segunda consulta; sin expandir "componentes.componente", tampoco JOIN
+        if not kits or not fieldset.includes("componentes"):
+            return kits
+        embebido = fieldset.expands("componentes.componente")
+        query = (
+            select(KitComponente.id, KitComponente.kit_id, KitComponente.componente_id, KitComponente.cantidad)
+            .where(KitComponente.kit_id.in_([kit["id"] for kit in kits]))
+            .order_by(KitComponente.id)
+        )
+        if embebido:
+            query = query.add_columns(Componente.nombre, Componente.requiere_numero_serie).join(
+                Componente, Componente.id == KitComponente.componente_id
+            )
+        by_kit: Dict[int, List[dict]] = {kit["id"]: [] for kit in kits}
+        for row in self.db.execute(query):
+            item = {"id": row.id, "componente_id": row.componente_id, "cantidad": row.cantidad}
+            if embebido:
+                item["componente"] = {
+                    "id": row.componente_id,
+                    "nombre": row.nombre,
+                    "requiere_numero_serie": row.requiere_numero_serie,
+                }
+            by_kit[row.kit_id].append(item)
+        for kit in kits:
+            kit["componentes"] = by_kit[kit["id"]]
+        return kits
     
     def get_by_id(self, kit_id: int) -> Optional[Kit]:
-        return self.db.query(Kit).filter(Kit.id == kit_id, Kit.is_active == True).first()
+        return self._query_with_componentes().filter(Kit.id == kit_id).first()
     
-    def get_by_kit_code(self, kit_code: str) -> Optional[Kit]:
-        return self.db.query(Kit).filter(Kit.kit_code == kit_code, Kit.is_active == True).first()
+    def get_many(self, kit_ids: Iterable[int]) -> Dict[int, Kit]:
+        kits = self._query_with_componentes().filter(Kit.id.in_(list(kit_ids))).all()
+        return {kit.id: kit for kit in kits}
     
     def create(self, kit_data: KitCreate) -> Kit:
         kit = Kit(**kit_data.dict())
         self.db.add(kit)
         self.db.commit()
-        self.db.refresh(kit)
-        return kit
+        return self.get_by_id(kit.id)
     
     def update(self, kit_id: int, kit_data: KitUpdate) -> Optional[Kit]:
         kit = self.get_by_id(kit_id)
@@ -31,13 +96,28 @@ class KitRepository:
             for field, value in update_data.items():
                 setattr(kit, field, value)
             self.db.commit()
-            self.db.refresh(kit)
+            kit = self.get_by_id(kit_id)
         return kit
     
+    def is_referenced(self, kit_id: int) -> bool:
+        """Si algún detalle de préstamo, abierto o histórico, usa el kit."""
+        return self.db.execute(select(exists().where(DetallePrestamo.kit_id == kit_id))).scalar()
+    
     def delete(self, kit_id: int) -> bool:
-        kit = self.get_by_id(kit_id)
-        if kit:
-            kit.is_active = False
+        """Borra el kit y su composición; ValueError si un préstamo lo usa (la devolución ya no sabría qué
+        unidades liberar)."""
+        kit = self.db.get(Kit, kit_id)
+        if not kit:
+            return False
+        if self.is_referenced(kit_id):
+            self.db.rollback()
+            raise ValueError("Kit is referenced by loans")
+        self.db.query(KitComponente).filter(KitComponente.kit_id == kit_id).delete(synchronize_session=False)
+        self.db.delete(kit)
+        try:
             self.db.commit()
-            return True
-        return False
\ No newline at end of file
+        except IntegrityError:
+            # Un préstamo lo referenció entre el chequeo y el DELETE
+            self.db.rollback()
+            raise ValueError("Kit is referenced by loans")
+        return True
\ No newline at end of file
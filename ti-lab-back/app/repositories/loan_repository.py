@@ -1,45 +1,360 @@
-from sqlalchemy.orm import Session
-from sqlalchemy.sql import func
-from typing import List, Optional
-from app.models.loan import Loan
-from app.schemas.loan import LoanCreate, LoanUpdate
+from datetime import datetime
+from sqlalchemy import Row, and_, or_, func, insert, select, update
+from sqlalchemy.orm import Session, Query, selectinload, joinedload
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from app.core.fieldsets import FULL, FieldSet
+from app.models.alumno import Alumno
+from app.models.componente import Componente
+from app.models.detalle_prestamo import DetallePrestamo
+from app.models.jornada_prestamo import JornadaPrestamo
+from app.models.kit import Kit
+from app.models.kit_componente import KitComponente
+from app.models.prestamo import Prestamo, ESTADO_ACTIVO, ESTADO_DEVUELTO, ESTADO_VENCIDO, estado_abierto
+from app.repositories.kit_repository import KitRepository
+from app.schemas.loan import BulkLoanAssignment, LoanCreate, LoanUpdate
+
+# Kit embebido en un detalle sin "detalles.kit.componentes": solo sus columnas
+KIT_SIN_COMPONENTES = FieldSet(fields=frozenset({"id", "nombre", "descripcion"}), expand=frozenset())
 
 
 class LoanRepository:
     def __init__(self, db: Session):
         self.db = db
     
-    def get_all(self, skip: int = 0, limit: int = 100) -> List[Loan]:
-        return self.db.query(Loan).offset(skip).limit(limit).all()
+    def _query_with_detalles(self) -> Query:
+        return self.db.query(Prestamo).options(
+            selectinload(Prestamo.detalles).options(
+                joinedload(DetallePrestamo.componente),
+                joinedload(DetallePrestamo.kit)
+                .selectinload(Kit.kit_componentes)
+                .joinedload(KitComponente.componente),
+            )
+        )
+    
+    @staticmethod
+    def _after_clause(after: Tuple[datetime, int]):
+        # Más recientes primero; (fecha_prestamo, id) es la clave del keyset.
+        # El rango redundante sobre fecha_prestamo deja a SQLite buscar en ix_prestamos_fecha_id (el OR solo lo recorre)
+        fecha, loan_id = after
+        return and_(
+            Prestamo.fecha_prestamo <= fecha,
+            or_(
+                Prestamo.fecha_prestamo < fecha,
+                and_(Prestamo.fecha_prestamo == fecha, Prestamo.id < loan_id),
+            ),
+        )
+    
+    def get_all(
+        self, skip: int = 0, limit: int = 100, after: Optional[Tuple[datetime, int]] = None
+    ) -> List[Prestamo]:
+        query = self._query_with_detalles().order_by(Prestamo.fecha_prestamo.desc(), Prestamo.id.desc())
+        if after is not None:
+            query = query.filter(self._after_clause(after))
+        else:
+            query = query.offset(skip)
+        return query.limit(limit).all()
+    
+    @staticmethod
+    def _select_rows(fieldset: FieldSet = FULL, keyset: Tuple[str, ...] = ()):
+        # Las columnas del keyset se leen aunque no se pidan: el cursor de la siguiente página las necesita
+        columns = (
+            Prestamo.id,
+            Prestamo.jornada_id,
+            Prestamo.alumno_id,
+            Prestamo.estado,
+            Prestamo.fecha_prestamo,
+            Prestamo.fecha_devolucion,
+            Prestamo.fecha_limite,
+        )
+        return select(*[column for column in columns if fieldset.includes(column.key) or column.key in keyset])
+    
+    def get_all_rows(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        after: Optional[Tuple[datetime, int]] = None,
+        fieldset: FieldSet = FULL,
+    ) -> List[dict]:
+        query = self._select_rows(fieldset, keyset=("fecha_prestamo",)).order_by(
+            Prestamo.fecha_prestamo.desc(), Prestamo.id.desc()
+        )
+        if after is not None:
+            query = query.where(self._after_clause(after))
+        else:
+            query = query.offset(skip)
+        loans = [dict(row) for row in self.db.execute(query.limit(limit)).mappings()]
+        return self._attach_detalles(loans, fieldset)
+    
+    def get_row_by_id(self, loan_id: int, fieldset: FieldSet = FULL) -> Optional[dict]:
+        row = self.db.execute(self._select_rows(fieldset).where(Prestamo.id == loan_id)).mappings().first()
+        return self._attach_detalles([dict(row)], fieldset)[0] if row else None
+    
+    def _attach_detalles(self, loans: List[dict], fieldset: FieldSet = FULL) -> List[dict]:
+        # Cada expansión que no se pide es un JOIN o una consulta menos
+        if not loans or not fieldset.includes("detalles"):
+            return loans
+        con_componente = fieldset.expands("detalles.componente")
+        con_kit = fieldset.expands("detalles.kit")
+        query = (
+            select(
+                DetallePrestamo.id,
+                DetallePrestamo.prestamo_id,
+                DetallePrestamo.componente_id,
+                DetallePrestamo.kit_id,
+                DetallePrestamo.cantidad,
+                DetallePrestamo.numero_serie,
+            )
+            .where(DetallePrestamo.prestamo_id.in_([loan["id"] for loan in loans]))
+            .order_by(DetallePrestamo.id)
+        )
+        if con_componente:
+            query = query.add_columns(Componente.nombre, Componente.requiere_numero_serie).outerjoin(
+                Componente, Componente.id == DetallePrestamo.componente_id
+            )
+        rows = self.db.execute(query).all()
+        kits = {}
+        if con_kit:
+            kits = KitRepository(self.db).get_rows_by_ids(
+                {row.kit_id for row in rows if row.kit_id},
+                FULL if fieldset.expands("detalles.kit.componentes") else KIT_SIN_COMPONENTES,
+            )
+        
+        by_loan: Dict[int, List[dict]] = {loan["id"]: [] for loan in loans}
+        for row in rows:
+            detalle = {
+                "id": row.id,
+                "componente_id": row.componente_id,
+                "kit_id": row.kit_id,
+                "cantidad": row.cantidad,
+                "numero_serie": row.numero_serie,
+            }
+            if con_componente:
+                detalle["componente"] = {
+                    "id": row.componente_id,
+                    "nombre": row.nombre,
+                    "requiere_numero_serie": row.requiere_numero_serie,
+                } if row.componente_id else None
+            if con_kit:
+                detalle["kit"] = kits.get(row.kit_id) if row.kit_id else None
+            by_loan[row.prestamo_id].append(detalle)
+        for loan in loans:
+            loan["detalles"] = by_loan[loan["id"]]
+        return loans
+    
+    def iter_export_rows(
+        self, desde: Optional[datetime] = None, hasta: Optional[datetime] = None, batch_size: int = 1000
+    ) -> Iterator[Sequence[Row]]:
+        """Historial completo, una fila por detalle, en lotes de `batch_size` leídos del cursor.
+        
+        yield_per activa el cursor de servidor donde el driver lo soporta (stream_results); en
+        SQLite el cursor ya es incremental. Nada se acumula: cada lote se descarta al pedir el siguiente.
+        """
+        query = (
+            select(
+                Prestamo.id.label("prestamo_id"),
+                Prestamo.estado,
+                Prestamo.fecha_prestamo,
+                Prestamo.fecha_devolucion,
+                Alumno.id.label("alumno_id"),
+                Alumno.codigo.label("alumno_codigo"),
+                Alumno.nombres.label("alumno_nombres"),
+                Alumno.apellidos.label("alumno_apellidos"),
+                JornadaPrestamo.id.label("jornada_id"),
+                JornadaPrestamo.fecha.label("jornada_fecha"),
+                JornadaPrestamo.curso_id,
+                JornadaPrestamo.seccion_id,
+                DetallePrestamo.id.label("detalle_id"),
+                DetallePrestamo.componente_id,
+                Componente.nombre.label("componente_nombre"),
+                DetallePrestamo.kit_id,
+                Kit.nombre.label("kit_nombre"),
+                DetallePrestamo.cantidad,
+                DetallePrestamo.numero_serie,
+            )
+            .join(Alumno, Alumno.id == Prestamo.alumno_id)
+            .join(JornadaPrestamo, JornadaPrestamo.id == Prestamo.jornada_id)
+            .outerjoin(DetallePrestamo, DetallePrestamo.prestamo_id == Prestamo.id)
+            .outerjoin(Componente, Componente.id == DetallePrestamo.componente_id)
+            .outerjoin(Kit, Kit.id == DetallePrestamo.kit_id)
+            # Recorre ix_prestamos_fecha_id en orden; los detalles de cada préstamo quedan contiguos
+            .order_by(Prestamo.fecha_prestamo, Prestamo.id, DetallePrestamo.id)
+        )
+        if desde is not None:
+            query = query.where(Prestamo.fecha_prestamo >= desde)
+        if hasta is not None:
+            query = query.where(Prestamo.fecha_prestamo < hasta)
+        result = self.db.execute(query.execution_options(yield_per=batch_size))
+        try:
+            yield from result.partitions()
+        finally:
+            result.close()
+    
+    def get_by_id(self, loan_id: int) -> Optional[Prestamo]:
+        return self._query_with_detalles().filter(Prestamo.id == loan_id).first()
+    
+    def get_active_loans(self) -> List[Prestamo]:
+        # Incluye los vencidos: siguen fuera del laboratorio
+        return self._query_with_detalles().filter(estado_abierto()).all()
+    
+    def get_overdue_rows(
+        self, limit: int = 100, after: Optional[Tuple[datetime, int]] = None, fieldset: FieldSet = FULL
+    ) -> List[dict]:
+        # Los que vencieron primero van primero; (fecha_limite, id) es la clave del keyset.
+        # estado_abierto() repite el predicado del índice parcial: SQLite no lo deduce de estado == X
+        # y sin él no usaría ix_prestamos_vencimiento
+        query = self._select_rows(fieldset, keyset=("fecha_limite",)).where(
+            estado_abierto(), Prestamo.estado == ESTADO_VENCIDO
+        )
+        if after is not None:
+            fecha, loan_id = after
+            query = query.where(
+                Prestamo.fecha_limite >= fecha,
+                or_(Prestamo.fecha_limite > fecha, and_(Prestamo.fecha_limite == fecha, Prestamo.id > loan_id)),
+            )
+        query = query.order_by(Prestamo.fecha_limite, Prestamo.id).limit(limit)
+        loans = [dict(row) for row in self.db.execute(query).mappings()]
+        return self._attach_detalles(loans, fieldset)
     
-    def get_by_id(self, loan_id: int) -> Optional[Loan]:
-        return self.db.query(Loan).filter(Loan.id == loan_id).first()
+    def mark_overdue(self, ahora: datetime) -> int:
+        """Pasa a vencido cada préstamo activo con fecha_limite <= ahora. Sin commit."""
+        # Mismo predicado redundante que get_overdue_rows: busca en el índice solo los que vencen
+        result = self.db.execute(
+            update(Prestamo)
+            .where(
+                estado_abierto(),
+                Prestamo.estado == ESTADO_ACTIVO,
+                Prestamo.fecha_limite <= ahora,
+            )
+            .values(estado=ESTADO_VENCIDO)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
     
-    def get_active_loans(self) -> List[Loan]:
-        return self.db.query(Loan).filter(Loan.status == "active").all()
+    def next_due_date(self) -> Optional[datetime]:
+        return self.db.scalar(
+            select(func.min(Prestamo.fecha_limite)).where(
+                estado_abierto(),
+                Prestamo.estado == ESTADO_ACTIVO,
+                Prestamo.fecha_limite.is_not(None),
+            )
+        )
     
-    def create(self, loan_data: LoanCreate) -> Loan:
-        loan = Loan(**loan_data.dict())
+    def get_open_ids_by_serial(self, numeros_serie: Iterable[str]) -> Dict[str, int]:
+        """{numero_serie: prestamo_id} del préstamo abierto que tiene cada serie."""
+        rows = self.db.execute(
+            select(DetallePrestamo.numero_serie, DetallePrestamo.prestamo_id)
+            .join(Prestamo, Prestamo.id == DetallePrestamo.prestamo_id)
+            .where(DetallePrestamo.numero_serie.in_(list(numeros_serie)), estado_abierto())
+        ).all()
+        return {numero_serie: prestamo_id for numero_serie, prestamo_id in rows}
+    
+    def get_return_rows(self, loan_ids: Iterable[int]) -> Dict[int, Row]:
+        # Lo que la devolución necesita de cada préstamo: su estado y, para el resumen de uso, su jornada
+        rows = self.db.execute(
+            select(
+                Prestamo.id,
+                Prestamo.estado,
+                Prestamo.fecha_prestamo,
+                JornadaPrestamo.seccion_id,
+                JornadaPrestamo.fecha,
+                JornadaPrestamo.curso_id,
+            )
+            .join(JornadaPrestamo, JornadaPrestamo.id == Prestamo.jornada_id)
+            .where(Prestamo.id.in_(list(loan_ids)))
+        ).all()
+        return {row.id: row for row in rows}
+    
+    def return_many(self, loan_ids: Iterable[int], fecha_devolucion: datetime) -> List[int]:
+        """Cierra los préstamos que sigan abiertos y devuelve sus ids. Sin commit.
+        
+        El filtro por estado va en el mismo UPDATE: si otra petición devolvió alguno entretanto,
+        simplemente no aparece en el RETURNING.
+        """
+        return list(self.db.scalars(
+            update(Prestamo)
+            .where(Prestamo.id.in_(list(loan_ids)), estado_abierto())
+            .values(estado=ESTADO_DEVUELTO, fecha_devolucion=fecha_devolucion)
+            .returning(Prestamo.id)
+            .execution_options(synchronize_session=False)
+        ))
+    
+    def get_jornada(self, jornada_id: int) -> Optional[JornadaPrestamo]:
+        return self.db.get(JornadaPrestamo, jornada_id)
+    
+    def get_alumno(self, alumno_id: int) -> Optional[Alumno]:
+        return self.db.get(Alumno, alumno_id)
+    
+    def get_alumnos(self, alumno_ids: Iterable[int]) -> Dict[int, Alumno]:
+        alumnos = self.db.query(Alumno).filter(Alumno.id.in_(list(alumno_ids))).all()
+        return {alumno.id: alumno for alumno in alumnos}
+    
+    def bulk_create(
+        self, jornada_id: int, asignaciones: List[BulkLoanAssignment], fecha_limite: Optional[datetime] = None
+    ) -> Dict[int, int]:
+        # Un INSERT ... RETURNING para los préstamos y un executemany para sus detalles.
+        # Se devuelve {alumno_id: prestamo_id}; el servicio garantiza un alumno por asignación.
+        if not asignaciones:
+            return {}
+        ahora = datetime.now()
+        rows = self.db.execute(
+            insert(Prestamo).returning(Prestamo.id, Prestamo.alumno_id),
+            [
+                {
+                    "jornada_id": jornada_id,
+                    "alumno_id": asignacion.alumno_id,
+                    "estado": ESTADO_ACTIVO,
+                    "fecha_prestamo": ahora,
+                    "fecha_limite": fecha_limite,
+                }
+                for asignacion in asignaciones
+            ],
+        ).all()
+        loan_ids = {alumno_id: loan_id for loan_id, alumno_id in rows}
+        # render_nulls: sin él, el ORM agrupa las filas por columnas no nulas y alternar
+        # componente/kit parte el executemany en un INSERT por detalle. El RETURNING le da los ids a la auditoría
+        self.db.execute(
+            insert(DetallePrestamo).returning(DetallePrestamo.id).execution_options(render_nulls=True),
+            [
+                {"prestamo_id": loan_ids[asignacion.alumno_id], **detalle.dict()}
+                for asignacion in asignaciones
+                for detalle in asignacion.detalles
+            ],
+        )
+        self.db.commit()
+        return loan_ids
+    
+    def create(self, loan_data: LoanCreate) -> Prestamo:
+        loan = Prestamo(
+            jornada_id=loan_data.jornada_id,
+            alumno_id=loan_data.alumno_id,
+            estado=ESTADO_ACTIVO,
+            fecha_limite=loan_data.fecha_limite,
+            detalles=[DetallePrestamo(**detalle.dict()) for detalle in loan_data.detalles],
+        )
         self.db.add(loan)
         self.db.commit()
-        self.db.refresh(loan)
-        return loan
+        return self.get_by_id(loan.id)
     
-    def update(self, loan_id: int, loan_data: LoanUpdate) -> Optional[Loan]:
+    def update(self, loan_id: int, loan_data: LoanUpdate) -> Optional[Prestamo]:
         loan = self.get_by_id(loan_id)
         if loan:
             update_data = loan_data.dict(exclude_unset=True)
             for field, value in update_data.items():
                 setattr(loan, field, value)
             self.db.commit()
-            self.db.refresh(loan)
+            loan = self.get_by_id(loan_id)
         return loan
     
-    def return_loan(self, loan_id: int) -> Optional[Loan]:
-        loan = self.get_by_id(loan_id)
-        if loan and loan.status == "active":
-            loan.status = "returned"
-            loan.return_date = func.now()
-            self.db.commit()
-            self.db.refresh(loan)
-        return loan
\ No newline at end of file
+    def return_loan(self, loan_id: int, fecha_devolucion: datetime) -> bool:
+        """Cierra el préstamo si sigue abierto. Sin commit.
+        
+        Como en return_many, el estado se comprueba en el propio UPDATE: de dos devoluciones
+        concurrentes solo una recibe la fila y libera el ledger.
+        """
+        return self.db.scalar(
+            update(Prestamo)
+            .where(Prestamo.id == loan_id, estado_abierto())
+            .values(estado=ESTADO_DEVUELTO, fecha_devolucion=fecha_devolucion)
+            .returning(Prestamo.id)
+            .execution_options(synchronize_session=False)
+        ) is not None
\ No newline at end of file
@@ -0,0 +1,58 @@
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable, List, Tuple
+from app.models.alumno import Alumno
+from app.models.curso import Curso
+from app.models.seccion import Seccion
+
+
+class RosterRepository:
+    """Lecturas por lote (IN) y escrituras executemany para la importación de nóminas.
+    
+    Ninguna operación confirma: el servicio decide cuándo hacer commit de cada lote.
+    """
+    
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def get_cursos(self, codigos: Iterable[str]) -> Dict[str, Tuple[int, str]]:
+        rows = self.db.execute(
+            select(Curso.id, Curso.codigo, Curso.nombre).where(Curso.codigo.in_(list(codigos)))
+        )
+        return {codigo: (curso_id, nombre) for curso_id, codigo, nombre in rows}
+    
+    def get_secciones(self, curso_ids: Iterable[int]) -> Dict[Tuple[int, str], Tuple[int, str]]:
+        rows = self.db.execute(
+            select(Seccion.id, Seccion.curso_id, Seccion.nombre, Seccion.profesor)
+            .where(Seccion.curso_id.in_(list(curso_ids)))
+        )
+        return {(curso_id, nombre): (seccion_id, profesor) for seccion_id, curso_id, nombre, profesor in rows}
+    
+    def get_alumnos(
+        self, seccion_ids: Iterable[int], codigos: Iterable[str]
+    ) -> Dict[Tuple[int, str], Tuple[int, str, str]]:
+        # El IN por código usa ix_alumnos_codigo; el filtro por sección descarta otros semestres
+        rows = self.db.execute(
+            select(Alumno.id, Alumno.seccion_id, Alumno.codigo, Alumno.nombres, Alumno.apellidos)
+            .where(Alumno.codigo.in_(list(codigos)), Alumno.seccion_id.in_(list(seccion_ids)))
+        )
+        return {
+            (seccion_id, codigo): (alumno_id, nombres, apellidos)
+            for alumno_id, seccion_id, codigo, nombres, apellidos in rows
+        }
+    
+    def insert_many(self, model, rows: List[dict], *keys: str) -> Dict[Tuple, int]:
+        """INSERT en un executemany; con `keys` usa RETURNING y devuelve {(valores de `keys`): id}."""
+        if not rows:
+            return {}
+        if not keys:
+            self.db.execute(insert(model), rows)
+            return {}
+        columns = [getattr(model, key) for key in keys]
+        result = self.db.execute(insert(model).returning(model.id, *columns), rows)
+        return {tuple(values): row_id for row_id, *values in result}
+    
+    def update_many(self, model, rows: List[dict]) -> None:
+        # UPDATE por clave primaria: cada dict trae "id" y las columnas a cambiar
+        if rows:
+            self.db.execute(update(model), rows)
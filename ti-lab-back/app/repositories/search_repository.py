@@ -0,0 +1,83 @@
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+from typing import Dict, List, Optional, Tuple
+from app.models.alumno import Alumno
+from app.models.componente import Componente
+
+# Se rankean como máximo CANDIDATOS coincidencias por tipo: bm25 sobre todas las filas que
+# casan con un prefijo de una letra costaría decenas de ms con 50k alumnos
+CANDIDATOS = 200
+
+_SEARCH_COMPONENTES = text(
+    "SELECT c.id, c.nombre, -f.rank AS score FROM ("
+    "  SELECT rowid, bm25(componentes_fts) AS rank FROM componentes_fts"
+    "  WHERE componentes_fts MATCH :match LIMIT :candidatos"
+    ") AS f JOIN componentes c ON c.id = f.rowid ORDER BY f.rank LIMIT :limit"
+)
+_SEARCH_ALUMNOS = (
+    "SELECT a.id, a.codigo, a.nombres, a.apellidos, -f.rank AS score FROM ("
+    "  SELECT rowid, bm25(alumnos_fts) AS rank FROM alumnos_fts"
+    "  WHERE alumnos_fts MATCH :match {codigo} LIMIT :candidatos"
+    ") AS f JOIN alumnos a ON a.id = f.rowid ORDER BY f.rank LIMIT :limit"
+)
+_CODIGO_RANGE = "a.codigo >= :desde AND a.codigo < :hasta"
+_SEARCH_ALUMNOS_FTS = text(_SEARCH_ALUMNOS.format(codigo=""))
+_SEARCH_ALUMNOS_FTS_CODIGO = text(
+    _SEARCH_ALUMNOS.format(codigo=f"AND rowid IN (SELECT a.id FROM alumnos a WHERE {_CODIGO_RANGE})")
+)
+_SEARCH_ALUMNOS_CODIGO = text(
+    f"SELECT a.id, a.codigo, a.nombres, a.apellidos, 1.0 AS score FROM alumnos a "
+    f"WHERE {_CODIGO_RANGE} ORDER BY a.codigo LIMIT :limit"
+)
+
+# Por URL de la base: si la migración de búsqueda creó las tablas FTS5
+_fts_available: Dict[str, bool] = {}
+
+
+def fts_match_expression(words: List[str]) -> str:
+    # Cada palabra como prefijo entre comillas (sin operadores FTS del usuario), todas requeridas
+    return " ".join('"{}"*'.format(word.replace('"', '""')) for word in words)
+
+
+def _prefix_range(prefix: str) -> dict:
+    # Rango [prefijo, prefijo + U+FFFF) que recorre ix_alumnos_codigo en vez de LIKE 'x%'
+    return {"desde": prefix, "hasta": prefix + "\uffff"}
+
+
+class SearchRepository:
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def has_fts(self) -> bool:
+        bind = self.db.get_bind()
+        key = str(bind.url)
+        if key not in _fts_available:
+            available = bind.dialect.name == "sqlite" and self.db.execute(
+                text("SELECT count(*) FROM sqlite_master WHERE type = 'table' AND name IN ('componentes_fts', 'alumnos_fts')")
+            ).scalar() == 2
+            _fts_available[key] = available
+        return _fts_available[key]
+    
+    def search_componentes(self, words: List[str], limit: int) -> List[dict]:
+        params = {"match": fts_match_expression(words), "candidatos": CANDIDATOS, "limit": limit}
+        return [dict(row) for row in self.db.execute(_SEARCH_COMPONENTES, params).mappings()]
+    
+    def search_alumnos(self, words: List[str], codigo: Optional[str], limit: int) -> List[dict]:
+        params = {"limit": limit, "candidatos": CANDIDATOS}
+        if codigo:
+            params.update(_prefix_range(codigo))
+        if words:
+            params["match"] = fts_match_expression(words)
+            statement = _SEARCH_ALUMNOS_FTS_CODIGO if codigo else _SEARCH_ALUMNOS_FTS
+        else:
+            statement = _SEARCH_ALUMNOS_CODIGO
+        return [dict(row) for row in self.db.execute(statement, params).mappings()]
+    
+    def get_componente_documents(self) -> List[Tuple[int, str]]:
+        return [tuple(row) for row in self.db.execute(select(Componente.id, Componente.nombre))]
+    
+    def get_alumno_documents(self) -> List[Tuple[int, str, str, str]]:
+        return [
+            tuple(row)
+            for row in self.db.execute(select(Alumno.id, Alumno.codigo, Alumno.nombres, Alumno.apellidos))
+        ]
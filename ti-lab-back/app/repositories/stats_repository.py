@@ -0,0 +1,140 @@
+from datetime import date
+from sqlalchemy import Integer, case, cast, delete, func, insert, select, union_all
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from app.models.componente import Componente
+from app.models.detalle_prestamo import DetallePrestamo
+from app.models.jornada_prestamo import JornadaPrestamo
+from app.models.kit_componente import KitComponente
+from app.models.prestamo import Prestamo, ESTADO_DEVUELTO
+from app.models.uso_diario import UsoDiario
+
+CONTADORES = ("prestamos", "unidades", "devoluciones", "segundos_fuera")
+
+
+class StatsRepository:
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def increment(self, rows: List[dict]) -> None:
+        """Suma los contadores de cada fila a su bucket (seccion_id, fecha, componente_id), creándolo si no existe.
+        
+        Sin commit: se confirma en la misma transacción que el préstamo/devolución.
+        """
+        if not rows:
+            return
+        # INSERT ... ON CONFLICT DO UPDATE: misma sintaxis en SQLite y PostgreSQL
+        dialect = postgresql if self.db.get_bind().dialect.name == "postgresql" else sqlite
+        table = UsoDiario.__table__
+        statement = dialect.insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.seccion_id, table.c.fecha, table.c.componente_id],
+            set_={name: table.c[name] + statement.excluded[name] for name in CONTADORES},
+        )
+        self.db.execute(statement, rows)
+    
+    def _seconds_out(self):
+        if self.db.get_bind().dialect.name == "sqlite":
+            dias = func.julianday(Prestamo.fecha_devolucion) - func.julianday(Prestamo.fecha_prestamo)
+            return cast(func.round(dias * 86400), Integer)
+        return cast(func.extract("epoch", Prestamo.fecha_devolucion - Prestamo.fecha_prestamo), Integer)
+    
+    def rebuild(self, desde: Optional[date] = None, hasta: Optional[date] = None) -> int:
+        """Recalcula los buckets desde el historial (todo, o las jornadas en [desde, hasta))."""
+        borrar = delete(UsoDiario)
+        if desde is not None:
+            borrar = borrar.where(UsoDiario.fecha >= desde)
+        if hasta is not None:
+            borrar = borrar.where(UsoDiario.fecha < hasta)
+        self.db.execute(borrar)
+        
+        # Unidades por (préstamo, componente): directas más las de cada kit según su composición
+        por_detalle = union_all(
+            select(
+                DetallePrestamo.prestamo_id,
+                DetallePrestamo.componente_id,
+                DetallePrestamo.cantidad.label("cantidad"),
+            ).where(DetallePrestamo.componente_id.is_not(None)),
+            select(
+                DetallePrestamo.prestamo_id,
+                KitComponente.componente_id,
+                (DetallePrestamo.cantidad * KitComponente.cantidad).label("cantidad"),
+            ).join(KitComponente, KitComponente.kit_id == DetallePrestamo.kit_id),
+        ).subquery()
+        por_prestamo = (
+            select(por_detalle.c.prestamo_id, por_detalle.c.componente_id, func.sum(por_detalle.c.cantidad).label("unidades"))
+            .group_by(por_detalle.c.prestamo_id, por_detalle.c.componente_id)
+            .subquery()
+        )
+        devuelto = (Prestamo.estado == ESTADO_DEVUELTO) & Prestamo.fecha_devolucion.is_not(None)
+        resumen = (
+            select(
+                JornadaPrestamo.seccion_id,
+                JornadaPrestamo.fecha,
+                por_prestamo.c.componente_id,
+                JornadaPrestamo.curso_id,
+                func.count(),
+                func.sum(por_prestamo.c.unidades),
+                func.sum(case((devuelto, 1), else_=0)),
+                func.sum(case((devuelto, self._seconds_out()), else_=0)),
+            )
+            .select_from(por_prestamo)
+            .join(Prestamo, Prestamo.id == por_prestamo.c.prestamo_id)
+            .join(JornadaPrestamo, JornadaPrestamo.id == Prestamo.jornada_id)
+            .group_by(JornadaPrestamo.seccion_id, JornadaPrestamo.fecha, por_prestamo.c.componente_id, JornadaPrestamo.curso_id)
+        )
+        if desde is not None:
+            resumen = resumen.where(JornadaPrestamo.fecha >= desde)
+        if hasta is not None:
+            resumen = resumen.where(JornadaPrestamo.fecha < hasta)
+        columnas = ["seccion_id", "fecha", "componente_id", "curso_id", *CONTADORES]
+        return self.db.execute(insert(UsoDiario.__table__).from_select(columnas, resumen)).rowcount
+    
+    @staticmethod
+    def _filtered(query, curso_id, seccion_id, componente_id, desde, hasta):
+        if curso_id is not None:
+            query = query.where(UsoDiario.curso_id == curso_id)
+        if seccion_id is not None:
+            query = query.where(UsoDiario.seccion_id == seccion_id)
+        if componente_id is not None:
+            query = query.where(UsoDiario.componente_id == componente_id)
+        if desde is not None:
+            query = query.where(UsoDiario.fecha >= desde)
+        if hasta is not None:
+            query = query.where(UsoDiario.fecha < hasta)
+        return query
+    
+    @staticmethod
+    def _totals():
+        return [func.sum(getattr(UsoDiario, name)).label(name) for name in CONTADORES]
+    
+    def by_component(
+        self,
+        curso_id: Optional[int] = None,
+        seccion_id: Optional[int] = None,
+        desde: Optional[date] = None,
+        hasta: Optional[date] = None,
+        limit: int = 50,
+    ) -> List[dict]:
+        query = self._filtered(
+            select(UsoDiario.componente_id, Componente.nombre.label("componente_nombre"), *self._totals())
+            .join(Componente, Componente.id == UsoDiario.componente_id),
+            curso_id, seccion_id, None, desde, hasta,
+        )
+        query = query.group_by(UsoDiario.componente_id, Componente.nombre).order_by(
+            func.sum(UsoDiario.prestamos).desc(), UsoDiario.componente_id
+        )
+        return [dict(row) for row in self.db.execute(query.limit(limit)).mappings()]
+    
+    def by_day(
+        self,
+        curso_id: Optional[int] = None,
+        seccion_id: Optional[int] = None,
+        componente_id: Optional[int] = None,
+        desde: Optional[date] = None,
+        hasta: Optional[date] = None,
+    ) -> List[dict]:
+        query = self._filtered(select(UsoDiario.fecha, *self._totals()), curso_id, seccion_id, componente_id, desde, hasta)
+        query = query.group_by(UsoDiario.fecha).order_by(UsoDiario.fecha)
+        return [dict(row) for row in self.db.execute(query).mappings()]
@@ -0,0 +1,19 @@
+from datetime import datetime
+from pydantic import BaseModel
+from typing import Any, Dict, Literal, Optional
+
+AuditTable = Literal["prestamos", "detalles_prestamo"]
+
+
+class AuditEntry(BaseModel):
+    id: int
+    registrado_en: datetime
+    actor: Optional[str] = None
+    tabla: AuditTable
+    registro_id: Optional[int] = None
+    prestamo_id: Optional[int] = None
+    # "crear", "actualizar" o "eliminar"
+    accion: str
+    # Al actualizar, solo las columnas que cambiaron; None al crear (antes) o al eliminar (después)
+    antes: Optional[Dict[str, Any]] = None
+    despues: Optional[Dict[str, Any]] = None
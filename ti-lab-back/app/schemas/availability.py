@@ -0,0 +1,31 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+
+class ComponentAvailability(BaseModel):
+    componente_id: int
+    en_stock: int
+    prestados: int
+    disponibles: int
+    version: int
+
+    class Config:
+        from_attributes = True
+
+
+class StockUpdate(BaseModel):
+    en_stock: int = Field(ge=0)
+    # Versión leída por el cliente (ComponentAvailability.version); si cambió, 409
+    version: Optional[int] = None
+
+
+class AvailabilityDrift(BaseModel):
+    componente_id: int
+    prestados_registrados: int
+    prestados_reales: int
+
+
+class ReconciliationReport(BaseModel):
+    filas_creadas: int
+    drift: List[AvailabilityDrift]
+    corregido: bool
\ No newline at end of file
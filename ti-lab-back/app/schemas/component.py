@@ -1,14 +1,10 @@
-from pydantic import BaseModel, EmailStr
-from datetime import datetime
+from pydantic import BaseModel
 from typing import Optional
 
 
 class ComponentBase(BaseModel):
-    name: str
-    description: Optional[str] = None
-    serial_number: str
-    category: Optional[str] = None
-    status: str = "available"
+    nombre: str
+    requiere_numero_serie: bool = False
 
 
 class ComponentCreate(ComponentBase):
@@ -16,18 +12,12 @@ class ComponentCreate(ComponentBase):
 
 
 class ComponentUpdate(BaseModel):
-    name: Optional[str] = None
-    description: Optional[str] = None
-    serial_number: Optional[str] = None
-    category: Optional[str] = None
-    status: Optional[str] = None
+    nombre: Optional[str] = None
+    requiere_numero_serie: Optional[bool] = None
 
 
 class Component(ComponentBase):
     id: int
-    created_at: datetime
-    updated_at: Optional[datetime] = None
-    is_active: bool
     
     class Config:
         from_attributes = True
\ No newline at end of file
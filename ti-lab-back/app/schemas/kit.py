@@ -1,5 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, AliasChoices
 from typing import Optional, List
+from app.core.fieldsets import FieldSetSpec
 
 
 class ComponenteBase(BaseModel):
@@ -9,7 +10,7 @@ class ComponenteBase(BaseModel):
 
 class Componente(ComponenteBase):
     id: int
-    
+
     class Config:
         from_attributes = True
 
@@ -22,7 +23,7 @@ class KitComponenteBase(BaseModel):
 class KitComponente(KitComponenteBase):
     id: int
     componente: Componente
-    
+
     class Config:
         from_attributes = True
 
@@ -43,7 +44,13 @@ class KitUpdate(BaseModel):
 
 class Kit(KitBase):
     id: int
-    componentes: List[KitComponente] = []
-    
+    # Desde el ORM la composición llega como Kit.kit_componentes
+    componentes: List[KitComponente] = Field(
+        default=[], validation_alias=AliasChoices("componentes", "kit_componentes")
+    )
+
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+KIT_FIELDSET = FieldSetSpec(Kit, expand=("componentes.componente",))
@@ -1,40 +1,118 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import Annotated, Literal, Optional, List
+from app.core.fieldsets import FieldSetSpec
+from app.core.pagination import MAX_ID
 from app.schemas.component import Component
 from app.schemas.kit import Kit
 
+LoanExportFormat = Literal["csv", "ndjson"]
+
+# Ítems por lista en una devolución masiva
+MAX_RETURN_ITEMS = 500
+
+# Id recibido en el cuerpo: fuera de rango sería un 500 (OverflowError) en vez de un 422
+EntityId = Annotated[int, Field(gt=0, le=MAX_ID)]
+
+
+class LoanDetailBase(BaseModel):
+    componente_id: Optional[EntityId] = None
+    kit_id: Optional[EntityId] = None
+    cantidad: int = Field(default=1, gt=0)
+    numero_serie: Optional[str] = None
+
+
+class LoanDetailCreate(LoanDetailBase):
+    pass
+
+
+class LoanDetail(LoanDetailBase):
+    id: int
+    componente: Optional[Component] = None
+    kit: Optional[Kit] = None
+
+    class Config:
+        from_attributes = True
+
 
 class LoanBase(BaseModel):
-    user_name: str
-    user_email: EmailStr
-    component_id: Optional[int] = None
-    kit_id: Optional[int] = None
-    expected_return_date: datetime
-    notes: Optional[str] = None
+    jornada_id: EntityId
+    alumno_id: EntityId
 
 
 class LoanCreate(LoanBase):
-    pass
+    detalles: List[LoanDetailCreate] = Field(min_length=1)
+    # Por defecto, ahora + LOAN_DUE_HOURS (sin plazo si es 0)
+    fecha_limite: Optional[datetime] = None
 
 
 class LoanUpdate(BaseModel):
-    user_name: Optional[str] = None
-    user_email: Optional[EmailStr] = None
-    return_date: Optional[datetime] = None
-    status: Optional[str] = None
-    notes: Optional[str] = None
+    # Sin estado: prestar, devolver y vencer pasan por sus rutas, que ajustan disponibilidad y uso diario
+    fecha_devolucion: Optional[datetime] = None
+    fecha_limite: Optional[datetime] = None
+
+    class Config:
+        extra = "forbid"
 
 
 class Loan(LoanBase):
     id: int
-    loan_date: datetime
-    return_date: Optional[datetime] = None
-    status: str
-    created_at: datetime
-    updated_at: Optional[datetime] = None
-    component: Optional[Component] = None
-    kit: Optional[Kit] = None
-    
+    estado: str
+    fecha_prestamo: datetime
+    fecha_devolucion: Optional[datetime] = None
+    fecha_limite: Optional[datetime] = None
+    detalles: List[LoanDetail] = []
+
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+# "detalles.kit" embebe el kit sin su composición; "detalles.kit.componentes", el kit completo
+LOAN_FIELDSET = FieldSetSpec(Loan, expand=("detalles.componente", "detalles.kit", "detalles.kit.componentes"))
+
+
+class BulkLoanAssignment(BaseModel):
+    alumno_id: EntityId
+    detalles: List[LoanDetailCreate] = Field(min_length=1)
+
+
+class BulkLoanCreate(BaseModel):
+    jornada_id: EntityId
+    asignaciones: List[BulkLoanAssignment] = Field(min_length=1)
+    # Común a todos los préstamos del lote; mismo valor por defecto que LoanCreate
+    fecha_limite: Optional[datetime] = None
+
+
+class BulkLoanResult(BaseModel):
+    indice: int
+    alumno_id: int
+    prestamo_id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class BulkLoanResponse(BaseModel):
+    jornada_id: int
+    creados: int
+    rechazados: int
+    resultados: List[BulkLoanResult]
+
+
+class LoanReturnBatch(BaseModel):
+    # Préstamos por id o por número de serie escaneado (el préstamo abierto que lo tiene); cada lista
+    # termina en un IN (...), así que se acota como ?ids=
+    prestamo_ids: List[EntityId] = Field(default=[], max_length=MAX_RETURN_ITEMS)
+    numeros_serie: List[str] = Field(default=[], max_length=MAX_RETURN_ITEMS)
+
+
+class LoanReturnResult(BaseModel):
+    prestamo_id: Optional[int] = None
+    numero_serie: Optional[str] = None
+    error: Optional[str] = None
+
+
+class LoanReturnBatchResponse(BaseModel):
+    # Préstamos distintos que se cerraron (un préstamo pedido por id y por serie cuenta una vez)
+    devueltos: int
+    rechazados: int
+    # Primero los ids y luego los números de serie, en el orden recibido
+    resultados: List[LoanReturnResult]
\ No newline at end of file
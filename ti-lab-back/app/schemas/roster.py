@@ -0,0 +1,41 @@
+from pydantic import BaseModel, Field
+from typing import List, Literal
+
+RosterFormat = Literal["csv", "ndjson"]
+
+
+class RosterRow(BaseModel):
+    """Una fila de la nómina: el alumno junto con su sección y curso."""
+    curso_codigo: str = Field(min_length=1, max_length=50)
+    curso_nombre: str = Field(min_length=1, max_length=255)
+    seccion: str = Field(min_length=1, max_length=255)
+    profesor: str = Field(min_length=1, max_length=255)
+    alumno_codigo: str = Field(min_length=1, max_length=50)
+    nombres: str = Field(min_length=1, max_length=255)
+    apellidos: str = Field(min_length=1, max_length=255)
+
+    class Config:
+        str_strip_whitespace = True
+
+
+class RosterRowError(BaseModel):
+    # Línea del archivo (la cabecera del CSV es la línea 1)
+    linea: int
+    errores: List[str]
+
+
+class RosterImportReport(BaseModel):
+    filas: int
+    importadas: int
+    rechazadas: int
+    cursos_creados: int
+    cursos_actualizados: int
+    secciones_creadas: int
+    secciones_actualizadas: int
+    alumnos_creados: int
+    alumnos_actualizados: int
+    lotes: int
+    aplicado: bool
+    errores: List[RosterRowError]
+    # Errores no incluidos en `errores` por superar el máximo del reporte
+    errores_omitidos: int
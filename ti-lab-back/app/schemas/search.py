@@ -0,0 +1,13 @@
+from pydantic import BaseModel
+from typing import Literal, Optional
+
+SearchType = Literal["componente", "alumno"]
+
+
+class SearchResult(BaseModel):
+    tipo: SearchType
+    id: int
+    titulo: str
+    # Código del alumno; vacío para componentes
+    detalle: Optional[str] = None
+    score: float
@@ -0,0 +1,21 @@
+from datetime import date
+from pydantic import BaseModel
+from typing import Optional
+
+
+class UsageTotals(BaseModel):
+    prestamos: int
+    unidades: int
+    devoluciones: int
+    # Promedio sobre los préstamos ya devueltos; None si aún no hay devoluciones
+    minutos_promedio_fuera: Optional[float] = None
+
+
+class ComponentUsage(UsageTotals):
+    componente_id: int
+    componente_nombre: str
+
+
+class WeeklyUsage(UsageTotals):
+    # Lunes de la semana
+    semana: date
@@ -0,0 +1,40 @@
+from datetime import datetime
+from sqlalchemy.orm import Session
+from typing import Optional, Tuple
+from app.core.pagination import decode_cursor, encode_cursor, valid_id
+from app.core.serialization import encode_list
+from app.repositories.audit_repository import AuditRepository
+from app.schemas.audit import AuditEntry
+
+
+class AuditService:
+    def __init__(self, db: Session):
+        self.repository = AuditRepository(db)
+    
+    def get_audit_page_json(
+        self,
+        desde: Optional[datetime] = None,
+        hasta: Optional[datetime] = None,
+        prestamo_id: Optional[int] = None,
+        tabla: Optional[str] = None,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+    ) -> Tuple[bytes, Optional[str]]:
+        after = self._decode_audit_cursor(cursor) if cursor else None
+        rows = self.repository.get_rows(
+            desde=desde, hasta=hasta, prestamo_id=prestamo_id, tabla=tabla, limit=limit, after=after
+        )
+        next_cursor = None
+        if rows and len(rows) == limit:
+            next_cursor = encode_cursor([rows[-1]["registrado_en"].isoformat(), rows[-1]["id"]])
+        return encode_list(AuditEntry, rows), next_cursor
+    
+    @staticmethod
+    def _decode_audit_cursor(cursor: str) -> Tuple[datetime, int]:
+        registrado_en, audit_id = decode_cursor(cursor, 2)
+        if not isinstance(registrado_en, str) or not valid_id(audit_id):
+            raise ValueError("Invalid cursor")
+        try:
+            return datetime.fromisoformat(registrado_en), audit_id
+        except ValueError:
+            raise ValueError("Invalid cursor")
@@ -0,0 +1,78 @@
+from collections import defaultdict
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable, List, Optional
+from app.core.retry import ConcurrencyConflict, retry_on_conflict
+from app.models.kit import Kit
+from app.repositories.availability_repository import AvailabilityRepository
+
+
+def component_demand(detalles: Iterable, kits: Dict[int, Kit]) -> Dict[int, int]:
+    """Unidades por componente que implica un conjunto de detalles, expandiendo cada kit
+    según KitComponente.cantidad. `kits` debe traer la composición ya cargada."""
+    demand: Dict[int, int] = defaultdict(int)
+    for detalle in detalles:
+        if detalle.componente_id:
+            demand[detalle.componente_id] += detalle.cantidad
+        elif detalle.kit_id:
+            for kit_componente in kits[detalle.kit_id].kit_componentes:
+                demand[kit_componente.componente_id] += kit_componente.cantidad * detalle.cantidad
+    return dict(demand)
+
+
+class AvailabilityService:
+    def __init__(self, db: Session):
+        self.db = db
+        self.repository = AvailabilityRepository(db)
+    
+    def get_all_availability(self, skip: int = 0, limit: int = 100) -> List[dict]:
+        rows = self.repository.get_all(skip=skip, limit=limit)
+        return [self._to_dict(row) for row in rows]
+    
+    def get_availability(self, componente_id: int) -> Optional[dict]:
+        row = self.repository.get_by_componente_id(componente_id)
+        return self._to_dict(row) if row else None
+    
+    @retry_on_conflict()
+    def set_stock(self, componente_id: int, en_stock: int, version: Optional[int] = None) -> Optional[dict]:
+        # `version`: la que vio el cliente; si otra escritura la cambió, 409 en vez de pisarla.
+        # Sin ella, el UPDATE del ORM igual exige la versión recién leída (StaleDataError → reintento).
+        row = self.repository.get_by_componente_id(componente_id)
+        if row is None:
+            return None
+        if version is not None and row.version != version:
+            raise ConcurrencyConflict("Availability was modified by another request")
+        row = self.repository.set_stock(componente_id, en_stock)
+        return self._to_dict(row)
+    
+    def reconcile(self, apply: bool = True) -> dict:
+        filas_creadas = self.repository.create_missing_rows()
+        real = self.repository.compute_open_demand()
+        
+        drift = []
+        deltas = {}
+        for row in self.repository.get_all(skip=0, limit=None):
+            esperado = real.get(row.componente_id, 0)
+            if row.prestados != esperado:
+                drift.append({
+                    "componente_id": row.componente_id,
+                    "prestados_registrados": row.prestados,
+                    "prestados_reales": esperado,
+                })
+                deltas[row.componente_id] = esperado - row.prestados
+        
+        if apply:
+            self.repository.adjust_prestados(deltas)
+            self.db.commit()
+        else:
+            self.db.rollback()
+        return {"filas_creadas": filas_creadas, "drift": drift, "corregido": apply}
+    
+    @staticmethod
+    def _to_dict(row) -> dict:
+        return {
+            "componente_id": row.componente_id,
+            "en_stock": row.en_stock,
+            "prestados": row.prestados,
+            "disponibles": row.disponibles,
+            "version": row.version,
+        }
\ No newline at end of file
@@ -1,29 +1,45 @@
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Tuple
+from app.core.loader import request_loader
+from app.core.pagination import encode_cursor, decode_id_cursor
+from app.core.serialization import encode_list
 from app.repositories.component_repository import ComponentRepository
-from app.schemas.component import ComponentCreate, ComponentUpdate
+from app.schemas.component import Component, ComponentCreate, ComponentUpdate
 
 
 class ComponentService:
     def __init__(self, db: Session):
         self.repository = ComponentRepository(db)
+        self.componentes = request_loader(db, "componentes", self.repository.get_many)
     
-    def get_all_components(self, skip: int = 0, limit: int = 100) -> List[dict]:
-        components = self.repository.get_all(skip=skip, limit=limit)
-        return [comp.__dict__ for comp in components]
+    def get_components_page(
+        self, skip: int = 0, limit: int = 100, cursor: Optional[str] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        after_id = decode_id_cursor(cursor) if cursor else None
+        components = self.repository.get_all(skip=skip, limit=limit, after_id=after_id)
+        next_cursor = encode_cursor([components[-1].id]) if components and len(components) == limit else None
+        return [comp.__dict__ for comp in components], next_cursor
     
-    def get_component_by_id(self, component_id: int) -> Optional[dict]:
-        component = self.repository.get_by_id(component_id)
-        return component.__dict__ if component else None
+    def get_components_page_json(
+        self, skip: int = 0, limit: int = 100, cursor: Optional[str] = None
+    ) -> Tuple[bytes, Optional[str]]:
+        after_id = decode_id_cursor(cursor) if cursor else None
+        rows = self.repository.get_all_rows(skip=skip, limit=limit, after_id=after_id)
+        next_cursor = encode_cursor([rows[-1]["id"]]) if rows and len(rows) == limit else None
+        return encode_list(Component, rows), next_cursor
     
-    def get_component_by_serial_number(self, serial_number: str) -> Optional[dict]:
-        component = self.repository.get_by_serial_number(serial_number)
+    def get_components_by_ids_json(self, component_ids: List[int]) -> bytes:
+        rows = self.repository.get_rows_by_ids(component_ids)
+        return encode_list(Component, [rows[cid] for cid in component_ids if cid in rows])
+    
+    def get_component_by_id(self, component_id: int) -> Optional[dict]:
+        component = self.componentes.load(component_id)
         return component.__dict__ if component else None
     
     def create_component(self, component_data: ComponentCreate) -> dict:
-        existing = self.repository.get_by_serial_number(component_data.serial_number)
+        existing = self.repository.get_by_nombre(component_data.nombre)
         if existing:
-            raise ValueError("Serial number already exists")
+            raise ValueError("Component name already exists")
         
         component = self.repository.create(component_data)
         return component.__dict__
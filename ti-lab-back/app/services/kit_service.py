@@ -1,30 +1,33 @@
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Tuple
+from app.core.fieldsets import FULL, FieldSet
+from app.core.pagination import encode_cursor, decode_id_cursor
+from app.core.serialization import encode_list, encode_one
 from app.repositories.kit_repository import KitRepository
-from app.schemas.kit import KitCreate, KitUpdate
+from app.schemas.kit import Kit, KitCreate, KitUpdate
 
 
 class KitService:
     def __init__(self, db: Session):
         self.repository = KitRepository(db)
     
-    def get_all_kits(self, skip: int = 0, limit: int = 100) -> List[dict]:
-        kits = self.repository.get_all(skip=skip, limit=limit)
-        return [kit.__dict__ for kit in kits]
+    def get_kits_page_json(
+        self, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, fieldset: FieldSet = FULL
+    ) -> Tuple[bytes, Optional[str]]:
+        after_id = decode_id_cursor(cursor) if cursor else None
+        rows = self.repository.get_all_rows(skip=skip, limit=limit, after_id=after_id, fieldset=fieldset)
+        next_cursor = encode_cursor([rows[-1]["id"]]) if rows and len(rows) == limit else None
+        return encode_list(Kit, rows, fieldset), next_cursor
     
-    def get_kit_by_id(self, kit_id: int) -> Optional[dict]:
-        kit = self.repository.get_by_id(kit_id)
-        return kit.__dict__ if kit else None
+    def get_kits_by_ids_json(self, kit_ids: List[int], fieldset: FieldSet = FULL) -> bytes:
+        rows = self.repository.get_rows_by_ids(kit_ids, fieldset)
+        return encode_list(Kit, [rows[kid] for kid in kit_ids if kid in rows], fieldset)
     
-    def get_kit_by_kit_code(self, kit_code: str) -> Optional[dict]:
-        kit = self.repository.get_by_kit_code(kit_code)
-        return kit.__dict__ if kit else None
+    def get_kit_json(self, kit_id: int, fieldset: FieldSet = FULL) -> Optional[bytes]:
+        kit = self.repository.get_rows_by_ids([kit_id], fieldset).get(kit_id)
+        return encode_one(Kit, kit, fieldset) if kit else None
     
     def create_kit(self, kit_data: KitCreate) -> dict:
-        existing = self.repository.get_by_kit_code(kit_data.kit_code)
-        if existing:
-            raise ValueError("Kit code already exists")
-        
         kit = self.repository.create(kit_data)
         return kit.__dict__
     
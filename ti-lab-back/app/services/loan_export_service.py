@@ -0,0 +1,102 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from sqlalchemy.orm import Session
+from typing import Any, Dict, Iterator, List, Optional
+from app.repositories.loan_repository import LoanRepository
+from app.schemas.loan import LoanExportFormat
+
+# Columnas del CSV: una fila por detalle, con los datos del préstamo, el alumno y la jornada repetidos
+EXPORT_COLUMNS = [
+    "prestamo_id", "estado", "fecha_prestamo", "fecha_devolucion",
+    "alumno_id", "alumno_codigo", "alumno_nombres", "alumno_apellidos",
+    "jornada_id", "jornada_fecha", "curso_id", "seccion_id",
+    "detalle_id", "componente_id", "componente_nombre", "kit_id", "kit_nombre", "cantidad", "numero_serie",
+]
+
+# Starlette agrega "; charset=utf-8" a los tipos text/*
+MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+# Posiciones de las fechas en cada fila; el resto de valores se escribe tal cual
+_FECHAS = [EXPORT_COLUMNS.index(name) for name in ("fecha_prestamo", "fecha_devolucion", "jornada_fecha")]
+
+
+def _plain(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, (date, datetime)) else value
+
+
+def _csv_values(row) -> list:
+    values = list(row)
+    for index in _FECHAS:
+        if values[index] is not None:
+            values[index] = values[index].isoformat()
+    return values
+
+
+class LoanExportService:
+    """Exportación del historial de préstamos como flujo de bytes, un bloque por lote del cursor."""
+    
+    def __init__(self, db: Session):
+        self.loan_repository = LoanRepository(db)
+    
+    def export(
+        self, fmt: LoanExportFormat, desde: Optional[datetime] = None, hasta: Optional[datetime] = None
+    ) -> Iterator[bytes]:
+        return self._csv(desde, hasta) if fmt == "csv" else self._ndjson(desde, hasta)
+    
+    def _csv(self, desde: Optional[datetime], hasta: Optional[datetime]) -> Iterator[bytes]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_COLUMNS)
+        # La cabecera sale antes de ejecutar la consulta: el primer byte no espera a la base
+        yield buffer.getvalue().encode()
+        for batch in self.loan_repository.iter_export_rows(desde, hasta):
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(map(_csv_values, batch))
+            yield buffer.getvalue().encode()
+    
+    def _ndjson(self, desde: Optional[datetime], hasta: Optional[datetime]) -> Iterator[bytes]:
+        # Un objeto por préstamo; sus detalles vienen contiguos y pueden cruzar el límite de un lote
+        actual: Optional[Dict[str, Any]] = None
+        for batch in self.loan_repository.iter_export_rows(desde, hasta):
+            lines: List[str] = []
+            for row in batch:
+                if actual is None or actual["id"] != row.prestamo_id:
+                    if actual is not None:
+                        lines.append(json.dumps(actual, ensure_ascii=False))
+                    actual = {
+                        "id": row.prestamo_id,
+                        "estado": row.estado,
+                        "fecha_prestamo": _plain(row.fecha_prestamo),
+                        "fecha_devolucion": _plain(row.fecha_devolucion),
+                        "alumno": {
+                            "id": row.alumno_id,
+                            "codigo": row.alumno_codigo,
+                            "nombres": row.alumno_nombres,
+                            "apellidos": row.alumno_apellidos,
+                        },
+                        "jornada": {
+                            "id": row.jornada_id,
+                            "fecha": _plain(row.jornada_fecha),
+                            "curso_id": row.curso_id,
+                            "seccion_id": row.seccion_id,
+                        },
+                        "detalles": [],
+                    }
+                if row.detalle_id is not None:
+                    actual["detalles"].append({
+                        "id": row.detalle_id,
+                        "componente_id": row.componente_id,
+                        "componente_nombre": row.componente_nombre,
+                        "kit_id": row.kit_id,
+                        "kit_nombre": row.kit_nombre,
+                        "cantidad": row.cantidad,
+                        "numero_serie": row.numero_serie,
+                    })
+            if lines:
+                yield ("\n".join(lines) + "\n").encode()
+        if actual is not None:
+            yield (json.dumps(actual, ensure_ascii=False) + "\n").encode()
@@ -1,71 +1,295 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.core.fieldsets import FULL, FieldSet
+from app.core.loader import request_loader
+from app.core.pagination import encode_cursor, decode_cursor, valid_id
+from app.core.retry import StaleSnapshot, retry_on_conflict
+from app.core.serialization import encode_list, encode_one
+from app.models.prestamo import ESTADO_ACTIVO, ESTADO_VENCIDO, ESTADOS_ABIERTOS
+from app.repositories.availability_repository import AvailabilityRepository
 from app.repositories.loan_repository import LoanRepository
 from app.repositories.component_repository import ComponentRepository
 from app.repositories.kit_repository import KitRepository
-from app.schemas.loan import LoanCreate, LoanUpdate
+from app.repositories.stats_repository import StatsRepository
+from app.schemas.loan import BulkLoanCreate, Loan, LoanCreate, LoanDetailCreate, LoanReturnBatch, LoanUpdate
+from app.services.availability_service import component_demand
+from app.services.stats_service import loan_usage, merge_usage, return_usage
 
 
 class LoanService:
     def __init__(self, db: Session):
+        self.db = db
         self.loan_repository = LoanRepository(db)
         self.component_repository = ComponentRepository(db)
         self.kit_repository = KitRepository(db)
+        self.availability_repository = AvailabilityRepository(db)
+        self.stats_repository = StatsRepository(db)
+        # Compartidos con los demás servicios de la request: cada id se lee una vez, y en lote
+        self.componentes = request_loader(db, "componentes", self.component_repository.get_many)
+        self.kits = request_loader(db, "kits", self.kit_repository.get_many)
     
-    def get_all_loans(self, skip: int = 0, limit: int = 100) -> List[dict]:
-        loans = self.loan_repository.get_all(skip=skip, limit=limit)
-        return [loan.__dict__ for loan in loans]
+    def get_loans_page(
+        self, skip: int = 0, limit: int = 100, cursor: Optional[str] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        after = self._decode_loan_cursor(cursor) if cursor else None
+        loans = self.loan_repository.get_all(skip=skip, limit=limit, after=after)
+        next_cursor = None
+        if loans and len(loans) == limit:
+            last = loans[-1]
+            next_cursor = encode_cursor([last.fecha_prestamo.isoformat(), last.id])
+        return [loan.__dict__ for loan in loans], next_cursor
     
-    def get_loan_by_id(self, loan_id: int) -> Optional[dict]:
-        loan = self.loan_repository.get_by_id(loan_id)
-        return loan.__dict__ if loan else None
+    def get_loans_page_json(
+        self, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, fieldset: FieldSet = FULL
+    ) -> Tuple[bytes, Optional[str]]:
+        after = self._decode_loan_cursor(cursor) if cursor else None
+        rows = self.loan_repository.get_all_rows(skip=skip, limit=limit, after=after, fieldset=fieldset)
+        next_cursor = None
+        if rows and len(rows) == limit:
+            next_cursor = encode_cursor([rows[-1]["fecha_prestamo"].isoformat(), rows[-1]["id"]])
+        return encode_list(Loan, rows, fieldset), next_cursor
+    
+    def get_loan_json(self, loan_id: int, fieldset: FieldSet = FULL) -> Optional[bytes]:
+        loan = self.loan_repository.get_row_by_id(loan_id, fieldset)
+        return encode_one(Loan, loan, fieldset) if loan else None
     
     def get_active_loans(self) -> List[dict]:
         loans = self.loan_repository.get_active_loans()
         return [loan.__dict__ for loan in loans]
     
+    def get_overdue_page_json(
+        self, limit: int = 100, cursor: Optional[str] = None, fieldset: FieldSet = FULL
+    ) -> Tuple[bytes, Optional[str]]:
+        after = self._decode_loan_cursor(cursor) if cursor else None
+        rows = self.loan_repository.get_overdue_rows(limit=limit, after=after, fieldset=fieldset)
+        next_cursor = None
+        if rows and len(rows) == limit:
+            next_cursor = encode_cursor([rows[-1]["fecha_limite"].isoformat(), rows[-1]["id"]])
+        return encode_list(Loan, rows, fieldset), next_cursor
+    
+    def mark_overdue(self, ahora: Optional[datetime] = None) -> int:
+        marcados = self.loan_repository.mark_overdue(ahora or datetime.now())
+        self.db.commit()
+        return marcados
+    
+    def next_due_date(self) -> Optional[datetime]:
+        return self.loan_repository.next_due_date()
+    
+    @retry_on_conflict()
     def create_loan(self, loan_data: LoanCreate) -> dict:
-        if loan_data.component_id:
-            component = self.component_repository.get_by_id(loan_data.component_id)
-            if not component:
-                raise ValueError("Component not found")
-            if component.status != "available":
-                raise ValueError("Component is not available")
+        loan_data = loan_data.model_copy(update={"fecha_limite": self._due_date(loan_data.fecha_limite)})
+        jornada = self.loan_repository.get_jornada(loan_data.jornada_id)
+        if not jornada:
+            raise ValueError("Jornada not found")
+        if not self.loan_repository.get_alumno(loan_data.alumno_id):
+            raise ValueError("Alumno not found")
+        
+        # Un IN por tabla para todos los detalles, no un SELECT por id
+        componentes = self.componentes.load_many(d.componente_id for d in loan_data.detalles if d.componente_id)
+        kits = self.kits.load_many(d.kit_id for d in loan_data.detalles if d.kit_id)
+        for detalle in loan_data.detalles:
+            self._validate_detalle(detalle, componentes, kits)
         
-        if loan_data.kit_id:
-            kit = self.kit_repository.get_by_id(loan_data.kit_id)
-            if not kit:
-                raise ValueError("Kit not found")
-            if kit.status != "available":
-                raise ValueError("Kit is not available")
+        # Reserva condicional en la misma transacción que inserta el préstamo: la base decide quién
+        # se lleva la última unidad, sin leer el ledger ni bloquear nada antes
+        demand = component_demand(loan_data.detalles, kits)
+        if not self.availability_repository.reserve(demand):
+            self.db.rollback()
+            raise ValueError("Component is not available")
+        self.stats_repository.increment(loan_usage(jornada, [demand]))
         
         loan = self.loan_repository.create(loan_data)
+        return loan.__dict__
+    
+    @retry_on_conflict()
+    def create_bulk_loans(self, bulk_data: BulkLoanCreate) -> dict:
+        fecha_limite = self._due_date(bulk_data.fecha_limite)
+        jornada = self.loan_repository.get_jornada(bulk_data.jornada_id)
+        if not jornada:
+            raise ValueError("Jornada not found")
         
-        if loan_data.component_id:
-            component.status = "loaned"
-        if loan_data.kit_id:
-            kit.status = "loaned"
+        # Todas las búsquedas se resuelven por lotes (IN) antes de validar fila por fila
+        asignaciones = bulk_data.asignaciones
+        detalles = [detalle for asignacion in asignaciones for detalle in asignacion.detalles]
+        alumnos = self.loan_repository.get_alumnos({asignacion.alumno_id for asignacion in asignaciones})
+        componentes = self.componentes.load_many(d.componente_id for d in detalles if d.componente_id)
+        kits = self.kits.load_many(d.kit_id for d in detalles if d.kit_id)
         
-        return loan.__dict__
+        resultados = [{"indice": i, "alumno_id": a.alumno_id} for i, a in enumerate(asignaciones)]
+        demands = {}
+        vistos = set()
+        for indice, asignacion in enumerate(asignaciones):
+            try:
+                if asignacion.alumno_id in vistos:
+                    raise ValueError("Duplicate alumno in bulk request")
+                vistos.add(asignacion.alumno_id)
+                alumno = alumnos.get(asignacion.alumno_id)
+                if not alumno:
+                    raise ValueError("Alumno not found")
+                if alumno.seccion_id != jornada.seccion_id:
+                    raise ValueError("Alumno does not belong to the jornada's section")
+                for detalle in asignacion.detalles:
+                    self._validate_detalle(detalle, componentes, kits)
+                demands[indice] = component_demand(asignacion.detalles, kits)
+            except ValueError as e:
+                resultados[indice]["error"] = str(e)
+        
+        # Reserva en orden de llegada contra el ledger, acumulando lo que ya tomaron filas anteriores
+        ledger = self.availability_repository.get_many({cid for demand in demands.values() for cid in demand})
+        disponibles = {cid: row.disponibles for cid, row in ledger.items()}
+        total_demand: Dict[int, int] = defaultdict(int)
+        aceptadas = []
+        for indice, demand in demands.items():
+            if any(disponibles.get(cid, 0) < cantidad for cid, cantidad in demand.items()):
+                resultados[indice]["error"] = "Component is not available"
+                continue
+            for cid, cantidad in demand.items():
+                disponibles[cid] -= cantidad
+                total_demand[cid] += cantidad
+            aceptadas.append(indice)
+        
+        # El reparto se hizo sobre lo leído; si otra petición tomó stock entretanto, la reserva
+        # condicional no alcanza y el lote completo se repite con el ledger nuevo
+        if not self.availability_repository.reserve(total_demand):
+            raise StaleSnapshot("Availability changed while allocating the bulk request")
+        self.stats_repository.increment(loan_usage(jornada, [demands[i] for i in aceptadas]))
+        loan_ids = self.loan_repository.bulk_create(jornada.id, [asignaciones[i] for i in aceptadas], fecha_limite)
+        for indice in aceptadas:
+            resultados[indice]["prestamo_id"] = loan_ids[asignaciones[indice].alumno_id]
+        
+        return {
+            "jornada_id": jornada.id,
+            "creados": len(aceptadas),
+            "rechazados": len(asignaciones) - len(aceptadas),
+            "resultados": resultados,
+        }
     
+    @retry_on_conflict()
     def return_loan(self, loan_id: int) -> Optional[dict]:
+        """Cierra el préstamo y libera sus unidades; ValueError si ya no está abierto (también si otra
+        petición lo devolvió entre la lectura y el UPDATE)."""
         loan = self.loan_repository.get_by_id(loan_id)
         if not loan:
             return None
         
-        if loan.component_id:
-            component = self.component_repository.get_by_id(loan.component_id)
-            if component:
-                component.status = "available"
+        ahora = datetime.now()
+        # El ledger y el resumen de uso se tocan solo si este UPDATE cerró el préstamo
+        if loan.estado not in ESTADOS_ABIERTOS or not self.loan_repository.return_loan(loan_id, ahora):
+            self.db.rollback()
+            raise ValueError("Loan is not open")
+        kits = {detalle.kit_id: detalle.kit for detalle in loan.detalles if detalle.kit_id}
+        demand = component_demand(loan.detalles, kits)
+        self.availability_repository.adjust_prestados({cid: -cantidad for cid, cantidad in demand.items()})
+        self.stats_repository.increment(return_usage(loan.jornada, demand, ahora - loan.fecha_prestamo))
+        self.db.commit()
         
-        if loan.kit_id:
-            kit = self.kit_repository.get_by_id(loan.kit_id)
-            if kit:
-                kit.status = "available"
-        
-        returned_loan = self.loan_repository.return_loan(loan_id)
+        returned_loan = self.loan_repository.get_by_id(loan_id)
         return returned_loan.__dict__ if returned_loan else None
     
+    @retry_on_conflict()
+    def return_batch(self, batch: LoanReturnBatch) -> dict:
+        """Devuelve muchos préstamos en una transacción con un número fijo de consultas: resolver las
+        series, leer los préstamos, un UPDATE ... RETURNING, la demanda por componente y los ajustes
+        de disponibilidad y del resumen de uso, cada uno por lotes."""
+        if not batch.prestamo_ids and not batch.numeros_serie:
+            raise ValueError("At least one loan id or serial number is required")
+        
+        resultados = [{"prestamo_id": loan_id} for loan_id in batch.prestamo_ids]
+        if batch.numeros_serie:
+            por_serie = self.loan_repository.get_open_ids_by_serial(set(batch.numeros_serie))
+            for numero_serie in batch.numeros_serie:
+                resultado = {"numero_serie": numero_serie, "prestamo_id": por_serie.get(numero_serie)}
+                if resultado["prestamo_id"] is None:
+                    resultado["error"] = "Serial number is not on an open loan"
+                resultados.append(resultado)
+        
+        # Un mismo préstamo puede llegar por id y por varias series: se cierra una vez y ninguno de sus ítems es un error
+        loan_ids = {r["prestamo_id"] for r in resultados if r["prestamo_id"] is not None}
+        loans = self.loan_repository.get_return_rows(loan_ids)
+        for resultado in resultados:
+            loan = loans.get(resultado["prestamo_id"])
+            if "error" in resultado:
+                continue
+            if loan is None:
+                resultado["error"] = "Loan not found"
+            elif loan.estado not in ESTADOS_ABIERTOS:
+                resultado["error"] = "Loan is not open"
+        
+        ahora = datetime.now()
+        abiertos = {loan.id for loan in loans.values() if loan.estado in ESTADOS_ABIERTOS}
+        devueltos = set(self.loan_repository.return_many(abiertos, ahora)) if abiertos else set()
+        # Devueltos por otra petición entre la lectura y el UPDATE
+        for resultado in resultados:
+            if "error" not in resultado and resultado["prestamo_id"] not in devueltos:
+                resultado["error"] = "Loan is not open"
+        
+        if devueltos:
+            demand_by_loan = self.availability_repository.get_demand_by_loan(devueltos)
+            total_demand: Dict[int, int] = defaultdict(int)
+            usage = []
+            for loan_id in devueltos:
+                demand = demand_by_loan.get(loan_id, {})
+                for componente_id, cantidad in demand.items():
+                    total_demand[componente_id] -= cantidad
+                usage.extend(return_usage(loans[loan_id], demand, ahora - loans[loan_id].fecha_prestamo))
+            self.availability_repository.adjust_prestados(total_demand)
+            self.stats_repository.increment(merge_usage(usage))
+        self.db.commit()
+        
+        rechazados = sum(1 for resultado in resultados if "error" in resultado)
+        return {
+            "devueltos": len(devueltos),
+            "rechazados": rechazados,
+            "resultados": resultados,
+        }
+    
     def update_loan(self, loan_id: int, loan_data: LoanUpdate) -> Optional[dict]:
+        if loan_data.fecha_limite is not None:
+            loan_data = loan_data.model_copy(update={"fecha_limite": self._naive(loan_data.fecha_limite)})
         loan = self.loan_repository.update(loan_id, loan_data)
-        return loan.__dict__ if loan else None
\ No newline at end of file
+        # Prorrogar un vencido lo reabre; si el nuevo plazo también pasó, el scheduler lo vuelve a marcar
+        if loan and loan.estado == ESTADO_VENCIDO and loan.fecha_limite and loan.fecha_limite > datetime.now():
+            # Vencido y activo son ambos abiertos: el ledger no cambia
+            loan.estado = ESTADO_ACTIVO
+            self.db.commit()
+            loan = self.loan_repository.get_by_id(loan_id)
+        return loan.__dict__ if loan else None
+    
+    @staticmethod
+    def _naive(value: datetime) -> datetime:
+        # Las fechas se guardan en hora local sin zona, como datetime.now()
+        return value.astimezone().replace(tzinfo=None) if value.tzinfo else value
+    
+    def _due_date(self, fecha_limite: Optional[datetime]) -> Optional[datetime]:
+        ahora = datetime.now()
+        if fecha_limite is None:
+            return ahora + timedelta(hours=settings.loan_due_hours) if settings.loan_due_hours > 0 else None
+        fecha_limite = self._naive(fecha_limite)
+        if fecha_limite <= ahora:
+            raise ValueError("fecha_limite must be in the future")
+        return fecha_limite
+    
+    @staticmethod
+    def _validate_detalle(detalle: LoanDetailCreate, componentes: Dict, kits: Dict) -> None:
+        if (detalle.componente_id is None) == (detalle.kit_id is None):
+            raise ValueError("Each loan detail must reference exactly one component or kit")
+        
+        if detalle.componente_id:
+            component = componentes.get(detalle.componente_id)
+            if not component:
+                raise ValueError("Component not found")
+            if component.requiere_numero_serie and not detalle.numero_serie:
+                raise ValueError("Component requires a serial number")
+        
+        if detalle.kit_id and detalle.kit_id not in kits:
+            raise ValueError("Kit not found")
+    
+    @staticmethod
+    def _decode_loan_cursor(cursor: str) -> Tuple[datetime, int]:
+        fecha, loan_id = decode_cursor(cursor, 2)
+        if not isinstance(fecha, str) or not valid_id(loan_id):
+            raise ValueError("Invalid cursor")
+        return datetime.fromisoformat(fecha), loan_id
\ No newline at end of file
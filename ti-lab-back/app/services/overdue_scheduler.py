@@ -0,0 +1,62 @@
+import asyncio
+import logging
+from datetime import datetime
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from typing import Callable, Optional, Tuple
+from app.services.loan_service import LoanService
+
+logger = logging.getLogger(__name__)
+
+# Actor de los cambios que registra la auditoría
+ACTOR = "overdue-scheduler"
+
+
+class OverdueScheduler:
+    """Marca como vencidos los préstamos cuya fecha_limite pasó, en segundo plano dentro del lifespan.
+    
+    Cada pasada es un UPDATE sobre ix_prestamos_vencimiento que solo toca los préstamos que vencieron,
+    y después duerme hasta la próxima fecha_limite pendiente, como mucho `interval` segundos (así
+    también ve a tiempo los préstamos creados mientras dormía).
+    """
+    
+    def __init__(self, session_factory: Callable[[], Session], interval: float):
+        self.session_factory = session_factory
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+    
+    def run_once(self, ahora: Optional[datetime] = None) -> Tuple[int, Optional[datetime]]:
+        with self.session_factory() as db:
+            db.info["actor"] = ACTOR
+            service = LoanService(db)
+            marcados = service.mark_overdue(ahora)
+            return marcados, service.next_due_date()
+    
+    async def _loop(self) -> None:
+        while True:
+            proximo = None
+            try:
+                marcados, proximo = await run_in_threadpool(self.run_once)
+                if marcados:
+                    logger.info("Préstamos marcados como vencidos", extra={"prestamos": marcados})
+            except Exception:
+                # Un fallo puntual (p. ej. base bloqueada) no detiene el scheduler; se reintenta en la próxima pasada
+                logger.exception("Error al marcar préstamos vencidos")
+            espera = self.interval
+            if proximo is not None:
+                espera = min(espera, max((proximo - datetime.now()).total_seconds(), 0.0))
+            await asyncio.sleep(espera)
+    
+    def start(self) -> None:
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+    
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
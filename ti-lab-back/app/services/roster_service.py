@@ -0,0 +1,191 @@
+import csv
+import io
+import json
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+from typing import BinaryIO, Dict, Iterator, List, Set, Tuple
+from app.models.alumno import Alumno
+from app.models.curso import Curso
+from app.models.seccion import Seccion
+from app.repositories.roster_repository import RosterRepository
+from app.schemas.roster import RosterFormat, RosterRow
+
+# Filas por lote: una consulta IN y un executemany por tabla, y un commit por lote
+CHUNK = 1000
+# Tope de errores detallados en el reporte; el resto solo se cuenta
+MAX_ERRORES = 1000
+
+
+def iter_roster_rows(file: BinaryIO, fmt: RosterFormat) -> Iterator[Tuple[int, object]]:
+    """Recorre el archivo fila por fila sin cargarlo entero: (línea, dict | mensaje de error)."""
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        faltantes = set(RosterRow.model_fields) - set(reader.fieldnames or ())
+        if faltantes:
+            raise ValueError(f"Missing columns: {', '.join(sorted(faltantes))}")
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for linea, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield linea, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield linea, f"Invalid JSON: {e.msg}"
+
+
+class RosterService:
+    """Importa nóminas: upsert de Curso por código, Seccion por (curso, nombre) y Alumno por
+    (sección, código), en lotes de CHUNK filas.
+    
+    La memoria no crece con el archivo: solo se mantienen el lote en curso, los cursos y
+    secciones ya vistos (acotados por el catálogo) y a lo sumo MAX_ERRORES errores.
+    """
+    
+    def __init__(self, db: Session):
+        self.db = db
+        self.repository = RosterRepository(db)
+        self._cursos: Dict[str, Tuple[int, str]] = {}
+        self._secciones: Dict[Tuple[int, str], Tuple[int, str]] = {}
+        self._cursos_cargados: Set[int] = set()
+    
+    def import_roster(self, file: BinaryIO, fmt: RosterFormat = "csv", apply: bool = True) -> dict:
+        report = {
+            "filas": 0,
+            "importadas": 0,
+            "rechazadas": 0,
+            "cursos_creados": 0,
+            "cursos_actualizados": 0,
+            "secciones_creadas": 0,
+            "secciones_actualizadas": 0,
+            "alumnos_creados": 0,
+            "alumnos_actualizados": 0,
+            "lotes": 0,
+            "aplicado": apply,
+            "errores": [],
+            "errores_omitidos": 0,
+        }
+        lote: List[RosterRow] = []
+        try:
+            for linea, data in iter_roster_rows(file, fmt):
+                report["filas"] += 1
+                if isinstance(data, str):
+                    self._reject(report, linea, [data])
+                    continue
+                try:
+                    lote.append(RosterRow.model_validate(data))
+                except ValidationError as e:
+                    self._reject(report, linea, [
+                        f"{'.'.join(str(part) for part in error['loc']) or 'fila'}: {error['msg']}"
+                        for error in e.errors()
+                    ])
+                    continue
+                if len(lote) >= CHUNK:
+                    self._import_chunk(lote, report, apply)
+                    lote = []
+            if lote:
+                self._import_chunk(lote, report, apply)
+        except UnicodeDecodeError:
+            self.db.rollback()
+            raise ValueError(f"File is not valid UTF-8 (row {report['filas'] + 1})")
+        except Exception:
+            self.db.rollback()
+            raise
+        if not apply:
+            self.db.rollback()
+        return report
+    
+    @staticmethod
+    def _reject(report: dict, linea: int, errores: List[str]) -> None:
+        report["rechazadas"] += 1
+        if len(report["errores"]) < MAX_ERRORES:
+            report["errores"].append({"linea": linea, "errores": errores})
+        else:
+            report["errores_omitidos"] += 1
+    
+    def _import_chunk(self, lote: List[RosterRow], report: dict, apply: bool) -> None:
+        # Dentro del archivo, la última fila para una misma clave gana
+        cursos = {row.curso_codigo: row.curso_nombre for row in lote}
+        self._upsert_cursos(cursos, report)
+        
+        secciones = {(self._cursos[row.curso_codigo][0], row.seccion): row.profesor for row in lote}
+        self._upsert_secciones(secciones, report)
+        
+        alumnos = {
+            (self._secciones[(self._cursos[row.curso_codigo][0], row.seccion)][0], row.alumno_codigo): (
+                row.nombres, row.apellidos
+            )
+            for row in lote
+        }
+        self._upsert_alumnos(alumnos, report)
+        
+        report["importadas"] += len(lote)
+        report["lotes"] += 1
+        if apply:
+            self.db.commit()
+        else:
+            # Sin commit: los lotes siguientes ven lo escrito y al final se revierte todo
+            self.db.flush()
+    
+    def _upsert_cursos(self, cursos: Dict[str, str], report: dict) -> None:
+        desconocidos = [codigo for codigo in cursos if codigo not in self._cursos]
+        if desconocidos:
+            self._cursos.update(self.repository.get_cursos(desconocidos))
+        
+        nuevos = [{"codigo": codigo, "nombre": nombre} for codigo, nombre in cursos.items() if codigo not in self._cursos]
+        for (codigo,), curso_id in self.repository.insert_many(Curso, nuevos, "codigo").items():
+            self._cursos[codigo] = (curso_id, cursos[codigo])
+            # Un curso recién creado no tiene secciones que cargar
+            self._cursos_cargados.add(curso_id)
+        report["cursos_creados"] += len(nuevos)
+        
+        cambios = []
+        for codigo, nombre in cursos.items():
+            curso_id, actual = self._cursos[codigo]
+            if actual != nombre:
+                cambios.append({"id": curso_id, "nombre": nombre})
+                self._cursos[codigo] = (curso_id, nombre)
+        self.repository.update_many(Curso, cambios)
+        report["cursos_actualizados"] += len(cambios)
+    
+    def _upsert_secciones(self, secciones: Dict[Tuple[int, str], str], report: dict) -> None:
+        por_cargar = {curso_id for curso_id, _ in secciones} - self._cursos_cargados
+        if por_cargar:
+            self._secciones.update(self.repository.get_secciones(por_cargar))
+            self._cursos_cargados |= por_cargar
+        
+        nuevas = [
+            {"curso_id": curso_id, "nombre": nombre, "profesor": profesor}
+            for (curso_id, nombre), profesor in secciones.items()
+            if (curso_id, nombre) not in self._secciones
+        ]
+        for key, seccion_id in self.repository.insert_many(Seccion, nuevas, "curso_id", "nombre").items():
+            self._secciones[key] = (seccion_id, secciones[key])
+        report["secciones_creadas"] += len(nuevas)
+        
+        cambios = []
+        for key, profesor in secciones.items():
+            seccion_id, actual = self._secciones[key]
+            if actual != profesor:
+                cambios.append({"id": seccion_id, "profesor": profesor})
+                self._secciones[key] = (seccion_id, profesor)
+        self.repository.update_many(Seccion, cambios)
+        report["secciones_actualizadas"] += len(cambios)
+    
+    def _upsert_alumnos(self, alumnos: Dict[Tuple[int, str], Tuple[str, str]], report: dict) -> None:
+        existentes = self.repository.get_alumnos(
+            {seccion_id for seccion_id, _ in alumnos}, {codigo for _, codigo in alumnos}
+        )
+        nuevos, cambios = [], []
+        for (seccion_id, codigo), (nombres, apellidos) in alumnos.items():
+            actual = existentes.get((seccion_id, codigo))
+            if actual is None:
+                nuevos.append({"seccion_id": seccion_id, "codigo": codigo, "nombres": nombres, "apellidos": apellidos})
+            elif actual[1:] != (nombres, apellidos):
+                cambios.append({"id": actual[0], "nombres": nombres, "apellidos": apellidos})
+        self.repository.insert_many(Alumno, nuevos)
+        self.repository.update_many(Alumno, cambios)
+        report["alumnos_creados"] += len(nuevos)
+        report["alumnos_actualizados"] += len(cambios)
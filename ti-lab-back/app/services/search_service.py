@@ -0,0 +1,118 @@
+import re
+import threading
+from sqlalchemy.orm import Session
+from typing import Callable, Dict, List, Optional, Tuple
+from app.core.trigram import TrigramIndex
+from app.repositories.catalog_version_repository import CatalogVersionRepository
+from app.repositories.search_repository import SearchRepository
+
+TIPOS = ("componente", "alumno")
+
+_TOKEN = re.compile(r"\w+")
+
+
+def _componente_result(row: dict, score: float) -> dict:
+    return {"tipo": "componente", "id": row["id"], "titulo": row["nombre"], "detalle": None, "score": score}
+
+
+def _alumno_result(row: dict, score: float) -> dict:
+    return {
+        "tipo": "alumno",
+        "id": row["id"],
+        "titulo": f"{row['nombres']} {row['apellidos']}",
+        "detalle": row["codigo"],
+        "score": score,
+    }
+
+
+class _FallbackIndex:
+    """Índice de trigramas de un tipo, reconstruido cuando cambia la versión de su catálogo (la de la
+    base: una escritura atendida por otro worker también lo invalida)."""
+    
+    def __init__(self, catalog: str):
+        self.catalog = catalog
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        self._index = TrigramIndex()
+        self._rows: Dict[int, dict] = {}
+    
+    def get(self, version: int, load: Callable[[], List[Tuple[dict, str]]]) -> Tuple[TrigramIndex, Dict[int, dict]]:
+        with self._lock:
+            if self._version != version:
+                documents = load()
+                self._index = TrigramIndex.build((row["id"], text) for row, text in documents)
+                self._rows = {row["id"]: row for row, _ in documents}
+                self._version = version
+            return self._index, self._rows
+
+
+_fallback_indexes = {"componente": _FallbackIndex("components"), "alumno": _FallbackIndex("students")}
+
+
+class SearchService:
+    def __init__(self, db: Session):
+        self.db = db
+        self.repository = SearchRepository(db)
+    
+    def search(self, q: str, limit: int = 20, tipo: Optional[str] = None) -> List[dict]:
+        tipos = (tipo,) if tipo else TIPOS
+        if self.repository.has_fts():
+            results = self._search_fts(q, limit, tipos)
+        else:
+            results = self._search_trigram(q, limit, tipos)
+        results.sort(key=lambda result: result["score"], reverse=True)
+        return results[:limit]
+    
+    def _search_fts(self, q: str, limit: int, tipos) -> List[dict]:
+        tokens = _TOKEN.findall(q)
+        if not tokens:
+            return []
+        results = []
+        if "componente" in tipos:
+            rows = self.repository.search_componentes(tokens, limit)
+            results += [_componente_result(row, score) for row, score in zip(rows, self._relative(rows))]
+        if "alumno" in tipos:
+            # Una palabra con dígitos se toma como prefijo del código; el resto se busca en nombres/apellidos
+            codigo = next((token for token in tokens if any(char.isdigit() for char in token)), None)
+            words = [token for token in tokens if token != codigo]
+            rows = self.repository.search_alumnos(words, codigo, limit)
+            if not words:
+                for row in rows:
+                    row["score"] = len(codigo) / len(row["codigo"])
+            results += [_alumno_result(row, score) for row, score in zip(rows, self._relative(rows))]
+        return results
+    
+    @staticmethod
+    def _relative(rows: List[dict]) -> List[float]:
+        # bm25 depende de las estadísticas de cada tabla FTS; se escala a (0, 1] por tipo para poder mezclarlos
+        best = max((row["score"] for row in rows), default=0.0)
+        return [round(row["score"] / best, 4) if best > 0 else 0.0 for row in rows]
+    
+    def _search_trigram(self, q: str, limit: int, tipos) -> List[dict]:
+        results = []
+        # Una sola lectura para las versiones de ambos catálogos
+        versions = CatalogVersionRepository(self.db).get_all()
+        if "componente" in tipos:
+            index, rows = _fallback_indexes["componente"].get(
+                versions.get("components", 0), self._componente_documents
+            )
+            results += [_componente_result(rows[key], round(score, 4)) for key, score in index.search(q, limit)]
+        if "alumno" in tipos:
+            index, rows = _fallback_indexes["alumno"].get(versions.get("students", 0), self._alumno_documents)
+            results += [_alumno_result(rows[key], round(score, 4)) for key, score in index.search(q, limit)]
+        return results
+    
+    def _componente_documents(self) -> List[Tuple[dict, str]]:
+        return [
+            ({"id": componente_id, "nombre": nombre}, nombre)
+            for componente_id, nombre in self.repository.get_componente_documents()
+        ]
+    
+    def _alumno_documents(self) -> List[Tuple[dict, str]]:
+        return [
+            (
+                {"id": alumno_id, "codigo": codigo, "nombres": nombres, "apellidos": apellidos},
+                f"{codigo} {nombres} {apellidos}",
+            )
+            for alumno_id, codigo, nombres, apellidos in self.repository.get_alumno_documents()
+        ]
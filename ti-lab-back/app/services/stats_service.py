@@ -0,0 +1,103 @@
+from datetime import date, datetime, timedelta
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable, List, Optional
+from app.models.jornada_prestamo import JornadaPrestamo
+from app.repositories.stats_repository import CONTADORES, StatsRepository
+
+
+def _bucket(jornada: JornadaPrestamo, componente_id: int, **contadores: int) -> dict:
+    return {
+        "seccion_id": jornada.seccion_id,
+        "fecha": jornada.fecha,
+        "componente_id": componente_id,
+        "curso_id": jornada.curso_id,
+        "prestamos": 0,
+        "unidades": 0,
+        "devoluciones": 0,
+        "segundos_fuera": 0,
+        **contadores,
+    }
+
+
+def loan_usage(jornada: JornadaPrestamo, demands: List[Dict[int, int]]) -> List[dict]:
+    """Incrementos por los préstamos nuevos de una jornada; `demands` trae uno por préstamo
+    (unidades por componente, como `component_demand`)."""
+    buckets: Dict[int, dict] = {}
+    for demand in demands:
+        for componente_id, unidades in demand.items():
+            bucket = buckets.setdefault(componente_id, _bucket(jornada, componente_id))
+            bucket["prestamos"] += 1
+            bucket["unidades"] += unidades
+    return list(buckets.values())
+
+
+def return_usage(jornada: JornadaPrestamo, demand: Dict[int, int], fuera: timedelta) -> List[dict]:
+    segundos = round(fuera.total_seconds())
+    return [_bucket(jornada, componente_id, devoluciones=1, segundos_fuera=segundos) for componente_id in demand]
+
+
+def merge_usage(rows: Iterable[dict]) -> List[dict]:
+    """Suma las filas que caen en el mismo bucket: un upsert por lotes no puede tocar la misma fila dos veces."""
+    buckets: Dict[tuple, dict] = {}
+    for row in rows:
+        key = (row["seccion_id"], row["fecha"], row["componente_id"])
+        if key in buckets:
+            for name in CONTADORES:
+                buckets[key][name] += row[name]
+        else:
+            buckets[key] = dict(row)
+    return list(buckets.values())
+
+
+def _summary(row: dict) -> dict:
+    devoluciones = row["devoluciones"] or 0
+    return {
+        **{key: value for key, value in row.items() if key != "segundos_fuera"},
+        "minutos_promedio_fuera": round(row["segundos_fuera"] / devoluciones / 60, 1) if devoluciones else None,
+    }
+
+
+class StatsService:
+    def __init__(self, db: Session):
+        self.db = db
+        self.repository = StatsRepository(db)
+    
+    def by_component(
+        self,
+        curso_id: Optional[int] = None,
+        seccion_id: Optional[int] = None,
+        desde: Optional[date] = None,
+        hasta: Optional[date] = None,
+        limit: int = 50,
+    ) -> List[dict]:
+        return [_summary(row) for row in self.repository.by_component(curso_id, seccion_id, desde, hasta, limit)]
+    
+    def by_week(
+        self,
+        curso_id: Optional[int] = None,
+        seccion_id: Optional[int] = None,
+        componente_id: Optional[int] = None,
+        desde: Optional[date] = None,
+        hasta: Optional[date] = None,
+    ) -> List[dict]:
+        # Los días se agrupan aquí (semana ISO, desde el lunes) para no depender de funciones de fecha del motor
+        semanas: Dict[date, dict] = {}
+        for row in self.repository.by_day(curso_id, seccion_id, componente_id, desde, hasta):
+            semana = row["fecha"] - timedelta(days=row["fecha"].weekday())
+            totales = semanas.setdefault(
+                semana, {"semana": semana, "prestamos": 0, "unidades": 0, "devoluciones": 0, "segundos_fuera": 0}
+            )
+            for key in CONTADORES:
+                totales[key] += row[key]
+        return [_summary(totales) for totales in semanas.values()]
+    
+    def rebuild(self, desde: Optional[date] = None, hasta: Optional[date] = None) -> dict:
+        inicio = datetime.now()
+        filas = self.repository.rebuild(desde, hasta)
+        self.db.commit()
+        return {
+            "filas": filas,
+            "desde": desde.isoformat() if desde else None,
+            "hasta": hasta.isoformat() if hasta else None,
+            "segundos": round((datetime.now() - inicio).total_seconds(), 2),
+        }
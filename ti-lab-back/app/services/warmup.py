@@ -0,0 +1,99 @@
+import logging
+import time
+from sqlalchemy.orm import Session, configure_mappers
+from starlette.concurrency import run_in_threadpool
+from typing import Any, Callable, List, Tuple
+from app.core.database import (
+    AsyncReadSessionLocal,
+    AsyncSessionLocal,
+    Database,
+    ReadSessionLocal,
+    SessionLocal,
+    async_engine,
+    async_read_engine,
+    engine,
+    engine_profile,
+    read_engine,
+    replica_monitor,
+    warm_up_async_pool,
+    warm_up_pool,
+)
+from app.services.availability_service import AvailabilityService
+from app.services.component_service import ComponentService
+from app.services.kit_service import KitService
+from app.services.loan_service import LoanService
+from app.services.search_service import SearchService
+
+logger = logging.getLogger(__name__)
+
+# Lecturas de las rutas más usadas. Ejecutarlas una vez deja su SQL en la caché de compilación del
+# engine (LIMIT/OFFSET son parámetros, así que limit=1 comparte la entrada con limit=100) y construye
+# los TypeAdapter de las rutas rápidas; la primera request real ya no paga ninguna de las dos cosas.
+HOT_READS: Tuple[Tuple[str, Callable[[Session], Any]], ...] = (
+    ("components", lambda db: ComponentService(db).get_components_page_json(limit=1)),
+    ("kits", lambda db: KitService(db).get_kits_page_json(limit=1)),
+    ("loans", lambda db: LoanService(db).get_loans_page_json(limit=1)),
+    ("loans.overdue", lambda db: LoanService(db).get_overdue_page_json(limit=1)),
+    ("loans.by_id", lambda db: LoanService(db).get_loan_json(0)),
+    ("availability", lambda db: AvailabilityService(db).get_all_availability(limit=1)),
+    ("search", lambda db: SearchService(db).search("a", limit=1)),
+)
+
+
+def warm_up_statements(db: Session) -> List[str]:
+    """Ejecuta cada lectura de HOT_READS y devuelve las que fallaron (un fallo no impide arrancar)."""
+    failed = []
+    for name, read in HOT_READS:
+        try:
+            read(db)
+        except Exception:
+            logger.exception("Error al precalentar una consulta", extra={"consulta": name})
+            failed.append(name)
+        finally:
+            db.rollback()
+    return failed
+
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 1)
+
+
+async def warm_up() -> dict:
+    """Trabajo que de otro modo haría la primera request: mappers, conexiones y consultas frecuentes."""
+    report = {}
+    inicio = start = time.perf_counter()
+    configure_mappers()
+    report["mappers_ms"] = _elapsed_ms(start)
+    
+    start = time.perf_counter()
+    if async_engine is not None:
+        report["connections"] = await warm_up_async_pool(async_engine, engine_profile.pool_size)
+        factories = {"primary": AsyncSessionLocal, "replica": AsyncReadSessionLocal}
+    else:
+        report["connections"] = await run_in_threadpool(warm_up_pool, engine, engine_profile.pool_size)
+        factories = {"primary": SessionLocal, "replica": ReadSessionLocal}
+    if async_read_engine is not None:
+        report["replica_connections"] = await warm_up_async_pool(async_read_engine, engine_profile.pool_size)
+    elif read_engine is not None:
+        report["replica_connections"] = await run_in_threadpool(warm_up_pool, read_engine, engine_profile.pool_size)
+    if replica_monitor is not None:
+        await run_in_threadpool(replica_monitor.refresh)
+    report["pool_ms"] = _elapsed_ms(start)
+    
+    # Cada engine tiene su propia caché de compilación: con réplica, las lecturas se calientan en ambas
+    start = time.perf_counter()
+    report["failed"] = []
+    for target, factory in factories.items():
+        if factory is None:
+            continue
+        database = Database(factory())
+        try:
+            failed = await database.run(warm_up_statements)
+        finally:
+            await database.close()
+        report["failed"] += [f"{name}@{target}" for name in failed]
+    report["statements"] = len(HOT_READS)
+    report["statements_ms"] = _elapsed_ms(start)
+    report["total_ms"] = _elapsed_ms(inicio)
+    logger.info("Arranque precalentado", extra=report)
+    return report
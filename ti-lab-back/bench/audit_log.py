@@ -0,0 +1,218 @@
+"""Auditoría de préstamos: costo por checkout, cobertura tras el apagado y contrapresión.
+
+Cada variante corre en un intérprete nuevo sobre una base sembrada con bench.checkout_race.seed:
+`off` (AUDIT_ENABLED=false), `write_behind` (valores por defecto) y `backpressure` (cola de 8 cambios
+y lotes de 4: la cola se llena, las escrituras esperan lugar antes de empezar y quien igual la
+encuentra llena al confirmar escribe en línea, o desborda en DATABASE_MODE=async). En cada una se crean
+`--requests` préstamos (de a `--concurrency` a la vez), se devuelve la mitad de a uno y el resto con
+return-batch, midiendo la latencia de cada request.
+
+Después de cerrar el lifespan (el flush de apagado) compara la tabla de auditoría con los préstamos:
+cada préstamo y detalle creado y cada devolución debe tener su registro con el actor de X-Actor, y
+GET /api/v1/audit/loans, paginado, debe devolverlos todos. Falla (exit 1) si falta o sobra alguno o
+si una respuesta no es la esperada.
+
+    python -m bench.audit_log --requests 200 --concurrency 8
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from bench.checkout_race import seed
+
+ACTOR = "bench"
+
+VARIANTS = {
+    "off": {"AUDIT_ENABLED": "false"},
+    "write_behind": {},
+    "backpressure": {"AUDIT_QUEUE_SIZE": "8", "AUDIT_BATCH_SIZE": "4", "AUDIT_FLUSH_SECONDS": "5"},
+}
+
+
+def _latency(latencies: list) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "p50": round(statistics.median(latencies) * 1000, 2),
+        "p95": round(latencies[max(int(len(latencies) * 0.95) - 1, 0)] * 1000, 2),
+    }
+
+
+async def _workload(app, data: dict, concurrency: int) -> dict:
+    import httpx
+    
+    semaphore = asyncio.Semaphore(concurrency)
+    statuses = []
+    
+    async def timed(client, method: str, path: str, **kwargs):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.request(method, path, **kwargs)
+            elapsed = time.perf_counter() - start
+        statuses.append(response.status_code)
+        return response, elapsed
+    
+    result = {}
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers={"X-Actor": ACTOR}) as client:
+            created = await asyncio.gather(*(
+                timed(client, "POST", "/api/v1/loans/", json={
+                    "jornada_id": data["jornada_id"],
+                    "alumno_id": alumno_id,
+                    "detalles": [{"componente_id": data["componente_id"]}],
+                })
+                for alumno_id in data["alumnos"]
+            ))
+            loan_ids = [response.json()["id"] for response, _ in created if response.status_code == 201]
+            individual, batch = loan_ids[: len(loan_ids) // 2], loan_ids[len(loan_ids) // 2:]
+            returned = await asyncio.gather(*(
+                timed(client, "PUT", f"/api/v1/loans/{loan_id}/return") for loan_id in individual
+            ))
+            await timed(client, "POST", "/api/v1/loans/return-batch", json={"prestamo_ids": batch})
+        result["create_ms"] = _latency([elapsed for _, elapsed in created])
+        result["return_ms"] = _latency([elapsed for _, elapsed in returned])
+        # El cierre del lifespan incluye el flush de lo que quedó en la cola
+        start = time.perf_counter()
+    result["shutdown_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    result["loans"] = loan_ids
+    result["unexpected_statuses"] = sorted({status for status in statuses if status not in (200, 201)})
+    return result
+
+
+async def _paginate(app) -> int:
+    import httpx
+    
+    entries, cursor = 0, None
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            while True:
+                response = await client.get("/api/v1/audit/loans", params={"limit": 100, **({"cursor": cursor} if cursor else {})})
+                response.raise_for_status()
+                entries += len(response.json())
+                cursor = response.headers.get("X-Next-Cursor")
+                if not cursor:
+                    return entries
+
+
+def _coverage(loan_ids: list) -> dict:
+    from sqlalchemy import select
+    from app.core.database import SessionLocal
+    from app.models import AuditoriaPrestamo
+    
+    with SessionLocal() as session:
+        rows = session.execute(select(
+            AuditoriaPrestamo.prestamo_id,
+            AuditoriaPrestamo.tabla,
+            AuditoriaPrestamo.accion,
+            AuditoriaPrestamo.actor,
+            AuditoriaPrestamo.despues,
+        )).all()
+    expected = {("prestamos", "crear"), ("detalles_prestamo", "crear"), ("prestamos", "actualizar")}
+    by_loan = {}
+    for row in rows:
+        by_loan.setdefault(row.prestamo_id, []).append(row)
+    missing = [
+        loan_id for loan_id in loan_ids
+        if {(row.tabla, row.accion) for row in by_loan.get(loan_id, [])} != expected
+    ]
+    returned = sum(1 for row in rows if row.accion == "actualizar" and (row.despues or {}).get("estado") == "devuelto")
+    return {
+        "rows": len(rows),
+        "loans_missing_entries": len(missing),
+        "returns_audited": returned,
+        "other_actors": sorted({row.actor for row in rows if row.actor != ACTOR}, key=str),
+    }
+
+
+def child(concurrency: int) -> None:
+    from app.core.audit import AUDIT_BACKPRESSURE, AUDIT_EVENTS
+    from app.core.config import settings
+    from main import app
+    
+    data = json.loads(os.environ["BENCH_AUDIT_DATA"])
+    result = asyncio.run(_workload(app, data, concurrency))
+    result["coverage"] = _coverage(result.pop("loans"))
+    result["requests"] = len(data["alumnos"])
+    if settings.audit_enabled:
+        result["paginated_entries"] = asyncio.run(_paginate(app))
+    result["outcomes"] = {key[0]: int(value) for key, value in AUDIT_EVENTS._values.items()}
+    result["backpressure_waits"] = int(sum(AUDIT_BACKPRESSURE._values.values()))
+    print(json.dumps(result))
+
+
+def run_variant(name: str, requests: int, concurrency: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'audit.db')}"
+        data = seed(url, alumnos=requests, stock=requests)
+        env = {
+            **os.environ,
+            **VARIANTS[name],
+            "DATABASE_URL": url,
+            "BENCH_AUDIT_DATA": json.dumps(data),
+            "LOG_LEVEL": "OFF",
+            "OVERDUE_CHECK_SECONDS": "0",
+        }
+        result = subprocess.run(
+            [sys.executable, "-m", "bench.audit_log", "--child", "--concurrency", str(concurrency)],
+            env=env, capture_output=True, text=True, check=True,
+        )
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def check(name: str, result: dict) -> list:
+    failures = [f"{name}: unexpected statuses {status}" for status in result["unexpected_statuses"]]
+    coverage = result["coverage"]
+    if name == "off":
+        if coverage["rows"]:
+            failures.append(f"off: {coverage['rows']} audit rows with auditing disabled")
+        return failures
+    # Por préstamo: su alta, la de su detalle y su devolución
+    if coverage["rows"] != 3 * result["requests"] or coverage["loans_missing_entries"]:
+        failures.append(f"{name}: incomplete audit {coverage}")
+    if coverage["returns_audited"] != result["requests"]:
+        failures.append(f"{name}: {coverage['returns_audited']} returns audited of {result['requests']}")
+    if coverage["other_actors"]:
+        failures.append(f"{name}: unexpected actors {coverage['other_actors']}")
+    if result["paginated_entries"] != coverage["rows"]:
+        failures.append(f"{name}: endpoint paginated {result['paginated_entries']} of {coverage['rows']} entries")
+    if name == "backpressure" and not (result["backpressure_waits"] or result["outcomes"].get("write_through")):
+        failures.append("backpressure: the queue never filled up")
+    if result["outcomes"].get("lost"):
+        failures.append(f"{name}: {result['outcomes']['lost']} changes lost")
+    return failures
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args(argv)
+    if args.child:
+        child(args.concurrency)
+        return 0
+    
+    results = {name: run_variant(name, args.requests, args.concurrency) for name in VARIANTS}
+    failures = [failure for name, result in results.items() for failure in check(name, result)]
+    off = results["off"]["create_ms"]["p50"]
+    print(json.dumps({
+        "mode": os.getenv("DATABASE_MODE", "sync"),
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "variants": results,
+        "create_p50_overhead_ms": {
+            name: round(result["create_ms"]["p50"] - off, 2) for name, result in results.items() if name != "off"
+        },
+        "failures": failures,
+    }, indent=2))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
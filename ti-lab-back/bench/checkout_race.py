@@ -0,0 +1,143 @@
+"""Carrera de checkout: N préstamos simultáneos por un mismo componente con stock limitado.
+
+Prepara una sección con N alumnos, una jornada y un componente con `--stock` unidades, y lanza
+los N POST /api/v1/loans/ a la vez contra la app en proceso. Falla (exit 1) si no se prestan
+exactamente `--stock` unidades (todas las demás deben ser 400 "not available", nunca 5xx ni
+409) o si el ledger queda inconsistente.
+
+    python -m bench.checkout_race --requests 100 --stock 1
+    DATABASE_MODE=async python -m bench.checkout_race --rounds 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import date
+import httpx
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.orm import sessionmaker
+from app.migrations import run_migrations
+from app.models import Alumno, Componente, Curso, DetallePrestamo, DisponibilidadComponente, JornadaPrestamo, Seccion
+
+
+def seed(url: str, alumnos: int, stock: int) -> dict:
+    engine = create_engine(url)
+    run_migrations(engine)
+    with sessionmaker(bind=engine)() as session:
+        session.execute(insert(Curso), [{"id": 1, "nombre": "Laboratorio", "codigo": "RACE-1"}])
+        session.execute(insert(Seccion), [{"id": 1, "nombre": "Sección 01", "profesor": "Bench", "curso_id": 1}])
+        session.execute(insert(Alumno), [
+            {"id": i, "codigo": f"R{i:05d}", "nombres": "Alumno", "apellidos": f"{i}", "seccion_id": 1}
+            for i in range(1, alumnos + 1)
+        ])
+        session.execute(insert(JornadaPrestamo), [{"id": 1, "fecha": date.today(), "curso_id": 1, "seccion_id": 1}])
+        session.execute(insert(Componente), [{"id": 1, "nombre": "Osciloscopio", "requiere_numero_serie": False}])
+        session.execute(insert(DisponibilidadComponente), [{"componente_id": 1, "en_stock": stock, "prestados": 0}])
+        session.commit()
+    engine.dispose()
+    return {"jornada_id": 1, "componente_id": 1, "alumnos": list(range(1, alumnos + 1))}
+
+
+def restock(url: str, unidades: int) -> None:
+    engine = create_engine(url)
+    with sessionmaker(bind=engine)() as session:
+        row = session.get(DisponibilidadComponente, 1)
+        row.en_stock += unidades
+        session.commit()
+    engine.dispose()
+
+
+def ledger(url: str) -> dict:
+    engine = create_engine(url)
+    with sessionmaker(bind=engine)() as session:
+        row = session.get(DisponibilidadComponente, 1)
+        unidades = session.scalar(select(func.coalesce(func.sum(DetallePrestamo.cantidad), 0)).where(DetallePrestamo.componente_id == 1))
+        result = {"en_stock": row.en_stock, "prestados": row.prestados, "version": row.version, "unidades_en_prestamos": unidades}
+    engine.dispose()
+    return result
+
+
+async def race(app, data: dict, offset: int, requests: int) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        async def checkout(alumno_id: int):
+            start = time.perf_counter()
+            response = await client.post("/api/v1/loans/", json={
+                "jornada_id": data["jornada_id"],
+                "alumno_id": alumno_id,
+                "detalles": [{"componente_id": data["componente_id"]}],
+            })
+            return response.status_code, response.json().get("detail"), time.perf_counter() - start
+        
+        start = time.perf_counter()
+        results = await asyncio.gather(*(checkout(a) for a in data["alumnos"][offset:offset + requests]))
+        elapsed = time.perf_counter() - start
+    latencies = sorted(latency for _, _, latency in results)
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "requests_per_s": round(len(results) / elapsed, 1),
+        "latency_ms": {
+            "p50": round(statistics.median(latencies) * 1000, 1),
+            "p95": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 1),
+            "max": round(latencies[-1] * 1000, 1),
+        },
+        "status": dict(Counter(status for status, _, _ in results)),
+        "details": dict(Counter(str(detail) for status, detail, _ in results if status != 201)),
+    }
+
+
+def retries() -> int:
+    from app.core.retry import DB_RETRIES
+    return int(sum(DB_RETRIES._values.values()))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--stock", type=int, default=1)
+    parser.add_argument("--rounds", type=int, default=1, help="Rondas sucesivas; cada una suma `--stock` unidades")
+    args = parser.parse_args(argv)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'race.db')}"
+        data = seed(url, args.requests * args.rounds, 0)
+        os.environ["DATABASE_URL"] = url
+        os.environ.setdefault("OVERDUE_CHECK_SECONDS", "0")
+        from main import app
+        
+        rounds = []
+        for r in range(args.rounds):
+            # Cada ronda usa alumnos nuevos y compite por `--stock` unidades recién agregadas
+            restock(url, args.stock)
+            rounds.append(asyncio.run(race(app, data, r * args.requests, args.requests)))
+        final = ledger(url)
+    
+    failures = []
+    for r, result in enumerate(rounds):
+        prestados = result["status"].get(201, 0)
+        if prestados != min(args.stock, args.requests):
+            failures.append(f"round {r}: {prestados} checkouts succeeded (expected {min(args.stock, args.requests)})")
+        unexpected = {status: count for status, count in result["status"].items() if status not in (201, 400)}
+        if unexpected:
+            failures.append(f"round {r}: unexpected statuses {unexpected}")
+    if not final["prestados"] == final["unidades_en_prestamos"] <= final["en_stock"]:
+        failures.append(f"ledger inconsistent: {final}")
+    print(json.dumps({
+        "mode": os.getenv("DATABASE_MODE", "sync"),
+        "requests": args.requests,
+        "stock": args.stock,
+        "rounds": rounds,
+        "retries": retries(),
+        "ledger": final,
+        "failures": failures,
+    }, indent=2))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+"""Generador determinista de un laboratorio sintético: cursos, secciones, alumnos, catálogo,
+jornadas, préstamos y sus detalles, a la escala indicada.
+
+    python -m bench.dataset --db /tmp/lab.db --scale large --seed 7
+    python -m bench.dataset --db /tmp/lab.db --semestres 10 --secciones-por-semestre 200
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List
+from pydantic import BaseModel
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session, sessionmaker
+from app.migrations import run_migrations
+from app.models import (
+    Alumno, Componente, Curso, DetallePrestamo, DisponibilidadComponente, JornadaPrestamo, Kit, KitComponente,
+    Prestamo, Seccion
+)
+from app.models.prestamo import ESTADO_ACTIVO, ESTADO_DEVUELTO
+from app.services.availability_service import AvailabilityService
+
+NOMBRES = [
+    "José", "María", "Luis", "Ana", "Carlos", "Lucía", "Jorge", "Sofía", "Miguel", "Valeria", "Andrés", "Camila",
+    "Diego", "Fernanda", "Renato", "Daniela", "Gabriel", "Mariana", "Sebastián", "Alejandra", "Mateo", "Ximena",
+]
+APELLIDOS = [
+    "Peña", "García", "Rodríguez", "Quispe", "Flores", "Huamán", "Sánchez", "Ramírez", "Torres", "Castillo",
+    "Mendoza", "Chávez", "Vargas", "Rojas", "Gutiérrez", "Salazar", "Paredes", "Córdova", "Espinoza", "Mamani",
+]
+COMPONENTES = [
+    "Arduino Uno", "Arduino Mega", "Raspberry Pi", "Protoboard", "Resistencia", "Condensador", "Sensor ultrasónico",
+    "Sensor de temperatura", "Módulo Bluetooth", "Módulo WiFi", "Servomotor", "Motor DC", "Driver L298N",
+    "Pantalla LCD", "LED RGB", "Multímetro", "Fuente regulable", "Osciloscopio", "Cable dupont", "Potenciómetro",
+]
+PROFESORES = ["Prof. Salas", "Prof. Lozano", "Prof. Ibarra", "Prof. Medina", "Prof. Cárdenas", "Prof. Núñez"]
+
+CHUNK = 5000
+
+
+class DatasetScale(BaseModel):
+    semestres: int = 10
+    secciones_por_semestre: int = 200
+    cursos_por_semestre: int = 20
+    alumnos_por_seccion: int = 25
+    jornadas_por_seccion: int = 4
+    prestamos_por_jornada: int = 10
+    componentes: int = 500
+    kits: int = 50
+    componentes_por_kit: int = 4
+    # Unidades en stock de cada componente; alto para que los préstamos del driver no se rechacen
+    stock: int = 100000
+
+
+SCALES: Dict[str, DatasetScale] = {
+    "small": DatasetScale(semestres=2, secciones_por_semestre=20, cursos_por_semestre=5, componentes=100, kits=10),
+    "medium": DatasetScale(semestres=5, secciones_por_semestre=100, cursos_por_semestre=10, componentes=300, kits=30),
+    "large": DatasetScale(),
+}
+
+
+def _insert(session: Session, model, rows: List[dict]) -> None:
+    for start in range(0, len(rows), CHUNK):
+        session.execute(insert(model), rows[start:start + CHUNK])
+
+
+def generate(session: Session, scale: DatasetScale, seed: int = 42) -> Dict[str, int]:
+    """Llena todos los modelos con ids explícitos; la misma semilla produce la misma base.
+    
+    Solo las jornadas más recientes del último semestre dejan préstamos abiertos; el ledger
+    de disponibilidad se deja consistente con ellos mediante la reconciliación.
+    """
+    rng = random.Random(seed)
+    
+    componentes = [
+        {"id": i + 1, "nombre": f"{COMPONENTES[i % len(COMPONENTES)]} {i + 1}", "requiere_numero_serie": i % 10 == 0}
+        for i in range(scale.componentes)
+    ]
+    con_serie = {componente["id"] for componente in componentes if componente["requiere_numero_serie"]}
+    kits = [{"id": k + 1, "nombre": f"Kit {k + 1}", "descripcion": "Kit de laboratorio"} for k in range(scale.kits)]
+    kit_componentes = [
+        {"kit_id": kit["id"], "componente_id": componente_id, "cantidad": rng.randint(1, 3)}
+        for kit in kits
+        for componente_id in rng.sample(range(1, scale.componentes + 1), min(scale.componentes_por_kit, scale.componentes))
+    ]
+    
+    cursos, secciones, alumnos, jornadas = [], [], [], []
+    alumnos_por_seccion: Dict[int, List[int]] = {}
+    for semestre in range(scale.semestres):
+        anio, periodo = 2020 + semestre // 2, semestre % 2 + 1
+        inicio = date(anio, 3 if periodo == 1 else 8, 15)
+        for c in range(scale.cursos_por_semestre):
+            cursos.append({
+                "id": len(cursos) + 1,
+                "nombre": f"Laboratorio de Electrónica {c + 1}",
+                "codigo": f"{anio}-{periodo}-EL{c + 1:03d}",
+            })
+        for s in range(scale.secciones_por_semestre):
+            curso_id = semestre * scale.cursos_por_semestre + s % scale.cursos_por_semestre + 1
+            seccion_id = len(secciones) + 1
+            secciones.append({
+                "id": seccion_id,
+                "nombre": f"Sección {s + 1:03d}",
+                "profesor": rng.choice(PROFESORES),
+                "curso_id": curso_id,
+            })
+            ids = []
+            for _ in range(scale.alumnos_por_seccion):
+                alumno_id = len(alumnos) + 1
+                alumnos.append({
+                    "id": alumno_id,
+                    "codigo": f"{anio}{alumno_id:07d}",
+                    "nombres": f"{rng.choice(NOMBRES)} {rng.choice(NOMBRES)}",
+                    "apellidos": f"{rng.choice(APELLIDOS)} {rng.choice(APELLIDOS)}",
+                    "seccion_id": seccion_id,
+                })
+                ids.append(alumno_id)
+            alumnos_por_seccion[seccion_id] = ids
+            for j in range(scale.jornadas_por_seccion):
+                jornadas.append({
+                    "id": len(jornadas) + 1,
+                    "fecha": inicio + timedelta(weeks=3 * j, days=s % 5),
+                    "curso_id": curso_id,
+                    "seccion_id": seccion_id,
+                    # Préstamos abiertos: última jornada de cada sección del semestre en curso
+                    "abierta": semestre == scale.semestres - 1 and j == scale.jornadas_por_seccion - 1,
+                })
+    
+    prestamos, detalles = [], []
+    for jornada in jornadas:
+        elegibles = alumnos_por_seccion[jornada["seccion_id"]]
+        for minuto, alumno_id in enumerate(rng.sample(elegibles, min(scale.prestamos_por_jornada, len(elegibles)))):
+            prestamo_id = len(prestamos) + 1
+            fecha_prestamo = datetime.combine(jornada["fecha"], datetime.min.time()) + timedelta(hours=8, minutes=minuto)
+            prestamos.append({
+                "id": prestamo_id,
+                "jornada_id": jornada["id"],
+                "alumno_id": alumno_id,
+                "estado": ESTADO_ACTIVO if jornada["abierta"] else ESTADO_DEVUELTO,
+                "fecha_prestamo": fecha_prestamo,
+                "fecha_devolucion": None if jornada["abierta"] else fecha_prestamo + timedelta(hours=2),
+                # Plazo de la jornada: los abiertos ya vencieron y el scheduler los marca al arrancar
+                "fecha_limite": fecha_prestamo + timedelta(hours=4),
+            })
+            for n in range(rng.randint(1, 3)):
+                detalle = {"prestamo_id": prestamo_id, "componente_id": None, "kit_id": None, "numero_serie": None}
+                if scale.kits and rng.random() < 0.3:
+                    detalle.update(kit_id=rng.randint(1, scale.kits), cantidad=1)
+                else:
+                    componente_id = rng.randint(1, scale.componentes)
+                    detalle.update(componente_id=componente_id, cantidad=rng.randint(1, 2))
+                    if componente_id in con_serie:
+                        detalle.update(cantidad=1, numero_serie=f"SN-{prestamo_id}-{n}")
+                detalles.append(detalle)
+    
+    for model, rows in (
+        (Componente, componentes),
+        (Kit, kits),
+        (KitComponente, kit_componentes),
+        (Curso, cursos),
+        (Seccion, secciones),
+        (Alumno, alumnos),
+        (JornadaPrestamo, [{k: v for k, v in jornada.items() if k != "abierta"} for jornada in jornadas]),
+        (Prestamo, prestamos),
+        (DetallePrestamo, detalles),
+        (
+            DisponibilidadComponente,
+            [{"componente_id": c["id"], "en_stock": scale.stock, "prestados": 0} for c in componentes],
+        ),
+    ):
+        _insert(session, model, rows)
+    session.commit()
+    AvailabilityService(session).reconcile(apply=True)
+    
+    return {
+        "cursos": len(cursos),
+        "secciones": len(secciones),
+        "alumnos": len(alumnos),
+        "componentes": len(componentes),
+        "kits": len(kits),
+        "kit_componentes": len(kit_componentes),
+        "jornadas": len(jornadas),
+        "prestamos": len(prestamos),
+        "prestamos_abiertos": sum(1 for prestamo in prestamos if prestamo["estado"] == ESTADO_ACTIVO),
+        "detalles": len(detalles),
+    }
+
+
+def scale_from_args(args: argparse.Namespace) -> DatasetScale:
+    overrides = {
+        field: getattr(args, field)
+        for field in DatasetScale.model_fields
+        if getattr(args, field, None) is not None
+    }
+    return SCALES[args.scale].model_copy(update=overrides)
+
+
+def add_scale_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--seed", type=int, default=42)
+    # Cada campo de DatasetScale puede ajustarse por separado: --semestres, --alumnos-por-seccion, ...
+    for field in DatasetScale.model_fields:
+        parser.add_argument(f"--{field.replace('_', '-')}", dest=field, type=int, default=None)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", required=True, help="Archivo SQLite a crear (o una URL de SQLAlchemy)")
+    add_scale_arguments(parser)
+    args = parser.parse_args(argv)
+    
+    url = args.db if "://" in args.db else f"sqlite:///{args.db}"
+    engine = create_engine(url)
+    run_migrations(engine)
+    start = time.perf_counter()
+    with sessionmaker(bind=engine, autoflush=False)() as session:
+        counts = generate(session, scale_from_args(args), seed=args.seed)
+    engine.dispose()
+    print(json.dumps({"database_url": url, "elapsed_s": round(time.perf_counter() - start, 2), **counts}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
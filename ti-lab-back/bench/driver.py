@@ -0,0 +1,255 @@
+"""Driver de carga en proceso: peticiones mixtas de lectura/escritura contra la app de main.py.
+
+Genera (o reutiliza) una base sintética con bench.dataset, lanza `--concurrency` clientes sobre
+un solo event loop mediante el transporte ASGI de httpx y guarda un reporte JSON con
+p50/p95/p99 y throughput por operación, comparable entre commits con `bench.report compare`.
+
+    python -m bench.driver --scale medium --workload mixed --concurrency 16 --requests 5000 \\
+        --output bench-$(git rev-parse --short HEAD).json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Awaitable, Callable, Dict, List
+import httpx
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from app.migrations import run_migrations
+from app.models import Alumno, Componente, JornadaPrestamo, Kit, Prestamo
+from app.models.prestamo import ESTADOS_ABIERTOS
+from bench.dataset import APELLIDOS, COMPONENTES, NOMBRES, add_scale_arguments, generate, scale_from_args
+from bench.report import Recorder, save
+
+
+class Context:
+    """Ids válidos de la base, compartidos por todos los clientes (un solo event loop)."""
+    
+    def __init__(self, session):
+        self.componentes = list(session.scalars(select(Componente.id).where(Componente.requiere_numero_serie.is_(False))))
+        self.componentes_con_serie = list(session.scalars(select(Componente.id).where(Componente.requiere_numero_serie.is_(True))))
+        self.kits = list(session.scalars(select(Kit.id)))
+        self.prestamos_abiertos = list(session.scalars(select(Prestamo.id).where(Prestamo.estado.in_(ESTADOS_ABIERTOS))))
+        self.max_prestamo = session.scalar(select(Prestamo.id).order_by(Prestamo.id.desc()).limit(1)) or 0
+        # Jornadas del semestre en curso (las que tienen préstamos abiertos) con los alumnos de su sección
+        jornadas = session.execute(
+            select(JornadaPrestamo.id, JornadaPrestamo.seccion_id)
+            .where(JornadaPrestamo.id.in_(select(Prestamo.jornada_id).where(Prestamo.estado.in_(ESTADOS_ABIERTOS))))
+        ).all()
+        alumnos: Dict[int, List[int]] = {}
+        for alumno_id, seccion_id in session.execute(
+            select(Alumno.id, Alumno.seccion_id).where(Alumno.seccion_id.in_({seccion_id for _, seccion_id in jornadas}))
+        ):
+            alumnos.setdefault(seccion_id, []).append(alumno_id)
+        self.jornadas = [(jornada_id, alumnos[seccion_id]) for jornada_id, seccion_id in jornadas if seccion_id in alumnos]
+        self.terminos = NOMBRES + APELLIDOS + COMPONENTES
+        self.serie = 0
+    
+    def detalle(self, rng: random.Random) -> dict:
+        if self.kits and rng.random() < 0.3:
+            return {"kit_id": rng.choice(self.kits), "cantidad": 1}
+        if self.componentes_con_serie and rng.random() < 0.1:
+            self.serie += 1
+            return {"componente_id": rng.choice(self.componentes_con_serie), "cantidad": 1, "numero_serie": f"BENCH-{self.serie}"}
+        return {"componente_id": rng.choice(self.componentes), "cantidad": rng.randint(1, 2)}
+
+
+Operation = Callable[[httpx.AsyncClient, Context, random.Random], Awaitable[httpx.Response]]
+
+
+async def list_components(client, ctx, rng):
+    return await client.get("/api/v1/components/", params={"skip": rng.randrange(0, len(ctx.componentes), 1), "limit": 50})
+
+
+async def get_component(client, ctx, rng):
+    return await client.get(f"/api/v1/components/{rng.choice(ctx.componentes)}")
+
+
+async def component_availability(client, ctx, rng):
+    return await client.get(f"/api/v1/components/{rng.choice(ctx.componentes)}/availability")
+
+
+async def set_stock(client, ctx, rng):
+    return await client.put(f"/api/v1/components/{rng.choice(ctx.componentes)}/stock", json={"en_stock": 100000})
+
+
+async def list_kits(client, ctx, rng):
+    return await client.get("/api/v1/kits/", params={"limit": 20})
+
+
+async def get_kit(client, ctx, rng):
+    return await client.get(f"/api/v1/kits/{rng.choice(ctx.kits)}")
+
+
+async def list_loans(client, ctx, rng):
+    return await client.get("/api/v1/loans/", params={"limit": 50})
+
+
+async def get_loan(client, ctx, rng):
+    return await client.get(f"/api/v1/loans/{rng.randint(1, ctx.max_prestamo)}")
+
+
+async def search(client, ctx, rng):
+    termino = rng.choice(ctx.terminos)
+    return await client.get("/api/v1/search/", params={"q": termino[:rng.randint(1, len(termino))], "limit": 10})
+
+
+async def create_loan(client, ctx, rng):
+    jornada_id, alumnos = rng.choice(ctx.jornadas)
+    response = await client.post("/api/v1/loans/", json={
+        "jornada_id": jornada_id,
+        "alumno_id": rng.choice(alumnos),
+        "detalles": [ctx.detalle(rng) for _ in range(rng.randint(1, 3))],
+    })
+    if response.is_success:
+        ctx.prestamos_abiertos.append(response.json()["id"])
+    return response
+
+
+async def return_loan(client, ctx, rng):
+    if not ctx.prestamos_abiertos:
+        return await create_loan(client, ctx, rng)
+    # Se retira de la lista antes del await: dos clientes no devuelven el mismo préstamo
+    prestamo_id = ctx.prestamos_abiertos.pop(rng.randrange(len(ctx.prestamos_abiertos)))
+    return await client.put(f"/api/v1/loans/{prestamo_id}/return")
+
+
+async def bulk_loans(client, ctx, rng):
+    jornada_id, alumnos = rng.choice(ctx.jornadas)
+    elegidos = rng.sample(alumnos, min(5, len(alumnos)))
+    response = await client.post("/api/v1/loans/bulk", json={
+        "jornada_id": jornada_id,
+        "asignaciones": [{"alumno_id": alumno_id, "detalles": [ctx.detalle(rng)]} for alumno_id in elegidos],
+    })
+    if response.is_success:
+        ctx.prestamos_abiertos.extend(r["prestamo_id"] for r in response.json()["resultados"] if r.get("prestamo_id"))
+    return response
+
+
+OPERATIONS: Dict[str, Operation] = {
+    "components.list": list_components,
+    "components.get": get_component,
+    "components.availability": component_availability,
+    "components.stock": set_stock,
+    "kits.list": list_kits,
+    "kits.get": get_kit,
+    "loans.list": list_loans,
+    "loans.get": get_loan,
+    "loans.create": create_loan,
+    "loans.return": return_loan,
+    "loans.bulk": bulk_loans,
+    "search": search,
+}
+
+# Pesos relativos de cada operación
+WORKLOADS: Dict[str, Dict[str, int]] = {
+    "read": {
+        "components.list": 15, "components.get": 15, "components.availability": 5, "kits.list": 10,
+        "kits.get": 10, "loans.list": 15, "loans.get": 15, "search": 15,
+    },
+    "mixed": {
+        "components.list": 10, "components.get": 10, "components.availability": 5, "kits.list": 5,
+        "kits.get": 8, "loans.list": 10, "loans.get": 12, "search": 15, "loans.create": 12,
+        "loans.return": 9, "loans.bulk": 2, "components.stock": 2,
+    },
+    "write": {
+        "loans.create": 40, "loans.return": 30, "loans.bulk": 10, "components.stock": 5, "loans.get": 10,
+        "search": 5,
+    },
+}
+
+
+async def run_client(client, ctx: Context, recorder: Recorder, workload: Dict[str, int], plan: List[int], rng: random.Random):
+    names = list(workload)
+    weights = [workload[name] for name in names]
+    while plan:
+        plan.pop()
+        name = rng.choices(names, weights)[0]
+        start = time.perf_counter()
+        try:
+            response = await OPERATIONS[name](client, ctx, rng)
+        except Exception as exc:  # noqa: BLE001 (se reporta como fallo de la operación)
+            recorder.record(name, (time.perf_counter() - start) * 1000, None, repr(exc))
+            continue
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        error = response.text[:200] if response.status_code >= 400 else None
+        recorder.record(name, elapsed_ms, response.status_code, error)
+
+
+async def drive(app, ctx: Context, workload: Dict[str, int], concurrency: int, requests: int, warmup: int, seed: int):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        if warmup:
+            # Calienta cachés, pools y sentencias compiladas; no entra en el reporte
+            plan = list(range(warmup))
+            await asyncio.gather(*(
+                run_client(client, ctx, Recorder(), workload, plan, random.Random(seed - 1 - i))
+                for i in range(concurrency)
+            ))
+        recorder = Recorder()
+        plan = list(range(requests))
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            run_client(client, ctx, recorder, workload, plan, random.Random(seed + i)) for i in range(concurrency)
+        ))
+        return recorder, time.perf_counter() - start
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", help="Base SQLite existente generada con bench.dataset (se modifica); por defecto una temporal")
+    parser.add_argument("--workload", choices=sorted(WORKLOADS), default="mixed")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--output", help="Archivo donde guardar el reporte JSON")
+    add_scale_arguments(parser)
+    args = parser.parse_args(argv)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.db or os.path.join(tmp, "driver.db")
+        url = f"sqlite:///{path}"
+        engine = create_engine(url)
+        run_migrations(engine)
+        session_factory = sessionmaker(bind=engine, autoflush=False)
+        scale = scale_from_args(args)
+        with session_factory() as session:
+            counts = generate(session, scale, seed=args.seed) if not args.db else None
+            ctx = Context(session)
+        engine.dispose()
+        
+        os.environ["DATABASE_URL"] = url
+        from app.core.config import settings
+        from main import app
+        
+        recorder, elapsed = asyncio.run(
+            drive(app, ctx, WORKLOADS[args.workload], args.concurrency, args.requests, args.warmup, args.seed)
+        )
+    
+    report = recorder.report(elapsed, {
+        "workload": args.workload,
+        "weights": WORKLOADS[args.workload],
+        "concurrency": args.concurrency,
+        "warmup": args.warmup,
+        "seed": args.seed,
+        "database_mode": settings.database_mode,
+        "engine_profile": settings.engine_profile_name,
+        "scale": scale.model_dump() if not args.db else None,
+        "dataset": counts,
+    })
+    if args.output:
+        save(report, args.output)
+    summary = {key: report[key] for key in ("commit", "workload", "requests", "failed", "throughput_rps", "overall")}
+    print(json.dumps({**summary, "operations": {
+        name: {metric: stats[metric] for metric in ("count", "p50_ms", "p95_ms", "p99_ms")}
+        for name, stats in report["operations"].items()
+    }}, indent=2))
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
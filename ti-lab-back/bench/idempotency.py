@@ -0,0 +1,306 @@
+"""Idempotency-Key en préstamos y devoluciones: reintentos repetidos, duplicados simultáneos y vencimiento.
+
+Sobre una base sembrada con bench.checkout_race.seed, contra la app en proceso:
+
+- `--requests` POST /api/v1/loans/ con clave propia y cada uno reintentado dos veces: desde la memoria y,
+  con la LRU vaciada, desde la tabla. Mide la latencia de la original y de cada repetición y cuenta
+  las consultas de cada repetición a las tablas de préstamos (deben ser 0).
+- Los mismos préstamos se devuelven con PUT /loans/{id}/return con clave, reintentado una vez.
+- `--keys` claves enviadas `--duplicates` veces a la vez cada una: se crea un préstamo por clave y
+  todos los duplicados reciben la misma respuesta. Sin clave, como referencia, se crean todos.
+- Una clave pendiente de "otro proceso" (fila sin respuesta) que se completa al rato: la request
+  espera y repite esa respuesta. Una clave vencida se vuelve a ejecutar y el borrado la elimina.
+- Un préstamo confirmado cuya respuesta no llega a guardarse (el proceso "muere" entre los dos
+  commits): pasado PENDING_SECONDS el reintento recibe 409 y no crea otro préstamo.
+
+Falla (exit 1) si algún reintento ejecuta de nuevo, toca las tablas de préstamos, responde distinto
+o si el ledger de disponibilidad no coincide con los préstamos abiertos.
+
+    python -m bench.idempotency --requests 200 --keys 20 --duplicates 8
+    DATABASE_MODE=async python -m bench.idempotency
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import statistics
+import sys
+import tempfile
+import time
+from bench.checkout_race import seed
+
+# Tablas que un reintento no debe tocar
+LOAN_TABLES = re.compile(r"\b(prestamos|detalles_prestamo|disponibilidad_componentes|uso_diario)\b")
+
+
+def _latency(latencies: list) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "p50": round(statistics.median(latencies) * 1000, 2),
+        "p95": round(latencies[max(int(len(latencies) * 0.95) - 1, 0)] * 1000, 2),
+    }
+
+
+async def _timed(client, method: str, path: str, **kwargs):
+    from app.core.query_budget import count_queries
+    
+    with count_queries() as counter:
+        start = time.perf_counter()
+        response = await client.request(method, path, **kwargs)
+        elapsed = time.perf_counter() - start
+    loan_queries = sum(1 for statement in counter.statements if LOAN_TABLES.search(statement))
+    return response, elapsed, loan_queries
+
+
+def _loan(data: dict, alumno_id: int) -> dict:
+    return {"jornada_id": data["jornada_id"], "alumno_id": alumno_id, "detalles": [{"componente_id": data["componente_id"]}]}
+
+
+async def _retries(client, data: dict, alumnos: list, failures: list) -> dict:
+    from app.core.idempotency import idempotency_store
+    
+    created, replays = [], {"memory": [], "table": []}
+    loan_ids, loan_queries = [], 0
+    for alumno_id in alumnos:
+        headers = {"Idempotency-Key": f"loan-{alumno_id}"}
+        original, elapsed, _ = await _timed(client, "POST", "/api/v1/loans/", json=_loan(data, alumno_id), headers=headers)
+        created.append(elapsed)
+        if original.status_code != 201:
+            failures.append(f"create {alumno_id}: answered {original.status_code}")
+            continue
+        loan_ids.append(original.json()["id"])
+        for source in ("memory", "table"):
+            if source == "table":
+                idempotency_store.clear()
+            replay, elapsed, queries = await _timed(client, "POST", "/api/v1/loans/", json=_loan(data, alumno_id), headers=headers)
+            replays[source].append(elapsed)
+            loan_queries += queries
+            if replay.status_code != 201 or replay.content != original.content or replay.headers.get("idempotent-replayed") != "true":
+                failures.append(f"create {alumno_id}: {source} replay answered {replay.status_code} {replay.text[:80]}")
+    
+    returned, return_replays = [], []
+    for loan_id in loan_ids:
+        headers = {"Idempotency-Key": f"return-{loan_id}"}
+        original, elapsed, _ = await _timed(client, "PUT", f"/api/v1/loans/{loan_id}/return", headers=headers)
+        returned.append(elapsed)
+        replay, elapsed, queries = await _timed(client, "PUT", f"/api/v1/loans/{loan_id}/return", headers=headers)
+        return_replays.append(elapsed)
+        loan_queries += queries
+        if replay.content != original.content or replay.headers.get("idempotent-replayed") != "true":
+            failures.append(f"return {loan_id}: replay answered {replay.status_code} {replay.text[:80]}")
+    if loan_queries:
+        failures.append(f"replays ran {loan_queries} queries on the loan tables")
+    return {
+        "create_ms": _latency(created),
+        "replay_memory_ms": _latency(replays["memory"]),
+        "replay_table_ms": _latency(replays["table"]),
+        "return_ms": _latency(returned),
+        "return_replay_ms": _latency(return_replays),
+        "replay_loan_queries": loan_queries,
+    }
+
+
+def _loans_of(alumnos: list) -> int:
+    from sqlalchemy import func, select
+    from app.core.database import SessionLocal
+    from app.models import Prestamo
+    
+    with SessionLocal() as session:
+        return session.scalar(select(func.count()).select_from(Prestamo).where(Prestamo.alumno_id.in_(alumnos)))
+
+
+async def _duplicates(client, data: dict, alumnos: list, duplicates: int, failures: list) -> dict:
+    async def send(alumno_id: int, key: bool):
+        headers = {"Idempotency-Key": f"dup-{alumno_id}"} if key else {}
+        return await client.post("/api/v1/loans/", json=_loan(data, alumno_id), headers=headers)
+    
+    with_key, without_key = alumnos[: len(alumnos) // 2], alumnos[len(alumnos) // 2:]
+    start = time.perf_counter()
+    responses = await asyncio.gather(*(send(alumno_id, True) for alumno_id in with_key for _ in range(duplicates)))
+    elapsed = time.perf_counter() - start
+    by_key = {}
+    for response in responses:
+        by_key.setdefault(response.json().get("alumno_id"), []).append(response)
+    for alumno_id, group in by_key.items():
+        if len({response.content for response in group}) != 1 or sum(r.headers.get("idempotent-replayed") != "true" for r in group) != 1:
+            failures.append(f"duplicates of {alumno_id}: {len(group)} responses were not one execution and its replays")
+    await asyncio.gather(*(send(alumno_id, False) for alumno_id in without_key for _ in range(duplicates)))
+    created = _loans_of(with_key)
+    if created != len(with_key):
+        failures.append(f"duplicates: {created} loans created for {len(with_key)} keys")
+    return {
+        "keys": len(with_key),
+        "requests": len(responses),
+        "loans_created": created,
+        "statuses": sorted({response.status_code for response in responses}),
+        "elapsed_ms": round(elapsed * 1000, 2),
+        "without_key_loans_created": _loans_of(without_key),
+    }
+
+
+async def _other_process(client, data: dict, alumno_id: int, failures: list) -> dict:
+    """Clave reservada por otro proceso: la request espera hasta que esa fila tenga respuesta."""
+    from datetime import datetime, timedelta
+    from app.core.database import SessionLocal
+    from app.core.idempotency import fingerprint
+    from app.models import ClaveIdempotencia
+    
+    body = json.dumps(_loan(data, alumno_id)).encode()
+    huella = fingerprint("POST", "/api/v1/loans/", body)
+    stored = b'{"stored":"elsewhere"}'
+    ahora = datetime.now()
+    with SessionLocal() as session:
+        session.add(ClaveIdempotencia(
+            clave="pending", huella=huella, creada_en=ahora, expira_en=ahora + timedelta(seconds=60)
+        ))
+        session.commit()
+    
+    async def complete():
+        await asyncio.sleep(0.3)
+        with SessionLocal() as session:
+            row = session.get(ClaveIdempotencia, "pending")
+            row.status_code, row.cuerpo, row.expira_en = 201, stored, datetime.now() + timedelta(hours=1)
+            session.commit()
+    
+    completer = asyncio.create_task(complete())
+    start = time.perf_counter()
+    response = await client.post(
+        "/api/v1/loans/", content=body, headers={"Idempotency-Key": "pending", "Content-Type": "application/json"}
+    )
+    waited = time.perf_counter() - start
+    await completer
+    if response.status_code != 201 or response.content != stored:
+        failures.append(f"pending elsewhere: answered {response.status_code} {response.text[:80]}")
+    return {"waited_ms": round(waited * 1000, 2)}
+
+
+async def _expiry(client, data: dict, alumno_id: int, failures: list) -> dict:
+    from datetime import datetime, timedelta
+    from sqlalchemy import func, select
+    from app.core.database import SessionLocal
+    from app.core.idempotency import fingerprint, idempotency_store
+    from app.models import ClaveIdempotencia
+    
+    body = json.dumps(_loan(data, alumno_id)).encode()
+    vencida = datetime.now() - timedelta(seconds=1)
+    with SessionLocal() as session:
+        session.add_all([
+            ClaveIdempotencia(
+                clave="expired", huella=fingerprint("POST", "/api/v1/loans/", body), status_code=201,
+                cuerpo=b"{}", creada_en=vencida, expira_en=vencida,
+            ),
+            ClaveIdempotencia(
+                clave="expired-other", huella="x", status_code=201, cuerpo=b"{}", creada_en=vencida, expira_en=vencida,
+            ),
+        ])
+        session.commit()
+    # La próxima reserva hace la pasada de borrado
+    idempotency_store._purged_at = 0.0
+    response = await client.post(
+        "/api/v1/loans/", content=body, headers={"Idempotency-Key": "expired", "Content-Type": "application/json"}
+    )
+    with SessionLocal() as session:
+        expired_left = session.scalar(
+            select(func.count()).select_from(ClaveIdempotencia).where(ClaveIdempotencia.expira_en <= datetime.now())
+        )
+    if response.status_code != 201 or response.headers.get("idempotent-replayed") or response.json().get("alumno_id") != alumno_id:
+        failures.append(f"expired key: answered {response.status_code} {response.text[:80]} instead of running again")
+    if expired_left:
+        failures.append(f"expired key: {expired_left} expired rows left after the purge")
+    return {"expired_rows_left": expired_left}
+
+
+async def _lost_response(client, data: dict, alumno_id: int, failures: list) -> dict:
+    from app.core import idempotency
+    from app.repositories.idempotency_repository import IdempotencyRepository
+    
+    def die(self, *args, **kwargs):
+        raise SystemExit("process died before saving the response")
+    
+    headers = {"Idempotency-Key": "lost"}
+    complete, pending_seconds = IdempotencyRepository.complete, idempotency.PENDING_SECONDS
+    IdempotencyRepository.complete, idempotency.PENDING_SECONDS = die, 0.2
+    try:
+        try:
+            await client.post("/api/v1/loans/", json=_loan(data, alumno_id), headers=headers)
+        except SystemExit:
+            pass
+        IdempotencyRepository.complete = complete
+        start = time.perf_counter()
+        response = await client.post("/api/v1/loans/", json=_loan(data, alumno_id), headers=headers)
+        waited = time.perf_counter() - start
+    finally:
+        IdempotencyRepository.complete, idempotency.PENDING_SECONDS = complete, pending_seconds
+    created = _loans_of([alumno_id])
+    if response.status_code != 409 or created != 1:
+        failures.append(f"lost response: retry answered {response.status_code} and {created} loans exist")
+    return {"status": response.status_code, "loans_created": created, "waited_ms": round(waited * 1000, 2)}
+
+
+def _ledger(failures: list) -> dict:
+    from sqlalchemy import func, select
+    from app.core.database import SessionLocal
+    from app.models import DetallePrestamo, DisponibilidadComponente, Prestamo
+    
+    with SessionLocal() as session:
+        prestados = session.scalar(select(DisponibilidadComponente.prestados))
+        abiertos = session.scalar(
+            select(func.coalesce(func.sum(DetallePrestamo.cantidad), 0))
+            .join(Prestamo, Prestamo.id == DetallePrestamo.prestamo_id)
+            .where(Prestamo.estado != "devuelto")
+        )
+    if prestados != abiertos:
+        failures.append(f"ledger: {prestados} units lent but {abiertos} on open loans")
+    return {"prestados": prestados, "abiertos": abiertos}
+
+
+async def run(data: dict, requests: int, keys: int, duplicates: int) -> dict:
+    import httpx
+    from app.core.idempotency import IDEMPOTENCY_REQUESTS
+    from main import app
+    
+    failures = []
+    alumnos = data["alumnos"]
+    result = {}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            result["retries"] = await _retries(client, data, alumnos[:requests], failures)
+            result["duplicates"] = await _duplicates(client, data, alumnos[requests: requests + 2 * keys], duplicates, failures)
+            result["pending_elsewhere"] = await _other_process(client, data, alumnos[-3], failures)
+            result["expiry"] = await _expiry(client, data, alumnos[-2], failures)
+            result["lost_response"] = await _lost_response(client, data, alumnos[-1], failures)
+    result["ledger"] = _ledger(failures)
+    result["outcomes"] = {key[0]: int(value) for key, value in IDEMPOTENCY_REQUESTS._values.items()}
+    result["failures"] = failures
+    return result
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--keys", type=int, default=20)
+    parser.add_argument("--duplicates", type=int, default=8)
+    args = parser.parse_args(argv)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'idempotency.db')}"
+        # Un alumno por préstamo, por clave y sin clave en los duplicados, y tres para los casos sueltos
+        alumnos = args.requests + 2 * args.keys + 3
+        data = seed(url, alumnos=alumnos, stock=alumnos * (args.duplicates + 1))
+        os.environ.update({"DATABASE_URL": url, "LOG_LEVEL": "OFF", "OVERDUE_CHECK_SECONDS": "0"})
+        result = asyncio.run(run(data, args.requests, args.keys, args.duplicates))
+    
+    print(json.dumps({
+        "mode": os.getenv("DATABASE_MODE", "sync"),
+        "requests": args.requests,
+        "keys": args.keys,
+        "duplicates": args.duplicates,
+        **result,
+    }, indent=2))
+    return 1 if result["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
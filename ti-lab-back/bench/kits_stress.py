@@ -0,0 +1,93 @@
+"""Prueba de estrés de escrituras concurrentes sobre /api/v1/kits.
+
+Cada worker crea, actualiza, lee y elimina kits en paralelo; al final se verifica que los ids
+asignados sean únicos y que el listado coincida exactamente con los kits sobrevivientes.
+
+    python -m bench.kits_stress --workers 16 --kits-per-worker 25
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import httpx
+
+
+async def run_worker(client: httpx.AsyncClient, worker: int, kits: int) -> dict:
+    created, kept, errors = [], [], []
+    for i in range(kits):
+        response = await client.post("/api/v1/kits/", json={"nombre": f"Kit {worker}-{i}"})
+        if response.status_code != 201:
+            errors.append(("create", response.status_code))
+            continue
+        kit_id = response.json()["id"]
+        created.append(kit_id)
+        
+        response = await client.put(f"/api/v1/kits/{kit_id}", json={"descripcion": f"worker {worker}"})
+        if response.status_code != 200 or response.json()["descripcion"] != f"worker {worker}":
+            errors.append(("update", response.status_code))
+        
+        if (await client.get(f"/api/v1/kits/{kit_id}")).status_code != 200:
+            errors.append(("get", kit_id))
+        
+        if i % 2:
+            if (await client.delete(f"/api/v1/kits/{kit_id}")).status_code != 204:
+                errors.append(("delete", kit_id))
+        else:
+            kept.append(kit_id)
+    return {"created": created, "kept": kept, "errors": errors}
+
+
+async def stress(app, workers: int, kits_per_worker: int) -> tuple:
+    # Un solo event loop, como en uvicorn: los workers compiten por el threadpool / el pool async
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+        results = await asyncio.gather(*(run_worker(client, w, kits_per_worker) for w in range(workers)))
+        elapsed = time.perf_counter() - start
+        # Listado completo por páginas (limit acotado a 1000), siguiendo X-Next-Cursor
+        listed, params = [], {"limit": 1000}
+        while True:
+            response = await client.get("/api/v1/kits/", params=params)
+            listed.extend(response.json())
+            if not response.headers.get("X-Next-Cursor"):
+                break
+            params["cursor"] = response.headers["X-Next-Cursor"]
+    return results, elapsed, listed
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--kits-per-worker", type=int, default=25)
+    args = parser.parse_args(argv)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'stress.db')}"
+        from main import app
+        
+        results, elapsed, listed = asyncio.run(stress(app, args.workers, args.kits_per_worker))
+    
+    created = [kit_id for result in results for kit_id in result["created"]]
+    kept = sorted(kit_id for result in results for kit_id in result["kept"])
+    errors = [error for result in results for error in result["errors"]]
+    listed = sorted(kit["id"] for kit in listed)
+    
+    report = {
+        "workers": args.workers,
+        "requests": len(created) * 3 + (len(created) - len(kept)) + len(errors),
+        "elapsed_s": round(elapsed, 3),
+        "created": len(created),
+        "duplicate_ids": len(created) - len(set(created)),
+        "list_matches_survivors": listed == kept,
+        "errors": errors[:20],
+    }
+    print(json.dumps(report, indent=2))
+    ok = not errors and report["duplicate_ids"] == 0 and report["list_matches_survivors"]
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
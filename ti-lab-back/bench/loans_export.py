@@ -0,0 +1,112 @@
+"""Exportación de préstamos: tiempo al primer byte, bytes/s y pico de memoria de GET /loans/export.
+
+Llama a la app ASGI directamente (sin httpx, que acumula el cuerpo completo) y descarta cada
+bloque al recibirlo, así el pico de tracemalloc refleja solo lo que retiene el servidor.
+Falla (exit 1) si el pico supera `--max-peak-mib` o si faltan filas.
+
+    python -m bench.loans_export --scale large --prestamos-por-jornada 25
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+from app.migrations import run_migrations
+from app.models import DetallePrestamo, Prestamo
+from bench.dataset import add_scale_arguments, generate, scale_from_args
+
+
+async def export(app, fmt: str, trace: bool = False) -> dict:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/api/v1/loans/export",
+        "raw_path": b"/api/v1/loans/export",
+        "query_string": f"format={fmt}".encode(),
+        "root_path": "",
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 0),
+        "server": ("bench", 80),
+    }
+    stats = {"status": None, "bytes": 0, "lines": 0, "chunks": 0, "first_byte_ms": None}
+    start = time.perf_counter()
+    
+    pending = [{"type": "http.request", "body": b"", "more_body": False}]
+    
+    async def receive():
+        # Tras el cuerpo (vacío) de la petición, el cliente no se desconecta: StreamingResponse
+        # escucha la desconexión en paralelo hasta terminar de enviar
+        if pending:
+            return pending.pop()
+        await asyncio.Event().wait()
+    
+    async def send(message):
+        if message["type"] == "http.response.start":
+            stats["status"] = message["status"]
+        elif message["type"] == "http.response.body" and message.get("body"):
+            if stats["first_byte_ms"] is None:
+                stats["first_byte_ms"] = round((time.perf_counter() - start) * 1000, 2)
+            stats["bytes"] += len(message["body"])
+            stats["lines"] += message["body"].count(b"\n")
+            stats["chunks"] += 1
+    
+    if trace:
+        tracemalloc.start()
+    await app(scope, receive, send)
+    elapsed = time.perf_counter() - start
+    if trace:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return {"peak_mib": round(peak / 2**20, 2)}
+    return {
+        **stats,
+        "elapsed_s": round(elapsed, 3),
+        "mib_per_s": round(stats["bytes"] / 2**20 / elapsed, 2) if elapsed else 0.0,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", help="Base SQLite existente generada con bench.dataset; por defecto una temporal")
+    parser.add_argument("--max-peak-mib", type=float, default=16.0)
+    add_scale_arguments(parser)
+    args = parser.parse_args(argv)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{args.db or os.path.join(tmp, 'export.db')}"
+        engine = create_engine(url)
+        run_migrations(engine)
+        with sessionmaker(bind=engine, autoflush=False)() as session:
+            if not args.db:
+                generate(session, scale_from_args(args), seed=args.seed)
+            prestamos = session.scalar(select(func.count()).select_from(Prestamo))
+            detalles = session.scalar(select(func.count()).select_from(DetallePrestamo))
+        engine.dispose()
+        
+        os.environ["DATABASE_URL"] = url
+        from main import app
+        
+        # Tiempos sin tracemalloc (lo vuelve varias veces más lento); el pico, en una segunda pasada
+        results = {fmt: {**asyncio.run(export(app, fmt)), **asyncio.run(export(app, fmt, trace=True))} for fmt in ("csv", "ndjson")}
+    
+    failures = []
+    # CSV: cabecera + una línea por detalle; NDJSON: una línea por préstamo
+    for fmt, expected in (("csv", detalles + 1), ("ndjson", prestamos)):
+        if results[fmt]["status"] != 200 or results[fmt]["lines"] != expected:
+            failures.append(f"{fmt}: status {results[fmt]['status']}, {results[fmt]['lines']} lines (expected {expected})")
+        if results[fmt]["peak_mib"] > args.max_peak_mib:
+            failures.append(f"{fmt}: peak {results[fmt]['peak_mib']} MiB > {args.max_peak_mib} MiB")
+    print(json.dumps({"prestamos": prestamos, "detalles": detalles, **results, "failures": failures}, indent=2))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""Tamaño de respuesta: listados completos contra ?fields=/?expand= y sin comprimir contra gzip.
+
+Sobre una base generada con bench.dataset, pide cada variante a la app en proceso con
+Accept-Encoding identity y gzip. Reporta los bytes enviados, la mediana del tiempo en el servidor
+(la caché de catálogo se vacía antes de cada request, así se mide la generación) y el tiempo total
+estimado con la transferencia a `--mbps`. Falla (exit 1) si alguna respuesta no es 200, si una
+variante recortada no es más chica que la completa o si gzip no se aplica desde GZIP_MIN_BYTES.
+
+    python -m bench.payload_size --scale medium --mbps 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.migrations import run_migrations
+from bench.dataset import add_scale_arguments, generate, scale_from_args
+
+# (recurso, variante, ruta); la primera variante de cada recurso es la respuesta completa
+VARIANTS = (
+    ("kits", "full", "/api/v1/kits/?limit=100"),
+    ("kits", "names", "/api/v1/kits/?limit=100&fields=nombre"),
+    ("kits", "composition", "/api/v1/kits/?limit=100&fields=nombre,componentes&expand="),
+    ("loans", "full", "/api/v1/loans/?limit=100"),
+    ("loans", "summary", "/api/v1/loans/?limit=100&fields=estado,fecha_prestamo,detalles&expand=detalles.componente,detalles.kit"),
+    ("loans", "status", "/api/v1/loans/?limit=100&fields=estado,fecha_limite"),
+    ("loan", "full", "/api/v1/loans/{loan_id}"),
+    ("loan", "summary", "/api/v1/loans/{loan_id}?fields=estado,detalles&expand="),
+)
+ENCODINGS = ("identity", "gzip")
+
+
+async def measure(app, loan_id: int, repeat: int) -> list:
+    import httpx
+    from app.core.catalog_cache import catalog_cache
+    
+    results = []
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for resource, variant, path in VARIANTS:
+                path = path.format(loan_id=loan_id)
+                for encoding in ENCODINGS:
+                    timings, response = [], None
+                    for _ in range(repeat):
+                        catalog_cache.clear()
+                        start = time.perf_counter()
+                        response = await client.get(path, headers={"Accept-Encoding": encoding})
+                        timings.append((time.perf_counter() - start) * 1000)
+                    results.append({
+                        "resource": resource,
+                        "variant": variant,
+                        "encoding": encoding,
+                        "status": response.status_code,
+                        "content_encoding": response.headers.get("content-encoding", "identity"),
+                        # Lo que viajó por la red, antes de descomprimir
+                        "bytes": response.num_bytes_downloaded,
+                        "json_bytes": len(response.content),
+                        "server_ms": round(statistics.median(timings), 2),
+                    })
+    return results
+
+
+def summarize(results: list, mbps: float, gzip_min_bytes: int) -> list:
+    for r in results:
+        r["transfer_ms"] = round(r["bytes"] * 8 / (mbps * 1_000_000) * 1000, 2)
+        r["total_ms"] = round(r["server_ms"] + r["transfer_ms"], 2)
+    # Ahorro contra la respuesta completa sin comprimir del mismo recurso
+    full = {(r["resource"], r["encoding"]): r for r in results if r["variant"] == "full"}
+    failures = []
+    for r in results:
+        base = full[(r["resource"], "identity")]
+        r["bytes_saved_pct"] = round(100 * (1 - r["bytes"] / base["bytes"]), 1)
+        r["time_saved_ms"] = round(base["total_ms"] - r["total_ms"], 2)
+        if r["status"] != 200:
+            failures.append(f"{r['resource']}/{r['variant']}: answered {r['status']}")
+        if r["variant"] != "full" and r["json_bytes"] >= full[(r["resource"], r["encoding"])]["json_bytes"]:
+            failures.append(f"{r['resource']}/{r['variant']}: not smaller than the full response")
+        compressed = r["content_encoding"] == "gzip"
+        expected = r["encoding"] == "gzip" and gzip_min_bytes > 0 and r["json_bytes"] >= gzip_min_bytes
+        if compressed != expected:
+            failures.append(f"{r['resource']}/{r['variant']}/{r['encoding']}: gzip applied={compressed}, expected {expected}")
+    return failures
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--mbps", type=float, default=10.0, help="Ancho de banda para estimar la transferencia")
+    parser.add_argument("--db", help="Base SQLite existente generada con bench.dataset; por defecto una temporal")
+    add_scale_arguments(parser)
+    args = parser.parse_args(argv)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{args.db or os.path.join(tmp, 'payload.db')}"
+        if not args.db:
+            engine = create_engine(url)
+            run_migrations(engine)
+            with sessionmaker(bind=engine, autoflush=False)() as session:
+                generate(session, scale_from_args(args), seed=args.seed)
+            engine.dispose()
+        os.environ.update({"DATABASE_URL": url, "LOG_LEVEL": "OFF", "OVERDUE_CHECK_SECONDS": "0"})
+        from app.core.config import settings
+        from main import app
+        
+        # Un préstamo con kit en sus detalles: el caso que más crece al embeber
+        from app.core.database import SessionLocal
+        from app.models import DetallePrestamo
+        with SessionLocal() as session:
+            loan_id = session.query(DetallePrestamo.prestamo_id).filter(DetallePrestamo.kit_id.is_not(None)).limit(1).scalar()
+        results = asyncio.run(measure(app, loan_id or 1, args.repeat))
+    
+    failures = summarize(results, args.mbps, settings.gzip_min_bytes)
+    print(json.dumps({
+        "mbps": args.mbps,
+        "gzip_min_bytes": settings.gzip_min_bytes,
+        "results": results,
+        "failures": failures,
+    }, indent=2))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
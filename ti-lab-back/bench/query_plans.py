@@ -0,0 +1,214 @@
+"""Regresión de planes: EXPLAIN QUERY PLAN sobre cada consulta de los repositorios.
+
+Ejecuta los métodos de lectura/escritura de los repositorios sobre una base SQLite migrada,
+captura el SQL emitido y falla (exit 1) si algún paso del plan recorre una tabla completa
+en vez de buscar por índice. Los recorridos acotados por diseño se declaran en `allow`.
+
+    python -m bench.query_plans --rows 2000 [--verbose]
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+from datetime import date, datetime
+from typing import Callable, Dict, List, NamedTuple, Set, Tuple
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
+from app.migrations import run_migrations
+from app.models import Base
+from app.repositories.audit_repository import AuditRepository
+from app.repositories.availability_repository import AvailabilityRepository
+from app.repositories.catalog_version_repository import CatalogVersionRepository
+from app.repositories.component_repository import ComponentRepository
+from app.repositories.idempotency_repository import IdempotencyRepository
+from app.repositories.kit_repository import KitRepository
+from app.repositories.loan_repository import LoanRepository
+from app.repositories.roster_repository import RosterRepository
+from app.repositories.search_repository import SearchRepository
+from app.repositories.stats_repository import StatsRepository
+from app.schemas.loan import LOAN_FIELDSET
+from bench.serialization import seed
+
+_SCAN = re.compile(r"^SCAN (\w+)(?: USING (?:COVERING )?INDEX (\w+))?")
+_DERIVED = re.compile(r"^(?:MATERIALIZE|CO-ROUTINE) (\w+)")
+
+
+class PlanCheck(NamedTuple):
+    name: str
+    run: Callable[[Session], object]
+    # Tablas cuyo recorrido completo es esperado (p. ej. primera página acotada por LIMIT)
+    allow: Set[str] = set()
+
+
+CHECKS: List[PlanCheck] = [
+    PlanCheck("components.get_all", lambda s: ComponentRepository(s).get_all(limit=50), allow={"componentes"}),
+    PlanCheck("components.get_all_rows.after", lambda s: ComponentRepository(s).get_all_rows(limit=50, after_id=100)),
+    PlanCheck("components.get_by_id", lambda s: ComponentRepository(s).get_by_id(10)),
+    PlanCheck("components.get_many", lambda s: ComponentRepository(s).get_many([1, 2, 3])),
+    PlanCheck("components.get_rows_by_ids", lambda s: ComponentRepository(s).get_rows_by_ids([1, 2, 3])),
+    PlanCheck("components.get_by_nombre", lambda s: ComponentRepository(s).get_by_nombre("Componente 10")),
+    PlanCheck("components.is_referenced", lambda s: ComponentRepository(s).is_referenced(10)),
+    PlanCheck("kits.get_all", lambda s: KitRepository(s).get_all(limit=10), allow={"kits"}),
+    PlanCheck("kits.get_all_rows.after", lambda s: KitRepository(s).get_all_rows(limit=10, after_id=5)),
+    PlanCheck("kits.get_by_id", lambda s: KitRepository(s).get_by_id(3)),
+    PlanCheck("kits.get_rows_by_ids", lambda s: KitRepository(s).get_rows_by_ids([1, 2])),
+    PlanCheck("kits.is_referenced", lambda s: KitRepository(s).is_referenced(3)),
+    PlanCheck("loans.get_all", lambda s: LoanRepository(s).get_all(limit=20), allow={"prestamos"}),
+    PlanCheck("loans.get_all_rows", lambda s: LoanRepository(s).get_all_rows(limit=20), allow={"prestamos"}),
+    PlanCheck(
+        "loans.get_all_rows.after",
+        lambda s: LoanRepository(s).get_all_rows(limit=20, after=(datetime.now(), 1000)),
+    ),
+    PlanCheck(
+        "loans.iter_export_rows",
+        lambda s: list(LoanRepository(s).iter_export_rows(datetime(2024, 1, 1), datetime(2024, 2, 1))),
+    ),
+    PlanCheck(
+        "loans.get_all_rows.sparse",
+        lambda s: LoanRepository(s).get_all_rows(
+            limit=20, after=(datetime.now(), 1000), fieldset=LOAN_FIELDSET.parse("estado,detalles", "detalles.kit")
+        ),
+    ),
+    PlanCheck("loans.get_by_id", lambda s: LoanRepository(s).get_by_id(7)),
+    PlanCheck("loans.get_row_by_id", lambda s: LoanRepository(s).get_row_by_id(7)),
+    PlanCheck("loans.get_active_loans", lambda s: LoanRepository(s).get_active_loans()),
+    PlanCheck("loans.get_overdue_rows", lambda s: LoanRepository(s).get_overdue_rows(limit=20)),
+    PlanCheck(
+        "loans.get_overdue_rows.after",
+        lambda s: LoanRepository(s).get_overdue_rows(limit=20, after=(datetime(2024, 1, 1), 10)),
+    ),
+    PlanCheck("loans.mark_overdue", lambda s: LoanRepository(s).mark_overdue(datetime.now())),
+    PlanCheck("loans.next_due_date", lambda s: LoanRepository(s).next_due_date()),
+    PlanCheck("loans.get_open_ids_by_serial", lambda s: LoanRepository(s).get_open_ids_by_serial(["SN-1", "SN-2"])),
+    PlanCheck("loans.get_return_rows", lambda s: LoanRepository(s).get_return_rows([1, 2, 3])),
+    PlanCheck("loans.return_many", lambda s: LoanRepository(s).return_many([1, 2, 3], datetime.now())),
+    PlanCheck("loans.get_alumnos", lambda s: LoanRepository(s).get_alumnos([1])),
+    PlanCheck("loans.return_loan", lambda s: LoanRepository(s).return_loan(8, datetime.now())),
+    PlanCheck("availability.get_many", lambda s: AvailabilityRepository(s).get_many([1, 2, 3])),
+    PlanCheck("availability.adjust_prestados", lambda s: AvailabilityRepository(s).adjust_prestados({1: 1, 2: -1})),
+    PlanCheck("availability.get_demand_by_loan", lambda s: AvailabilityRepository(s).get_demand_by_loan([1, 2, 3])),
+    PlanCheck("availability.compute_open_demand", lambda s: AvailabilityRepository(s).compute_open_demand()),
+    PlanCheck("roster.get_cursos", lambda s: RosterRepository(s).get_cursos(["BENCH"])),
+    PlanCheck("roster.get_secciones", lambda s: RosterRepository(s).get_secciones([1])),
+    PlanCheck("roster.get_alumnos", lambda s: RosterRepository(s).get_alumnos([1], ["A001"])),
+    PlanCheck("stats.by_component.curso", lambda s: StatsRepository(s).by_component(curso_id=1)),
+    PlanCheck("stats.by_component.rango", lambda s: StatsRepository(s).by_component(desde=date(2024, 1, 1), hasta=date(2024, 2, 1))),
+    PlanCheck("stats.by_day.seccion", lambda s: StatsRepository(s).by_day(seccion_id=1)),
+    PlanCheck("stats.by_day.componente", lambda s: StatsRepository(s).by_day(componente_id=1)),
+    PlanCheck("search.componentes", lambda s: SearchRepository(s).search_componentes(["compo"], 10)),
+    PlanCheck("search.alumnos", lambda s: SearchRepository(s).search_alumnos(["alu"], None, 10)),
+    PlanCheck("search.alumnos.codigo", lambda s: SearchRepository(s).search_alumnos([], "A0", 10)),
+    PlanCheck("search.alumnos.nombre_codigo", lambda s: SearchRepository(s).search_alumnos(["alu"], "A0", 10)),
+    # Primera página sin rango: recorre ix_auditoria_registrado en orden, acotado por LIMIT
+    PlanCheck("audit.get_rows", lambda s: AuditRepository(s).get_rows(limit=50), allow={"auditoria_prestamos"}),
+    PlanCheck(
+        "audit.get_rows.rango",
+        lambda s: AuditRepository(s).get_rows(desde=datetime(2024, 1, 1), hasta=datetime(2024, 2, 1), limit=50),
+    ),
+    PlanCheck("audit.get_rows.prestamo", lambda s: AuditRepository(s).get_rows(prestamo_id=7, tabla="prestamos", limit=50)),
+    PlanCheck("audit.get_rows.after", lambda s: AuditRepository(s).get_rows(limit=50, after=(datetime(2024, 1, 1), 10))),
+    PlanCheck(
+        "idempotency.claim",
+        lambda s: IdempotencyRepository(s).claim("bench", "0" * 64, datetime(2024, 1, 1), datetime(2024, 1, 2)),
+    ),
+    PlanCheck("idempotency.complete", lambda s: IdempotencyRepository(s).complete("bench", 201, b"{}", datetime(2024, 1, 2))),
+    PlanCheck("idempotency.release", lambda s: IdempotencyRepository(s).release("bench")),
+    PlanCheck("idempotency.hold", lambda s: IdempotencyRepository(s).hold("bench", datetime(2024, 1, 2))),
+    PlanCheck("idempotency.purge", lambda s: IdempotencyRepository(s).purge(datetime(2024, 1, 1))),
+    PlanCheck("catalog_versions.get", lambda s: CatalogVersionRepository(s).get("components")),
+    PlanCheck("catalog_versions.bump", lambda s: CatalogVersionRepository(s).bump({"components", "kits"})),
+    # Anti-join de mantenimiento: recorre el catálogo completo por definición
+    PlanCheck(
+        "availability.create_missing_rows",
+        lambda s: AvailabilityRepository(s).create_missing_rows(),
+        allow={"componentes"},
+    ),
+]
+
+
+def partial_indexes() -> Set[str]:
+    return {
+        index.name
+        for table in Base.metadata.sorted_tables
+        for index in table.indexes
+        if index.dialect_options["sqlite"]["where"] is not None
+    }
+
+
+def scans(plan: List[Tuple], allow: Set[str]) -> List[str]:
+    # SQLite muestra el alias si la tabla lo tiene ("SCAN c"), así que se marca cualquier recorrido
+    # salvo subconsultas materializadas, tablas virtuales (FTS5) e índices parciales
+    details = [row[-1] for row in plan]
+    derived = {match.group(1) for match in map(_DERIVED.match, details) if match}
+    partial = partial_indexes()
+    found = []
+    for detail in details:
+        match = _SCAN.match(detail)
+        if not match or "VIRTUAL TABLE" in detail or detail == "SCAN CONSTANT ROW":
+            continue
+        table, index = match.groups()
+        if table not in derived and table not in allow and index not in partial:
+            found.append(detail)
+    return found
+
+
+def run_checks(engine, verbose: bool = False) -> Dict[str, dict]:
+    captured: List[Tuple[str, object]] = []
+    
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            captured.append((statement, parameters[0] if executemany else parameters))
+    
+    event.listen(engine, "before_cursor_execute", capture)
+    session_factory = sessionmaker(bind=engine, autoflush=False)
+    results = {}
+    try:
+        for check in CHECKS:
+            captured.clear()
+            with session_factory() as session:
+                check.run(session)
+                session.rollback()
+            statements = list(captured)
+            report = {"statements": [], "scans": []}
+            raw = engine.raw_connection()
+            try:
+                cursor = raw.cursor()
+                for statement, parameters in statements:
+                    plan = cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+                    found = scans(plan, check.allow)
+                    report["scans"].extend(found)
+                    if verbose:
+                        report["statements"].append({"sql": " ".join(statement.split()), "plan": [row[-1] for row in plan]})
+            finally:
+                raw.close()
+            if not verbose:
+                del report["statements"]
+            results[check.name] = report
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--verbose", action="store_true", help="Incluye el SQL y el plan completo de cada consulta")
+    args = parser.parse_args(argv)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'plans.db')}")
+        run_migrations(engine)
+        with sessionmaker(bind=engine, autoflush=False)() as session:
+            seed(session, args.rows)
+        results = run_checks(engine, verbose=args.verbose)
+        engine.dispose()
+    
+    failures = {name: report["scans"] for name, report in results.items() if report["scans"]}
+    print(json.dumps({"checks": results if args.verbose else len(results), "failures": failures}, indent=2))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""Réplica de lectura con dos archivos SQLite: enrutamiento, read-your-writes y vuelta a la primaria.
+
+Crea una primaria y una réplica mantenida con SQLiteReplicator (copias a demanda, así el retraso
+se controla) y recorre los casos contra la app en proceso con DATABASE_READ_URL:
+
+- una lectura sin escrituras previas va a la réplica;
+- quien acaba de escribir lee su escritura (primaria) mientras otro cliente aún no la ve (réplica);
+- tras replicar, ambos leen de la réplica;
+- con más retraso que REPLICA_MAX_LAG_SECONDS, o sin marca de replicación, todo va a la primaria;
+- un cambio de catálogo no deja respuestas viejas en la caché de ETag.
+
+Falla (exit 1) si algún paso no va a la base esperada o no responde lo esperado.
+
+    python -m bench.read_replica --max-lag 1
+"""
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import httpx
+from bench.checkout_race import seed
+
+
+def _routing_counts() -> dict:
+    from app.core.replica import READ_ROUTING
+    return dict(READ_ROUTING._values)
+
+
+async def scenario(app, data: dict, replicator, max_lag: float) -> list:
+    from app.core.database import replica_monitor
+    
+    steps = []
+    
+    async def step(name: str, client: httpx.AsyncClient, method: str, path: str, expect_status: int, expect_target=None, **kwargs):
+        before = _routing_counts()
+        response = await client.request(method, path, **kwargs)
+        after = _routing_counts()
+        routed = [key for key in after if after[key] != before.get(key, 0)]
+        target = "/".join(routed[0]) if routed else None
+        ok = response.status_code == expect_status and (expect_target is None or target == expect_target)
+        steps.append({"step": name, "status": response.status_code, "routed": target, "ok": ok})
+        return response
+    
+    def replicate():
+        replicator.sync_once()
+        replica_monitor.refresh()
+    
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as writer, \
+                httpx.AsyncClient(transport=transport, base_url="http://bench") as other:
+            replicate()
+            await step("lectura sin escrituras", other, "GET", "/api/v1/loans/", 200, "replica/fresh")
+            
+            created = await step("préstamo nuevo", writer, "POST", "/api/v1/loans/", 201, json={
+                "jornada_id": data["jornada_id"],
+                "alumno_id": data["alumnos"][0],
+                "detalles": [{"componente_id": data["componente_id"]}],
+            })
+            path = f"/api/v1/loans/{created.json()['id']}"
+            await step("quien escribió lee su escritura", writer, "GET", path, 200, "primary/read_your_writes")
+            await step("otro cliente aún no la ve", other, "GET", path, 404, "replica/fresh")
+            
+            replicate()
+            await step("replicado: otro cliente", other, "GET", path, 200, "replica/fresh")
+            await step("replicado: quien escribió", writer, "GET", path, 200, "replica/fresh")
+            
+            await asyncio.sleep(max_lag + 0.2)
+            replica_monitor.refresh()
+            await step("réplica atrasada", other, "GET", path, 200, "primary/lag")
+            
+            replicate()
+            await step("catálogo: alta", writer, "POST", "/api/v1/components/", 201, json={"nombre": "Multímetro réplica"})
+            listado = await step("catálogo: otro cliente", other, "GET", "/api/v1/components/?limit=1000", 200, "primary/read_your_writes")
+            if "Multímetro réplica" not in listado.text:
+                steps.append({"step": "catálogo: respuesta incluye el alta", "ok": False})
+            
+            replicate()
+            await step("catálogo replicado", other, "GET", "/api/v1/components/?limit=1000", 200, "replica/fresh")
+            await step("exportación", other, "GET", "/api/v1/loans/export?format=ndjson", 200, "replica/fresh")
+            
+            with sqlite3.connect(replicator.replica_path) as connection:
+                connection.execute("DROP TABLE replica_estado")
+            replica_monitor.refresh()
+            await step("réplica sin marca", other, "GET", "/api/v1/loans/", 200, "primary/unknown")
+    return steps
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--max-lag", type=float, default=1.0, help="REPLICA_MAX_LAG_SECONDS para la prueba")
+    args = parser.parse_args(argv)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        primary, replica = os.path.join(tmp, "primary.db"), os.path.join(tmp, "replica.db")
+        data = seed(f"sqlite:///{primary}", alumnos=5, stock=10)
+        os.environ.update({
+            "DATABASE_URL": f"sqlite:///{primary}",
+            "DATABASE_READ_URL": f"sqlite:///{replica}",
+            "REPLICA_MAX_LAG_SECONDS": str(args.max_lag),
+            "OVERDUE_CHECK_SECONDS": "0",
+        })
+        from app.core.replica import SQLiteReplicator
+        replicator = SQLiteReplicator(primary, replica)
+        replicator.sync_once()
+        from main import app
+        
+        start = time.perf_counter()
+        steps = asyncio.run(scenario(app, data, replicator, args.max_lag))
+        elapsed = time.perf_counter() - start
+    
+    failures = [s["step"] for s in steps if not s["ok"]]
+    print(json.dumps({"steps": steps, "elapsed_s": round(elapsed, 2), "failures": failures}, indent=2, ensure_ascii=False))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""Reportes de latencia (p50/p95/p99) y throughput en JSON, y comparación entre corridas.
+
+    python -m bench.report compare antes.json despues.json
+"""
+import argparse
+import json
+import math
+import platform
+import subprocess
+import sys
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    # Rango más cercano sobre una lista ya ordenada
+    if not ordered:
+        return 0.0
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def summarize(samples_ms: List[float]) -> dict:
+    ordered = sorted(samples_ms)
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered), 3) if ordered else 0.0,
+        "p50_ms": round(percentile(ordered, 50), 3),
+        "p95_ms": round(percentile(ordered, 95), 3),
+        "p99_ms": round(percentile(ordered, 99), 3),
+        "max_ms": round(ordered[-1], 3) if ordered else 0.0,
+    }
+
+
+class Recorder:
+    """Acumula (operación, latencia, status) de cada petición del driver."""
+    
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.errors: Dict[str, List[str]] = defaultdict(list)
+    
+    def record(self, operation: str, elapsed_ms: float, status: Optional[int], error: Optional[str] = None) -> None:
+        self.samples[operation].append(elapsed_ms)
+        self.statuses[operation][str(status) if status is not None else "exception"] += 1
+        if error and len(self.errors[operation]) < 5:
+            self.errors[operation].append(error)
+    
+    def report(self, elapsed_s: float, metadata: dict) -> dict:
+        total = sum(len(samples) for samples in self.samples.values())
+        every = [sample for samples in self.samples.values() for sample in samples]
+        operations = {}
+        for operation in sorted(self.samples):
+            operations[operation] = {
+                **summarize(self.samples[operation]),
+                "throughput_rps": round(len(self.samples[operation]) / elapsed_s, 1) if elapsed_s else 0.0,
+                "statuses": dict(self.statuses[operation]),
+                "errors": self.errors.get(operation, []),
+            }
+        return {
+            **environment(),
+            **metadata,
+            "elapsed_s": round(elapsed_s, 3),
+            "requests": total,
+            "throughput_rps": round(total / elapsed_s, 1) if elapsed_s else 0.0,
+            "failed": sum(
+                count
+                for statuses in self.statuses.values()
+                for status, count in statuses.items()
+                if status == "exception" or status.startswith("5")
+            ),
+            "overall": summarize(every),
+            "operations": operations,
+        }
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+    }
+
+
+def save(report: dict, path: str) -> None:
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2, ensure_ascii=False)
+
+
+def compare(before: dict, after: dict) -> dict:
+    """Diferencia relativa (después / antes) de percentiles y throughput por operación."""
+    def ratio(new: float, old: float) -> Optional[float]:
+        return round(new / old, 3) if old else None
+    
+    operations = {}
+    for operation in sorted(set(before["operations"]) & set(after["operations"])):
+        old, new = before["operations"][operation], after["operations"][operation]
+        operations[operation] = {
+            metric: {"before": old[metric], "after": new[metric], "ratio": ratio(new[metric], old[metric])}
+            for metric in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps")
+        }
+    return {
+        "before": {"commit": before.get("commit"), "timestamp": before.get("timestamp")},
+        "after": {"commit": after.get("commit"), "timestamp": after.get("timestamp")},
+        "throughput_rps": {
+            "before": before["throughput_rps"],
+            "after": after["throughput_rps"],
+            "ratio": ratio(after["throughput_rps"], before["throughput_rps"]),
+        },
+        "operations": operations,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    compare_parser = subparsers.add_parser("compare", help="Compara dos reportes del driver")
+    compare_parser.add_argument("before")
+    compare_parser.add_argument("after")
+    args = parser.parse_args(argv)
+    
+    with open(args.before, encoding="utf-8") as file:
+        before = json.load(file)
+    with open(args.after, encoding="utf-8") as file:
+        after = json.load(file)
+    print(json.dumps(compare(before, after), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""Importación de nóminas: filas/s y pico de memoria (tracemalloc) para archivos de distinto tamaño.
+
+Genera un CSV (o NDJSON) sintético por cada tamaño, lo importa sobre una base SQLite migrada y
+lo vuelve a importar para comprobar que el upsert es idempotente. Falla (exit 1) si hay filas
+rechazadas, si la segunda pasada crea algo o si el pico de memoria crece con el archivo más
+de `--max-growth` veces.
+
+    python -m bench.roster_import --rows 10000 100000 [--format ndjson]
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.migrations import run_migrations
+from app.schemas.roster import RosterRow
+from app.services.roster_service import RosterService
+from bench.dataset import APELLIDOS, NOMBRES, PROFESORES
+
+ALUMNOS_POR_SECCION = 30
+SECCIONES_POR_CURSO = 8
+
+
+def write_roster(path: str, rows: int, fmt: str, seed: int = 42) -> None:
+    """Escribe la nómina fila por fila, sin armarla en memoria."""
+    rng = random.Random(seed)
+    fields = list(RosterRow.model_fields)
+    with open(path, "w", encoding="utf-8", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=fields) if fmt == "csv" else None
+        if writer:
+            writer.writeheader()
+        for i in range(rows):
+            seccion = i // ALUMNOS_POR_SECCION
+            curso = seccion // SECCIONES_POR_CURSO
+            row = {
+                "curso_codigo": f"IMP-{curso:05d}",
+                "curso_nombre": f"Laboratorio {curso}",
+                "seccion": f"Sección {seccion % SECCIONES_POR_CURSO + 1:02d}",
+                "profesor": rng.choice(PROFESORES),
+                "alumno_codigo": f"2025{i:07d}",
+                "nombres": f"{rng.choice(NOMBRES)} {rng.choice(NOMBRES)}",
+                "apellidos": f"{rng.choice(APELLIDOS)} {rng.choice(APELLIDOS)}",
+            }
+            if writer:
+                writer.writerow(row)
+            else:
+                file.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+
+def measure(session_factory, path: str, fmt: str) -> dict:
+    tracemalloc.start()
+    start = time.perf_counter()
+    with session_factory() as session, open(path, "rb") as file:
+        report = RosterService(session).import_roster(file, fmt)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "rows_per_s": round(report["filas"] / elapsed, 1) if elapsed else 0.0,
+        "peak_kib": round(peak / 1024, 1),
+        "report": {key: value for key, value in report.items() if key != "errores"},
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--format", choices=["csv", "ndjson"], default="csv")
+    parser.add_argument("--max-growth", type=float, default=2.0)
+    args = parser.parse_args(argv)
+    
+    results = {}
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            engine = create_engine(f"sqlite:///{os.path.join(tmp, f'roster-{rows}.db')}")
+            run_migrations(engine)
+            session_factory = sessionmaker(bind=engine, autoflush=False)
+            path = os.path.join(tmp, f"roster-{rows}.{args.format}")
+            write_roster(path, rows, args.format)
+            
+            primera = measure(session_factory, path, args.format)
+            segunda = measure(session_factory, path, args.format)
+            engine.dispose()
+            results[rows] = {"file_mib": round(os.path.getsize(path) / 2**20, 2), "first": primera, "reimport": segunda}
+            
+            if primera["report"]["rechazadas"] or primera["report"]["alumnos_creados"] != rows:
+                failures.append(f"{rows}: first import created {primera['report']['alumnos_creados']} alumnos")
+            creados = sum(segunda["report"][key] for key in ("cursos_creados", "secciones_creadas", "alumnos_creados"))
+            if creados:
+                failures.append(f"{rows}: re-import created {creados} rows")
+    
+    peaks = [results[rows]["first"]["peak_kib"] for rows in args.rows]
+    if len(peaks) > 1 and max(peaks) > args.max_growth * min(peaks):
+        failures.append(f"peak memory grew from {min(peaks)} KiB to {max(peaks)} KiB")
+    print(json.dumps({"format": args.format, "results": results, "failures": failures}, indent=2))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
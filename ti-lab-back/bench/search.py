@@ -0,0 +1,111 @@
+"""Latencia del typeahead de /api/v1/search con FTS5 y con el índice de trigramas.
+
+Siembra N alumnos y M componentes, y mide SearchService.search con prefijos de 1 a 6
+letras (lo que envía un typeahead mientras se escribe). Termina con código 1 si el p95
+supera --budget-ms.
+
+    python -m bench.search --students 50000 --queries 500 --budget-ms 10
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from app.migrations import run_migrations
+from app.models import Alumno, Base, Componente, Curso, Seccion
+from app.services.search_service import SearchService
+
+NOMBRES = ["José", "María", "Luis", "Ana", "Carlos", "Lucía", "Jorge", "Sofía", "Miguel", "Valeria", "Andrés", "Camila"]
+APELLIDOS = ["Peña", "García", "Rodríguez", "Quispe", "Flores", "Huamán", "Sánchez", "Ramírez", "Torres", "Castillo"]
+COMPONENTES = ["Arduino", "Protoboard", "Resistencia", "Sensor", "Módulo", "Motor", "Servo", "Cable", "LED", "Multímetro"]
+
+
+def seed(session_factory, students: int, components: int, rng: random.Random) -> None:
+    with session_factory() as session:
+        session.add(Curso(id=1, nombre="Curso", codigo="BENCH"))
+        session.add(Seccion(id=1, nombre="A", profesor="Profesor", curso_id=1))
+        session.flush()
+        session.execute(
+            insert(Alumno),
+            [
+                {
+                    "codigo": f"2024{i:06d}",
+                    "nombres": f"{rng.choice(NOMBRES)} {rng.choice(NOMBRES)}",
+                    "apellidos": f"{rng.choice(APELLIDOS)} {rng.choice(APELLIDOS)}",
+                    "seccion_id": 1,
+                }
+                for i in range(students)
+            ],
+        )
+        session.execute(
+            insert(Componente),
+            [{"nombre": f"{rng.choice(COMPONENTES)} {i}", "requiere_numero_serie": False} for i in range(components)],
+        )
+        session.commit()
+
+
+def typeahead_queries(count: int, rng: random.Random) -> list:
+    words = NOMBRES + APELLIDOS + COMPONENTES + ["2024", "20240012"]
+    queries = []
+    while len(queries) < count:
+        word = rng.choice(words)
+        queries.extend(word[:length] for length in range(1, min(len(word), 6) + 1))
+    return queries[:count]
+
+
+def measure(session_factory, queries: list) -> dict:
+    timings = []
+    with session_factory() as session:
+        service = SearchService(session)
+        service.search(queries[0])  # carga del índice en memoria / caché de páginas
+        for query in queries:
+            start = time.perf_counter()
+            service.search(query, limit=10)
+            timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        "p50_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(timings[int(len(timings) * 0.95) - 1], 3),
+        "max_ms": round(timings[-1], 3),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=50000)
+    parser.add_argument("--components", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--budget-ms", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+    
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        # "fts5": base migrada; "trigram": mismas tablas sin FTS5, como en un motor distinto de SQLite
+        for backend in ("fts5", "trigram"):
+            engine = create_engine(f"sqlite:///{os.path.join(tmp, f'{backend}.db')}")
+            if backend == "fts5":
+                run_migrations(engine)
+            else:
+                Base.metadata.create_all(engine)
+            session_factory = sessionmaker(bind=engine, autoflush=False)
+            rng = random.Random(args.seed)
+            seed(session_factory, args.students, args.components, rng)
+            start = time.perf_counter()
+            with session_factory() as session:
+                SearchService(session).search("a")
+            warmup_ms = (time.perf_counter() - start) * 1000
+            results[backend] = {"warmup_ms": round(warmup_ms, 1), **measure(session_factory, typeahead_queries(args.queries, rng))}
+            engine.dispose()
+    
+    print(json.dumps({"students": args.students, "components": args.components, "results": results}, indent=2))
+    return 0 if all(result["p95_ms"] <= args.budget_ms for result in results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
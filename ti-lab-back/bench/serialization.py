@@ -0,0 +1,109 @@
+"""Micro-benchmark: listado por ORM + response_model contra la ruta rápida Core + TypeAdapter.
+
+    python -m bench.serialization --rows 10000 --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from datetime import date
+from typing import Callable, List
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session, sessionmaker
+from app.models import (
+    Alumno, Base, Componente, Curso, DetallePrestamo, JornadaPrestamo, Kit, KitComponente, Prestamo, Seccion
+)
+from app.schemas.component import Component
+from app.schemas.loan import Loan
+from app.services.component_service import ComponentService
+from app.services.loan_service import LoanService
+
+
+def seed(session: Session, rows: int) -> None:
+    session.execute(insert(Componente), [{"nombre": f"Componente {i}", "requiere_numero_serie": i % 7 == 0} for i in range(rows)])
+    session.execute(insert(Kit), [{"nombre": f"Kit {i}", "descripcion": "Kit de prueba"} for i in range(20)])
+    session.execute(
+        insert(KitComponente),
+        [{"kit_id": k + 1, "componente_id": k * 3 + j + 1, "cantidad": j + 1} for k in range(20) for j in range(3)],
+    )
+    session.add(Curso(id=1, nombre="Curso", codigo="BENCH"))
+    session.add(Seccion(id=1, nombre="A", profesor="Profesor", curso_id=1))
+    session.add(Alumno(id=1, codigo="A001", nombres="Alumno", apellidos="Bench", seccion_id=1))
+    session.add(JornadaPrestamo(id=1, fecha=date.today(), curso_id=1, seccion_id=1))
+    session.flush()
+    session.execute(insert(Prestamo), [{"jornada_id": 1, "alumno_id": 1, "estado": "activo"} for _ in range(rows)])
+    session.execute(
+        insert(DetallePrestamo),
+        [{"prestamo_id": i + 1, "componente_id": i % rows + 1, "cantidad": 1} for i in range(rows)]
+        + [{"prestamo_id": i + 1, "kit_id": i % 20 + 1, "cantidad": 1} for i in range(rows)],
+    )
+    session.commit()
+
+
+def orm_path(schema, page: Callable[[Session], list]) -> Callable[[Session], bytes]:
+    # Lo que hace FastAPI con response_model: validar, serializar a modo JSON y json.dumps
+    adapter = TypeAdapter(List[schema])
+    
+    def run(session: Session) -> bytes:
+        value = adapter.validate_python(page(session))
+        return json.dumps(
+            adapter.dump_python(value, mode="json"), ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+    
+    return run
+
+
+def measure(session_factory, fn: Callable[[Session], bytes], repeat: int) -> dict:
+    timings = []
+    size = 0
+    for _ in range(repeat):
+        session = session_factory()
+        start = time.perf_counter()
+        size = len(fn(session))
+        timings.append((time.perf_counter() - start) * 1000)
+        session.close()
+    return {"min_ms": round(min(timings), 2), "median_ms": round(statistics.median(timings), 2), "bytes": size}
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        session_factory = sessionmaker(bind=engine, autoflush=False)
+        with session_factory() as session:
+            seed(session, args.rows)
+        
+        cases = {
+            "components": (
+                orm_path(Component, lambda s: ComponentService(s).get_components_page(limit=args.rows)[0]),
+                lambda s: ComponentService(s).get_components_page_json(limit=args.rows)[0],
+            ),
+            "loans": (
+                orm_path(Loan, lambda s: LoanService(s).get_loans_page(limit=args.rows)[0]),
+                lambda s: LoanService(s).get_loans_page_json(limit=args.rows)[0],
+            ),
+        }
+        results = {}
+        for name, (orm, fast) in cases.items():
+            before = measure(session_factory, orm, args.repeat)
+            after = measure(session_factory, fast, args.repeat)
+            results[name] = {
+                "orm": before,
+                "fast_path": after,
+                "speedup": round(before["median_ms"] / after["median_ms"], 2),
+            }
+        engine.dispose()
+    
+    print(json.dumps({"rows": args.rows, "repeat": args.repeat, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
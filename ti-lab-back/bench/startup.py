@@ -0,0 +1,130 @@
+"""Arranque: tiempo de import de main.py, del lifespan y de la primera request a cada ruta frecuente.
+
+Cada muestra corre en un intérprete nuevo (nada importado ni compilado de antemano), con y sin
+STARTUP_WARMUP, sobre una base generada con bench.dataset. Reporta medianas y falla (exit 1) si
+alguna respuesta no es 200 o si alguna consulta del precalentamiento falló.
+
+    python -m bench.startup --samples 5 --scale medium
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.migrations import run_migrations
+from bench.dataset import add_scale_arguments, generate, scale_from_args
+
+PATHS = (
+    "/api/v1/components/",
+    "/api/v1/kits/",
+    "/api/v1/loans/",
+    "/api/v1/loans/active",
+    "/api/v1/components/availability",
+    "/api/v1/search/?q=a",
+)
+
+
+def _ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 1)
+
+
+async def _requests(app) -> dict:
+    import httpx
+    
+    timings = {}
+    start = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        timings["lifespan_ms"] = _ms(start)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for path in PATHS:
+                runs = []
+                for _ in range(2):
+                    start = time.perf_counter()
+                    response = await client.get(path)
+                    runs.append((_ms(start), response.status_code))
+                timings[path] = {"first_ms": runs[0][0], "second_ms": runs[1][0], "status": runs[0][1]}
+        timings["warmup"] = app.state.warmup
+    return timings
+
+
+def child() -> None:
+    start = time.perf_counter()
+    from main import app
+    timings = {"import_ms": _ms(start)}
+    timings.update(asyncio.run(_requests(app)))
+    print(json.dumps(timings))
+
+
+def sample(url: str, warmup: bool) -> dict:
+    env = {**os.environ, "DATABASE_URL": url, "STARTUP_WARMUP": str(warmup), "LOG_LEVEL": "OFF", "OVERDUE_CHECK_SECONDS": "0"}
+    result = subprocess.run(
+        [sys.executable, "-m", "bench.startup", "--child"], env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def summarize(samples: list) -> dict:
+    median = lambda values: round(statistics.median(values), 1)
+    summary = {
+        "import_ms": median([s["import_ms"] for s in samples]),
+        "lifespan_ms": median([s["lifespan_ms"] for s in samples]),
+        "first_request_ms": {path: median([s[path]["first_ms"] for s in samples]) for path in PATHS},
+        "second_request_ms": {path: median([s[path]["second_ms"] for s in samples]) for path in PATHS},
+    }
+    # Lo que espera el primer usuario tras un deploy: import + lifespan + su primera request
+    summary["ready_to_first_response_ms"] = round(
+        summary["import_ms"] + summary["lifespan_ms"] + summary["first_request_ms"][PATHS[0]], 1
+    )
+    return summary
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--samples", type=int, default=3)
+    parser.add_argument("--db", help="Base SQLite existente generada con bench.dataset; por defecto una temporal")
+    add_scale_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.child:
+        child()
+        return 0
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{args.db or os.path.join(tmp, 'startup.db')}"
+        if not args.db:
+            engine = create_engine(url)
+            run_migrations(engine)
+            with sessionmaker(bind=engine, autoflush=False)() as session:
+                generate(session, scale_from_args(args), seed=args.seed)
+            engine.dispose()
+        
+        runs = {"warmup": [], "cold": []}
+        # Alternadas para que ninguna variante se beneficie sola de la caché de archivos del sistema
+        for _ in range(args.samples):
+            runs["warmup"].append(sample(url, True))
+            runs["cold"].append(sample(url, False))
+    
+    failures = []
+    for name, samples in runs.items():
+        for s in samples:
+            failures += [f"{name}: {path} answered {s[path]['status']}" for path in PATHS if s[path]["status"] != 200]
+            if s["warmup"] and s["warmup"]["failed"]:
+                failures.append(f"{name}: warm-up failed for {s['warmup']['failed']}")
+    print(json.dumps({
+        "samples": args.samples,
+        "warmup": {**summarize(runs["warmup"]), "report": runs["warmup"][-1]["warmup"]},
+        "cold": summarize(runs["cold"]),
+        "failures": sorted(set(failures)),
+    }, indent=2))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
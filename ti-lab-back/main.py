@@ -1,12 +1,69 @@
-from fastapi import FastAPI
-from app.api.v1.api_router import api_router
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, Response, status
+from fastapi.responses import JSONResponse
+from app.api.v1.api_router import include_api_routers
+from app.core.audit import audit_log
+from app.core.compression import CompressionMiddleware
+from app.core.config import settings
+from app.core.database import SessionLocal, async_engine, engine, read_engine, replica_monitor
+from app.core.logging_config import configure_logging
+from app.core.metrics import CONTENT_TYPE, MetricsMiddleware, registry
+from app.core.pool_metrics import pool_status
+from app.core.query_budget import QueryBudgetExceeded
+from app.core.replica import ReadYourWritesMiddleware
+from app.core.retry import ConcurrencyConflict
+from app.migrations import run_migrations
+from app.services.overdue_scheduler import OverdueScheduler
+from app.services.warmup import warm_up
+
+configure_logging(settings.log_level, settings.log_format)
+run_migrations(engine)
+
+overdue_scheduler = OverdueScheduler(SessionLocal, settings.overdue_check_seconds)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Antes del yield: el servidor no acepta requests hasta que termine
+    app.state.warmup = await warm_up() if settings.startup_warmup else None
+    if settings.audit_enabled:
+        audit_log.start(SessionLocal)
+    overdue_scheduler.start()
+    yield
+    await overdue_scheduler.stop()
+    # Después del scheduler, para que sus últimos cambios también se escriban
+    await audit_log.stop()
+
 
 app = FastAPI(
     title="TI-LAB Backend",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
-app.include_router(api_router, prefix="/api/v1")
+include_api_routers(app, "/api/v1")
+
+if settings.gzip_min_bytes > 0:
+    app.add_middleware(CompressionMiddleware, minimum_size=settings.gzip_min_bytes)
+
+if read_engine is not None:
+    app.add_middleware(ReadYourWritesMiddleware, max_age=settings.replica_max_lag_seconds)
+
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
+
+@app.exception_handler(QueryBudgetExceeded)
+def query_budget_exceeded_handler(request: Request, exc: QueryBudgetExceeded):
+    return JSONResponse(
+        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        content={"detail": str(exc), "statements": exc.statements}
+    )
+
+
+@app.exception_handler(ConcurrencyConflict)
+def concurrency_conflict_handler(request: Request, exc: ConcurrencyConflict):
+    return JSONResponse(status_code=status.HTTP_409_CONFLICT, content={"detail": str(exc)})
 
 
 @app.get("/health")
@@ -14,6 +71,25 @@ def health_check():
     return {"status": "healthy", "app": "TI-LAB Backend"}
 
 
+@app.get("/health/db")
+def health_db():
+    pools = {"sync": pool_status(engine)}
+    if async_engine is not None:
+        pools["async"] = pool_status(async_engine.sync_engine)
+    health = {"status": "healthy", "engine_profile": settings.engine_profile_name, "pools": pools}
+    if read_engine is not None:
+        pools["replica"] = pool_status(read_engine)
+        lag = replica_monitor.lag()
+        health["replica_lag_seconds"] = round(lag, 3) if lag is not None else None
+    return health
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    # Formato de texto de Prometheus; vacío de series si METRICS_ENABLED=false
+    return Response(content=registry.render(), media_type=CONTENT_TYPE)
+
+
 @app.get("/")
 def root():
     return {"message": "TI-LAB Backend funcionando 🚀", "version": "1.0.0"}
\ No newline at end of file